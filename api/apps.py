@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from api import signals  # noqa: F401
+        from api.services import metrics
+
+        post_migrate.connect(signals.restore_search_triggers, sender=self)
+        connection_created.connect(metrics.install)
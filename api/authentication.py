@@ -0,0 +1,41 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.services import token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` that remembers which user a token belongs to.
+
+    Skips the token and user query on repeated requests with the same token,
+    see ``api.services.token_cache``.
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            read_generation = token_cache.generation()
+            user, token = super().authenticate_credentials(key)
+            token_cache.put(key, user, read_generation)
+            return user, token
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        # An unsaved instance is enough for request.auth, its key is the primary key
+        return user, Token(key=key, user=user)
+
+
+def get_authenticators():
+    return [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+
+def authenticate(request):
+    """The user of a plain Django request, per the DRF authentication classes"""
+    user = Request(request, authenticators=get_authenticators()).user
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    return user
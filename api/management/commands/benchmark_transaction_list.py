@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Account, Category, Transaction, User
+from api.serializers import TransactionListSerializer, TransactionListRowSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Compare transaction list serialization paths on the same rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Benchmark this user's transactions instead of generated ones")
+        parser.add_argument('--rows', type=int, default=1000, help="Rows per serialization")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per path, the median is reported")
+
+    def handle(self, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                if kwargs['user']:
+                    user = User.objects.filter(email=kwargs['user']).first()
+                    if user is None:
+                        raise CommandError(f"User {kwargs['user']} does not exist")
+                else:
+                    user = self.generate(kwargs['rows'])
+                self.benchmark(user, kwargs['rows'], kwargs['repeat'])
+                # Generated data is never kept
+                raise Rollback
+        except Rollback:
+            pass
+
+    def generate(self, rows):
+        rng = random.Random(0)
+        user = User.objects.create_user(email='benchmark@example.invalid', password=None, name='Benchmark')
+        categories = Category.objects.bulk_create([Category(user=user, title=f'Category {i}') for i in range(12)])
+        accounts = Account.objects.bulk_create([Account(user=user, title=f'Account {i}', initial=0) for i in range(3)])
+        today = date.today()
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                title=f'Transaction {i}',
+                amount=Decimal(rng.randint(100, 50000)) / 100,
+                transaction_type=rng.choice(['income', 'expense']),
+                category=rng.choice(categories),
+                account=rng.choice(accounts),
+                date=today - timedelta(days=rng.randint(0, 365)),
+                notes=rng.choice([None, 'note']),
+                tags=rng.choice([None, 'work', 'home, weekly']),
+            ) for i in range(rows)
+        ], batch_size=500)
+        return user
+
+    def benchmark(self, user, rows, repeat):
+        queryset = Transaction.objects.filter(user=user).order_by('-created_at', '-id')
+        paths = {
+            'model serializer': lambda: TransactionListSerializer(queryset[:rows], many=True).data,
+            'model serializer + select_related': lambda: TransactionListSerializer(
+                queryset.select_related('category', 'account')[:rows], many=True).data,
+            'row serializer': lambda: TransactionListRowSerializer(
+                TransactionListRowSerializer.rows_for(queryset)[:rows]).data,
+        }
+
+        outputs = {}
+        for name, run in paths.items():
+            timings = []
+            for _ in range(repeat):
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    started = time.perf_counter()
+                    data = run()
+                    timings.append(time.perf_counter() - started)
+            outputs[name] = JSONRenderer().render(data)
+            self.stdout.write(
+                f"{name:<36} {statistics.median(timings) * 1000:9.1f} ms  {queries.count:5d} queries  {len(data)} rows"
+            )
+
+        if len(set(outputs.values())) != 1:
+            raise CommandError("Serialization paths produced different output")
+        self.stdout.write(self.style.SUCCESS("All paths produced identical output"))
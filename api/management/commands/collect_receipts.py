@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.services import receipt_blobs
+
+
+class Command(BaseCommand):
+    help = 'Delete receipt images that no transaction has referenced for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Only collect blobs unreferenced for at least this long")
+        parser.add_argument('--recount', action='store_true',
+                            help="Rebuild every reference count from the transactions first")
+        parser.add_argument('--scan', action='store_true',
+                            help="Register objects found in storage that no blob row knows about first")
+        parser.add_argument('--dry-run', action='store_true', help="Report without deleting anything")
+
+    def handle(self, *args, **kwargs):
+        if kwargs['scan']:
+            found = receipt_blobs.scan()
+            self.stdout.write(f"Scanned {found} stored objects")
+        if kwargs['recount']:
+            corrected = receipt_blobs.recount()
+            self.stdout.write(f"Corrected {corrected} reference counts")
+
+        deleted, repaired = receipt_blobs.collect_garbage(
+            grace=timedelta(hours=kwargs['grace_hours']), dry_run=kwargs['dry_run']
+        )
+        if repaired:
+            self.stdout.write(self.style.WARNING(f"{repaired} blobs were still referenced, their counts were corrected"))
+        verb = 'Would delete' if kwargs['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced receipt blobs"))
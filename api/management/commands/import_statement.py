@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Account, Category, User
+from api.services.statement_import import (
+    STATEMENT_FORMATS, StatementError, StatementImporter, open_text, parse_statement, uncategorized,
+)
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV or OFX bank statement into an account, skipping rows imported before'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Statement file")
+        parser.add_argument('--user', required=True, help="Email address of the account owner")
+        parser.add_argument('--account', required=True, help="Account id or title")
+        parser.add_argument('--format', choices=STATEMENT_FORMATS, help="Statement format, guessed from the file extension by default")
+        parser.add_argument('--category', help="Category title for rows without one (default: Uncategorized)")
+        parser.add_argument('--date-format', help="strptime format of the date column, e.g. %%d/%%m/%%Y")
+        parser.add_argument('--decimal-separator', choices=['.', ','], help="Decimal separator of the amounts, guessed per row by default")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per insert batch")
+        parser.add_argument('--no-create-categories', action='store_true', help="Map unknown category names to the default category")
+
+    def handle(self, *args, **kwargs):
+        user = User.objects.filter(email=kwargs['user']).first()
+        if user is None:
+            raise CommandError(f"User {kwargs['user']} does not exist")
+
+        accounts = Account.objects.filter(user=user)
+        account_ref = kwargs['account']
+        account = (accounts.filter(pk=account_ref) if account_ref.isdigit() else accounts.filter(title=account_ref)).first()
+        if account is None:
+            raise CommandError(f"Account {account_ref} does not exist for {user.email}")
+
+        if kwargs['category']:
+            default_category, _ = Category.objects.get_or_create(user=user, title=kwargs['category'])
+        else:
+            default_category = uncategorized(user)
+
+        path = kwargs['path']
+        statement_format = kwargs['format'] or ('ofx' if path.lower().endswith(('.ofx', '.qfx')) else 'csv')
+        importer = StatementImporter(
+            user,
+            account,
+            default_category,
+            create_categories=not kwargs['no_create_categories'],
+            batch_size=kwargs['batch_size'],
+        )
+        errors = []
+        try:
+            with open(path, 'rb') as handle:
+                result = importer.run(
+                    parse_statement(
+                        open_text(handle), statement_format, errors, kwargs['date_format'], kwargs['decimal_separator'],
+                    ),
+                    errors
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except StatementError as exc:
+            raise CommandError(str(exc))
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Parsed {result.parsed} rows: {result.inserted} imported, "
+            f"{result.duplicates} duplicates skipped, {len(result.errors)} errors"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Transaction
+from api.services import receipts
+
+
+class Command(BaseCommand):
+    help = 'Process receipts that are still pending, or were uploaded before receipts were processed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Also retry receipts that failed before")
+
+    def handle(self, *args, **kwargs):
+        statuses = ['', 'pending'] + (['failed'] if kwargs['retry_failed'] else [])
+        queryset = (
+            Transaction.objects.exclude(receipt='').exclude(receipt__isnull=True)
+            .filter(receipt_status__in=statuses)
+            .order_by('pk')
+            .values_list('pk', 'receipt')
+        )
+        processed = failed = 0
+        for pk, name in queryset.iterator():
+            if receipts.process_receipt(pk, name):
+                processed += 1
+            else:
+                failed += 1
+            if kwargs['verbosity'] > 1:
+                self.stdout.write(f"{pk}: {name}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} receipts, {failed} failed or replaced"))
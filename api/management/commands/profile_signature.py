@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.services import profiling
+
+
+class Command(BaseCommand):
+    help = 'Print an X-Profile-Signature header value that allows profiling any request'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(f"{profiling.SIGNATURE_HEADER}: {profiling.make_signature()}")
+        self.stderr.write(f"Valid for {settings.PROFILE_SIGNATURE_MAX_AGE} seconds; send it with 'X-Profile: inline' "
+                          f"to get the report instead of the response")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Account, User
+from api.services import ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stored account balances from transaction history and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only rebuild accounts owned by this email address")
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it")
+
+    def handle(self, *args, **kwargs):
+        accounts = Account.objects.order_by('pk')
+        if kwargs['user']:
+            try:
+                user = User.objects.get(email=kwargs['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {kwargs['user']} does not exist")
+            accounts = accounts.filter(user=user)
+
+        checked = drifted = 0
+        for account_id, title in accounts.values_list('pk', 'title').iterator():
+            stored, expected = ledger.rebuild_account(account_id, dry_run=kwargs['dry_run'])
+            checked += 1
+            if stored != expected:
+                drifted += 1
+                self.stdout.write(
+                    f"Account {account_id} ({title}): stored balance={stored[0]} income={stored[1]} "
+                    f"expense={stored[2]}, expected balance={expected[0]} income={expected[1]} expense={expected[2]}"
+                )
+
+        action = 'found' if kwargs['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} accounts, {action} drift in {drifted}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import DailyRollup, User
+from api.services import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily rollups from transaction history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only rebuild rollups for this email address")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rollup rows per insert")
+
+    def handle(self, *args, **kwargs):
+        users = User.objects.order_by('pk')
+        if kwargs['user']:
+            users = users.filter(email=kwargs['user'])
+            if not users.exists():
+                raise CommandError(f"User {kwargs['user']} does not exist")
+
+        total_before = total_after = 0
+        for user_id, email in users.values_list('pk', 'email').iterator():
+            before = DailyRollup.objects.filter(user_id=user_id).count()
+            after = rollups.rebuild_for_user(user_id, batch_size=kwargs['batch_size'])
+            total_before += before
+            total_after += after
+            if kwargs['verbosity'] > 1:
+                self.stdout.write(f"{email}: {before} -> {after} rollup rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups: {total_before} -> {total_after} rows"))
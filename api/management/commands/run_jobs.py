@@ -0,0 +1,54 @@
+import signal
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.services import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is runnable")
+        parser.add_argument('--max-jobs', type=int, default=0, help="Exit after running this many jobs")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **kwargs):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        worker = jobs.worker_name()
+        self.stdout.write(f"Worker {worker} started")
+
+        ran = 0
+        last_housekeeping = 0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_housekeeping > 60:
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale jobs"))
+                jobs.delete_finished(timedelta(days=settings.JOB_RETENTION_DAYS))
+                last_housekeeping = time.monotonic()
+
+            job = jobs.run_next(worker)
+            if job is None:
+                if kwargs['burst']:
+                    break
+                time.sleep(kwargs['sleep'])
+                continue
+            ran += 1
+            if kwargs['verbosity'] > 0:
+                self.stdout.write(f"{job}: attempt {job.attempts}")
+            if kwargs['max_jobs'] and ran >= kwargs['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} stopped after {ran} jobs"))
+
+    def stop(self, signum, frame):
+        # Finish the job in hand, then exit
+        self.stopping = True
@@ -0,0 +1,290 @@
+import functools
+import itertools
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from PIL import Image, ImageDraw
+
+from api.models import Account, Category, Transaction, TransactionTag, User
+from api.search import search_index_paused
+from api.services import ledger, receipt_blobs, receipts, rollups, tags as tag_service
+
+CATEGORIES = [
+    # (title, merchants, median amount, weight)
+    ('Groceries', ['FreshMart', 'Green Grocer', 'Corner Store', 'Organic Market'], 45, 30),
+    ('Restaurants', ['Pizza Place', 'Sushi Bar', 'Burger Joint', 'Thai Kitchen'], 28, 18),
+    ('Coffee', ['Bean There', 'Daily Grind', 'Espresso Lab'], 5, 16),
+    ('Transport', ['Metro Card', 'City Taxi', 'Fuel Station', 'Bike Share'], 18, 14),
+    ('Shopping', ['Online Store', 'Department Store', 'Bookshop', 'Electronics Hub'], 60, 9),
+    ('Utilities', ['Power Co', 'Water Works', 'Internet Provider', 'Mobile Carrier'], 80, 4),
+    ('Rent', ['Landlord'], 1200, 1),
+    ('Health', ['Pharmacy', 'Dental Clinic', 'Gym Membership'], 40, 4),
+    ('Entertainment', ['Cinema', 'Streaming Service', 'Concert Tickets', 'Game Store'], 20, 6),
+    ('Travel', ['Airline', 'Hotel', 'Car Rental'], 250, 2),
+    ('Gifts', ['Flower Shop', 'Gift Store'], 35, 2),
+    ('Education', ['Online Course', 'School Supplies'], 90, 1),
+    ('Insurance', ['Insurance Co'], 120, 1),
+    ('Pets', ['Pet Store', 'Veterinarian'], 30, 2),
+]
+INCOME_CATEGORIES = [
+    ('Salary', ['Employer Payroll'], 3200, 6),
+    ('Freelance', ['Client Payment'], 600, 2),
+    ('Refunds', ['Store Refund', 'Tax Refund'], 40, 2),
+    ('Interest', ['Bank Interest'], 8, 1),
+]
+ACCOUNTS = ['Checking', 'Savings', 'Credit Card', 'Cash', 'Business', 'Joint', 'Travel Card', 'Brokerage']
+TAGS = [
+    'work', 'home', 'family', 'weekly', 'monthly', 'subscription', 'reimbursable', 'vacation', 'tax',
+    'gift', 'online', 'cash', 'kids', 'health', 'car', 'weekend', 'business', 'recurring', 'impulse',
+    'shared', 'holiday', 'essentials', 'luxury', 'travel', 'school',
+]
+NOTES = [
+    'Split with friends', 'Paid in installments', 'Annual renewal', 'Refund expected', 'Birthday',
+    'Price went up again', 'Business trip', 'Bought in bulk', 'Emergency', 'Discount applied',
+]
+INCOME_SHARE = 0.025
+TAGGED_SHARE = 0.3
+NOTES_SHARE = 0.15
+
+
+class RowWriter:
+    """
+    Inserts plain rows of a model with ``executemany``.
+
+    Skips model instances and ``bulk_create``'s per-field preparation, which
+    dominate the cost at millions of rows, and keeps the given ``created_at``
+    instead of the current time. Rows are dicts of column values, missing
+    ones take the field default. Dates and times are adapted for the
+    connection's backend here; database drivers adapt ``Decimal`` themselves.
+    """
+
+    def __init__(self, model):
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        self.defaults = [(field.attname, field.get_default()) for field in fields]
+        self.adapters = []
+        for field in fields:
+            kind = field.get_internal_type()
+            if kind == 'DateField':
+                self.adapters.append((field.attname, functools.lru_cache(maxsize=4096)(connection.ops.adapt_datefield_value)))
+            elif kind == 'DateTimeField':
+                self.adapters.append((field.attname, connection.ops.adapt_datetimefield_value))
+        names = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        self.sql = (
+            f"INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({names}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))})"
+        )
+
+    def insert(self, rows):
+        values = []
+        for row in rows:
+            for attname, adapt in self.adapters:
+                value = row.get(attname)
+                if value is not None:
+                    row[attname] = adapt(value)
+            values.append(tuple([row.get(attname, default) for attname, default in self.defaults]))
+        with connection.cursor() as cursor:
+            cursor.executemany(self.sql, values)
+
+
+class Command(BaseCommand):
+    help = 'Generate users with realistic volumes of accounts, categories and transactions for performance work'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transactions = RowWriter(Transaction)
+        self.transaction_tags = RowWriter(TransactionTag)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Users to create")
+        parser.add_argument('--accounts', type=int, default=3, help="Accounts per user")
+        parser.add_argument('--categories', type=int, default=12, help="Categories per user")
+        parser.add_argument('--transactions', type=int, default=1000, help="Transactions per user")
+        parser.add_argument('--days', type=int, default=730,
+                            help="Spread transactions over this many days up to the end date")
+        parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                            help="Last day of generated activity (YYYY-MM-DD, default today)")
+        parser.add_argument('--receipts', type=float, default=0.05, help="Share of expenses with a receipt")
+        parser.add_argument('--receipt-images', type=int, default=20,
+                            help="Distinct receipt images, shared between transactions")
+        parser.add_argument('--seed', type=int, default=0, help="Same seed and options, same data")
+        parser.add_argument('--email-domain', default='perf.example.invalid', help="Domain of the generated emails")
+        parser.add_argument('--password', default='perf-password', help="Password of the generated users")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Transactions per insert transaction")
+        parser.add_argument('--clear', action='store_true',
+                            help="Delete the users of --email-domain before generating")
+
+    def handle(self, *args, **kwargs):
+        domain = kwargs['email_domain']
+        existing = User.objects.filter(email__iendswith=f'@{domain}')
+        if kwargs['clear']:
+            deleted = self.clear(existing)
+            self.stdout.write(f"Deleted {deleted} users of {domain}")
+        elif existing.exists():
+            raise CommandError(f"Users of {domain} already exist, pass --clear to replace them")
+        if kwargs['categories'] < len(INCOME_CATEGORIES) + 1:
+            raise CommandError(f"--categories must be at least {len(INCOME_CATEGORIES) + 1}")
+
+        started = time.monotonic()
+        images = self.receipt_images(kwargs['seed'], kwargs['receipt_images']) if kwargs['receipts'] else []
+        total = 0
+        if connection.vendor == 'sqlite':
+            # Keep the indexes' hot pages in memory for this connection, the default is 2 MB
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA cache_size = -262144')
+        with search_index_paused(connection):
+            for index in range(kwargs['users']):
+                user_started = time.monotonic()
+                user, count = self.seed_user(index, images, kwargs)
+                total += count
+                if kwargs['verbosity'] > 1:
+                    elapsed = time.monotonic() - user_started
+                    self.stdout.write(f"{user.email}: {count} transactions in {elapsed:.1f}s")
+        # Rows were inserted without the model's hooks, count their receipt references in one pass
+        receipt_blobs.recount()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {kwargs['users']} users and {total} transactions in {elapsed:.1f}s "
+            f"({total / elapsed if elapsed else 0:.0f} transactions/s)"
+        ))
+
+    def clear(self, users):
+        """Delete generated users, their transactions with plain DELETEs instead of per-row cascades"""
+        user_ids = list(users.values_list('pk', flat=True))
+        transactions = Transaction.objects.filter(user_id__in=user_ids)
+        with transaction.atomic():
+            TransactionTag.objects.filter(transaction__in=transactions)._raw_delete(TransactionTag.objects.db)
+            transactions._raw_delete(transactions.db)
+            for user in User.objects.filter(pk__in=user_ids):
+                user.delete()
+        return len(user_ids)
+
+    def receipt_images(self, seed, count):
+        """Store ``count`` generated receipt images with their renditions; returns their field values"""
+        rng = random.Random(f'{seed}:receipts')
+        storage = receipt_blobs.get_storage()
+        images = []
+        for index in range(count):
+            image = Image.new('RGB', (600, 900), 'white')
+            draw = ImageDraw.Draw(image)
+            for line in range(20):
+                y = 60 + line * 38
+                draw.rectangle((40, y, 40 + rng.randint(120, 520), y + 14), fill=(rng.randint(0, 90),) * 3)
+            stored = {'receipt': storage.save(
+                f'receipts/seed-{index}.jpg', ContentFile(receipts.encode_jpeg(image, 2048))
+            )}
+            for rendition, (field_name, size) in receipts.RENDITIONS.items():
+                stored[field_name] = storage.save(
+                    f'receipts/{rendition}/seed-{index}.jpg', ContentFile(receipts.encode_jpeg(image, size))
+                )
+            images.append(stored)
+        return images
+
+    def seed_user(self, index, images, options):
+        # One stream per user, so a user's data does not depend on the batch size or the others
+        rng = random.Random(f"{options['seed']}:{index}")
+        user = User.objects.create_user(
+            email=f"perf{index}@{options['email_domain']}", password=options['password'], name=f'Perf User {index}'
+        )
+        accounts = Account.objects.bulk_create([
+            Account(user=user, title=title, initial=Decimal(rng.randint(0, 500000)) / 100)
+            for title in self.titles(ACCOUNTS, options['accounts'], 'Account')
+        ])
+        # Every income category plus the most common expense ones, in order of weight
+        income_specs = INCOME_CATEGORIES
+        expense_specs = self.specs(CATEGORIES, options['categories'] - len(income_specs))
+        categories = Category.objects.bulk_create(
+            [Category(user=user, title=spec[0]) for spec in income_specs + expense_specs]
+        )
+        # (choices, cumulative weights) per pool; skewed account use, the first account carries most activity
+        pools = {
+            'income': self.pool(zip(categories[:len(income_specs)], income_specs), lambda item: item[1][3]),
+            'expense': self.pool(zip(categories[len(income_specs):], expense_specs), lambda item: item[1][3]),
+            'account': self.pool(accounts, lambda account: 1 / (accounts.index(account) + 1)),
+        }
+        tag_ids = {
+            key: tag.pk for key, tag in tag_service.tags_by_key(user.pk, TAGS).items()
+        }
+
+        today = options['end_date'] or date.today()
+        daily = defaultdict(lambda: [Decimal('0'), 0])
+        remaining = options['transactions']
+        while remaining > 0:
+            size = min(remaining, options['batch_size'])
+            rows = [
+                self.transaction(rng, user, pools, images, today, options)
+                for _ in range(size)
+            ]
+            for key, (amount, count) in rollups.deltas_for(rows, 1).items():
+                daily[key][0] += amount
+                daily[key][1] += count
+            with transaction.atomic():
+                last_id = Transaction.objects.filter(user=user).order_by('-pk').values_list('pk', flat=True).first()
+                self.transactions.insert(rows)
+                # Ids are handed out in insert order and nothing else writes this user's rows
+                ids = Transaction.objects.filter(user=user, pk__gt=last_id or 0).order_by('pk').values_list('pk', flat=True)
+                self.transaction_tags.insert([
+                    {'transaction_id': pk, 'tag_id': tag_ids[tag_service.tag_key(name)]}
+                    for pk, row in zip(ids, rows) for name in tag_service.parse_tags(row['tags'])
+                ])
+            remaining -= size
+
+        # Running totals and rollups once per user instead of per inserted row
+        rollups.apply_deltas(daily)
+        for account in accounts:
+            ledger.rebuild_account(account.pk)
+        return user, options['transactions']
+
+    @staticmethod
+    def pool(items, weight):
+        items = list(items)
+        return items, list(itertools.accumulate(weight(item) for item in items))
+
+    @staticmethod
+    def titles(names, count, fallback):
+        return [names[i] if i < len(names) else f'{fallback} {i + 1}' for i in range(count)]
+
+    @staticmethod
+    def specs(specs, count):
+        ordered = sorted(specs, key=lambda spec: -spec[3])
+        return [
+            ordered[i] if i < len(ordered) else (f'Category {i + 1}', ['Misc Merchant'], 25, 1)
+            for i in range(count)
+        ]
+
+    def transaction(self, rng, user, pools, images, today, options):
+        is_income = rng.random() < INCOME_SHARE
+        choices, cum_weights = pools['income' if is_income else 'expense']
+        category, (_, merchants, median, _) = rng.choices(choices, cum_weights=cum_weights)[0]
+        # Log-normal amounts around the category's typical spend, with a long tail of large ones
+        amount = Decimal(max(1, round(median * math.exp(rng.gauss(0, 0.6)) * 100))) / 100
+        # Activity grows towards today
+        day = today - timedelta(days=int(options['days'] * (1 - rng.random() ** 0.6)))
+        created_at = datetime.combine(day, dt_time(rng.randint(7, 22), rng.randint(0, 59)), dt_timezone.utc)
+
+        tags = None
+        if rng.random() < TAGGED_SHARE:
+            tags = tag_service.clean_tags(', '.join(rng.sample(TAGS, rng.choice((1, 1, 1, 2, 2, 3)))))
+        receipt = {}
+        if images and not is_income and rng.random() < options['receipts']:
+            receipt = dict(rng.choice(images), receipt_status='ready')
+        return {
+            'user_id': user.pk,
+            'title': rng.choice(merchants),
+            'amount': amount,
+            'transaction_type': 'income' if is_income else 'expense',
+            'category_id': category.pk,
+            'account_id': rng.choices(*pools['account'])[0].pk,
+            'date': day,
+            'created_at': created_at,
+            'notes': rng.choice(NOTES) if rng.random() < NOTES_SHARE else None,
+            'tags': tags,
+            **receipt,
+        }
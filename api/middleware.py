@@ -0,0 +1,229 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import exceptions
+
+from api.authentication import authenticate
+from api.services import metrics, profiling, watchdog
+
+
+class MetricsMiddleware:
+    """
+    Record latency, queries, response size and cache use of every request.
+
+    Place it first in ``MIDDLEWARE`` so the time of the other middleware is
+    included. Adds a ``Server-Timing`` header when ``METRICS_SERVER_TIMING``
+    is set; the totals are served by ``/api/metrics/``, see
+    ``api.services.metrics``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, time.perf_counter() - started, stats)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        stats, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, time.perf_counter() - started, stats)
+
+    def finish(self, request, response, seconds, stats):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else metrics.UNMATCHED
+        cache = response.get('X-Cache')
+        if response.streaming:
+            size = 0
+            count_streamed_bytes(response, route, request.method)
+        else:
+            size = len(response.content)
+        metrics.record(
+            route, request.method, response.status_code, seconds, stats.queries, stats.seconds, size,
+            cache.lower() if cache else None,
+        )
+        if settings.METRICS_SERVER_TIMING:
+            timings = [
+                f'app;dur={seconds * 1000:.1f}',
+                f'db;dur={stats.seconds * 1000:.1f};desc="{stats.queries} queries"',
+            ]
+            if cache:
+                timings.append(f'cache;desc="{cache}"')
+            response['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+def count_streamed_bytes(response, route, method):
+    """Record the size of a streamed body when the server has sent all of it"""
+    content = response.streaming_content
+
+    if response.is_async:
+        async def counted():
+            size = 0
+            try:
+                async for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                metrics.record_bytes(route, method, size)
+    else:
+        def counted():
+            size = 0
+            try:
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                metrics.record_bytes(route, method, size)
+
+    response.streaming_content = counted()
+
+
+def may_profile(request):
+    """Whether the request may be profiled: a valid signature, or a superuser"""
+    signature = request.headers.get(profiling.SIGNATURE_HEADER)
+    if signature:
+        return profiling.valid_signature(signature)
+    try:
+        return authenticate(request).is_superuser
+    except exceptions.APIException:
+        return False
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests that ask for it with an ``X-Profile`` header.
+
+    See ``api.services.profiling``. Requests without the header, or not
+    allowed to be profiled, pass through untouched. Place it after
+    ``AuthenticationMiddleware`` so superusers logged in with a session can
+    profile too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        mode = profiling.requested_mode(request)
+        if mode is None or not may_profile(request):
+            return self.get_response(request)
+        if not profiling.try_acquire():
+            return self.busy(self.get_response(request))
+        try:
+            profile = profiling.Profile()
+            profile.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.stop()
+            return self.finish(request, response, profile, mode)
+        finally:
+            profiling.release()
+
+    async def __acall__(self, request):
+        mode = profiling.requested_mode(request)
+        if mode is None or not await sync_to_async(may_profile)(request):
+            return await self.get_response(request)
+        if not profiling.try_acquire():
+            return self.busy(await self.get_response(request))
+        try:
+            # The event loop's thread; work handed to other threads shows up as waiting
+            profile = profiling.Profile()
+            profile.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profile.stop()
+            return await sync_to_async(self.finish)(request, response, profile, mode)
+        finally:
+            profiling.release()
+
+    def busy(self, response):
+        response[profiling.HEADER] = 'busy'
+        return response
+
+    def finish(self, request, response, profile, mode):
+        stats = metrics.current_stats()
+        title = f"{request.method} {request.get_full_path()}, status {response.status_code}"
+        if stats is not None:
+            title += f", {stats.queries} queries in {stats.seconds * 1000:.1f} ms"
+        report = profile.report(title)
+        if mode == 'inline':
+            return HttpResponse(
+                report, content_type='text/plain; charset=utf-8',
+                headers={'X-Profile-Status': str(response.status_code)},
+            )
+        response['X-Profile-Report'] = profile.save(report)
+        return response
+
+
+class SlowRequestMiddleware:
+    """
+    Log requests running longer than ``SLOW_REQUEST_SECONDS``.
+
+    See ``api.services.watchdog``. Place it after ``MetricsMiddleware`` so
+    the log includes the request's queries. ``SLOW_REQUEST_SECONDS = None``
+    turns the watchdog off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.enabled = bool(settings.SLOW_REQUEST_SECONDS)
+        if self.enabled:
+            watchdog.start()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        request_id = watchdog.begin(request)
+        status = None
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            watchdog.end(request_id, request, status)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        request_id = watchdog.begin(request)
+        status = None
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            watchdog.end(request_id, request, status)
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:45
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_account_totals(apps, schema_editor):
+    Account = apps.get_model('api', 'Account')
+    Transaction = apps.get_model('api', 'Transaction')
+
+    totals = defaultdict(lambda: {'income': Decimal('0'), 'expense': Decimal('0')})
+    rows = (
+        Transaction.objects.order_by()
+        .values('account_id', 'transaction_type')
+        .annotate(total=Sum('amount'))
+    )
+    for row in rows:
+        totals[row['account_id']][row['transaction_type']] = row['total'] or Decimal('0')
+
+    batch = []
+    for account in Account.objects.order_by('pk').iterator(chunk_size=1000):
+        account.total_income = totals[account.pk]['income']
+        account.total_expense = totals[account.pk]['expense']
+        account.balance = account.initial + account.total_income - account.total_expense
+        batch.append(account)
+        if len(batch) >= 1000:
+            Account.objects.bulk_update(batch, ['balance', 'total_income', 'total_expense'])
+            batch = []
+    if batch:
+        Account.objects.bulk_update(batch, ['balance', 'total_income', 'total_expense'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_add_created_at_to_transaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='total_expense',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='total_income',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15),
+        ),
+        migrations.RunPython(backfill_account_totals, migrations.RunPython.noop),
+    ]
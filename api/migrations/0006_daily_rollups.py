@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+KEY_FIELDS = ('user_id', 'date', 'category_id', 'account_id', 'transaction_type')
+
+
+def build_rollups(apps, schema_editor):
+    DailyRollup = apps.get_model('api', 'DailyRollup')
+    Transaction = apps.get_model('api', 'Transaction')
+
+    rows = (
+        Transaction.objects.order_by()
+        .values(*KEY_FIELDS)
+        .annotate(amount=Sum('amount'), count=Count('id'))
+    )
+    batch = []
+    for row in rows.iterator():
+        batch.append(DailyRollup(
+            total_amount=row['amount'],
+            transaction_count=row['count'],
+            **{field: row[field] for field in KEY_FIELDS}
+        ))
+        if len(batch) >= 1000:
+            DailyRollup.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        DailyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_account_balance_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='api.account')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'date', 'category', 'account', 'transaction_type')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='import_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('account', 'import_hash'), name='unique_account_import_hash'),
+        ),
+    ]
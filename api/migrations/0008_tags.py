@@ -0,0 +1,102 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def parse_tags(value):
+    # Lowercased, as tags were matched then; 0016 restores the spelling. Names
+    # too long for a tag stay in the transaction's string without a link
+    names = []
+    for part in (value or '').split(','):
+        name = ' '.join(part.lower().split())
+        if name and len(name) <= 50 and name not in names:
+            names.append(name)
+    return names
+
+
+def migrate_tags(apps, schema_editor):
+    Tag = apps.get_model('api', 'Tag')
+    Transaction = apps.get_model('api', 'Transaction')
+    TransactionTag = apps.get_model('api', 'TransactionTag')
+
+    tagged = (
+        Transaction.objects.exclude(tags__isnull=True).exclude(tags='')
+        .order_by('pk').only('pk', 'user_id', 'tags')
+    )
+    last_pk = 0
+    while True:
+        batch = list(tagged.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        parsed = {txn.pk: parse_tags(txn.tags) for txn in batch}
+        wanted = {(txn.user_id, name) for txn in batch for name in parsed[txn.pk]}
+        Tag.objects.bulk_create(
+            [Tag(user_id=user_id, name=name) for user_id, name in wanted], ignore_conflicts=True
+        )
+        tag_ids = {
+            (tag.user_id, tag.name): tag.pk
+            for tag in Tag.objects.filter(
+                user_id__in={user_id for user_id, _ in wanted},
+                name__in={name for _, name in wanted},
+            )
+        }
+        TransactionTag.objects.bulk_create(
+            [
+                TransactionTag(transaction_id=txn.pk, tag_id=tag_ids[(txn.user_id, name)])
+                for txn in batch for name in parsed[txn.pk]
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_transaction_import_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_links', to='api.tag')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='api.transaction')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='transactions', through='api.TransactionTag', to='api.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='transactiontag',
+            index=models.Index(fields=['tag', 'transaction'], name='api_transac_tag_id_735fbc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='transactiontag',
+            unique_together={('transaction', 'tag')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together={('user', 'name')},
+        ),
+        migrations.RunPython(migrate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# The SQL as of this migration, later changes to api.search do not apply here
+SQLITE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_transaction_fts USING fts5("
+    "title, notes, tags, content='api_transaction', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+SQLITE_TRIGGERS = {
+    'api_transaction_fts_ai': (
+        "CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ai AFTER INSERT ON api_transaction BEGIN "
+        "INSERT INTO api_transaction_fts(rowid, title, notes, tags) VALUES (new.id, new.title, new.notes, new.tags); "
+        "END"
+    ),
+    'api_transaction_fts_ad': (
+        "CREATE TRIGGER IF NOT EXISTS api_transaction_fts_ad AFTER DELETE ON api_transaction BEGIN "
+        "INSERT INTO api_transaction_fts(api_transaction_fts, rowid, title, notes, tags) "
+        "VALUES ('delete', old.id, old.title, old.notes, old.tags); "
+        "END"
+    ),
+    'api_transaction_fts_au': (
+        "CREATE TRIGGER IF NOT EXISTS api_transaction_fts_au AFTER UPDATE OF title, notes, tags ON api_transaction BEGIN "
+        "INSERT INTO api_transaction_fts(api_transaction_fts, rowid, title, notes, tags) "
+        "VALUES ('delete', old.id, old.title, old.notes, old.tags); "
+        "INSERT INTO api_transaction_fts(rowid, title, notes, tags) VALUES (new.id, new.title, new.notes, new.tags); "
+        "END"
+    ),
+}
+POSTGRES_INDEX = [
+    "ALTER TABLE api_transaction ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(notes, '')), 'C')"
+    ") STORED",
+    "CREATE INDEX IF NOT EXISTS api_transaction_search_idx ON api_transaction USING GIN (search_vector)",
+]
+
+
+def install_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(SQLITE_TABLE)
+            except OperationalError:
+                # SQLite built without FTS5, search falls back to SearchFilter
+                return
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute("INSERT INTO api_transaction_fts(api_transaction_fts) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            for sql in POSTGRES_INDEX:
+                cursor.execute(sql)
+
+
+def uninstall_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute("DROP TABLE IF EXISTS api_transaction_fts")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS api_transaction_search_idx")
+            cursor.execute("ALTER TABLE api_transaction DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_tags'),
+    ]
+
+    operations = [
+        # SQLite: FTS5 table plus sync triggers, PostgreSQL: generated tsvector column plus GIN index
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:03
+
+import api.models.base.user
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_transaction_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=api.models.base.user.initial_data_version, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_user_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
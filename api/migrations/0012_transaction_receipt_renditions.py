@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_user_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='receipt_preview',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='receipt_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='receipt_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:14
+
+import core.storage
+from collections import Counter
+from django.db import migrations, models
+from django.db.models import Count
+import django.utils.timezone
+
+FILE_FIELDS = ('receipt', 'receipt_thumbnail', 'receipt_preview')
+
+
+def count_references(apps, schema_editor):
+    """Register the receipts stored before blobs were counted, with their current references"""
+    ReceiptBlob = apps.get_model('api', 'ReceiptBlob')
+    Transaction = apps.get_model('api', 'Transaction')
+
+    counts = Counter()
+    for field in FILE_FIELDS:
+        rows = Transaction.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        for row in rows.order_by().values(field).annotate(references=Count('pk')):
+            counts[row[field]] += row['references']
+    ReceiptBlob.objects.bulk_create(
+        [ReceiptBlob(name=name, refcount=count) for name, count in counts.items()], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_transaction_receipt_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='receipt',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.receipt_storage, upload_to='receipts/'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='receipt_preview',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=core.storage.receipt_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='receipt_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=core.storage.receipt_storage, upload_to=''),
+        ),
+        migrations.CreateModel(
+            name='ReceiptBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'updated_at'], name='api_receipt_refcoun_f42164_idx')],
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:08
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='result_file',
+            field=models.FileField(blank=True, null=True, storage=core.storage.job_storage, upload_to='jobs/'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:30
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def split_tags(value):
+    for part in (value or '').split(','):
+        name = ' '.join(part.split())
+        if name:
+            yield name
+
+
+def set_keys_and_spellings(apps, schema_editor):
+    """Key every tag by its old lowercased name and name it as it is first spelled in a transaction"""
+    Tag = apps.get_model('api', 'Tag')
+    Transaction = apps.get_model('api', 'Transaction')
+
+    spellings = {}
+    tagged = (
+        Transaction.objects.exclude(tags__isnull=True).exclude(tags='')
+        .order_by('pk').only('pk', 'user_id', 'tags')
+    )
+    last_pk = 0
+    while True:
+        batch = list(tagged.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for txn in batch:
+            for name in split_tags(txn.tags):
+                spellings.setdefault((txn.user_id, name.lower()), name)
+
+    tags = list(Tag.objects.all())
+    for tag in tags:
+        tag.key = tag.name
+        tag.name = spellings.get((tag.user_id, tag.key), tag.name)
+    Tag.objects.bulk_update(tags, ['key', 'name'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_job_storage'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='key',
+            field=models.CharField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        # Reversed, the keys go with their column and the spellings stay
+        migrations.RunPython(set_keys_and_spellings, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together={('user', 'key')},
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:19
+
+import api.models.transaction_search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_rank(weights):
+    def apply(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'api_transaction_fts'")
+            if cursor.fetchone() is None:
+                return
+            cursor.execute(
+                "INSERT INTO api_transaction_fts(api_transaction_fts, rank) VALUES ('rank', %s)", [f'bm25({weights})']
+            )
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_tag_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearch',
+            fields=[
+                ('transaction', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='api.transaction')),
+                ('document', api.models.transaction_search.SearchDocumentField(db_column='api_transaction_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_transaction_fts',
+                'managed': False,
+            },
+        ),
+        # The FTS5 rank column of a match: bm25() with a hit in the title counting most, then tags, then notes
+        migrations.RunPython(set_rank('10.0, 2.0, 5.0'), set_rank('')),
+    ]
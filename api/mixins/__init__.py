@@ -1,2 +1,2 @@
-
-
+from .keyset_pagination_mixin import KeysetPaginationMixin
+from .transaction_subresource_mixin import TransactionSubresourceMixin
@@ -0,0 +1,19 @@
+from api.pagination import KeysetPagination
+
+
+class KeysetPaginationMixin:
+    """Let clients opt into keyset pagination with ``?pagination=cursor`` or by passing a ``cursor``"""
+    keyset_pagination_class = KeysetPagination
+
+    def use_keyset_pagination(self):
+        request = getattr(self, 'request', None)
+        if request is None:
+            return False
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or bool(params.get(self.keyset_pagination_class.cursor_query_param))
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_keyset_pagination():
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
@@ -0,0 +1,39 @@
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.services.export import EXPORT_FORMATS, streaming_export
+
+
+class TransactionSubresourceMixin:
+    """
+    Serve ``/<resource>/{id}/transactions/`` exactly like ``/api/transactions/``.
+
+    The transactions are filtered, searched, ordered and paginated by the
+    transaction viewset itself, so every list parameter and both pagination
+    styles work on the sub-resource. ``?stream=true`` streams every matching
+    row instead (NDJSON, or CSV with ``export_format=csv``).
+    """
+    transaction_ordering = ['-date', '-id']
+    stream_query_param = 'stream'
+
+    def transaction_view(self, request):
+        # Imported here, the transaction views depend on api.mixins
+        from api.views.transaction_views import TransactionViewSet
+
+        return TransactionViewSet(
+            request=request, args=(), kwargs={}, format_kwarg=None, action='list',
+            ordering=self.transaction_ordering,
+        )
+
+    def transactions_response(self, request, basename, **lookup):
+        """Filtered list of the user's transactions matching ``lookup``, paginated or streamed"""
+        view = self.transaction_view(request)
+        queryset = view.filter_queryset(view.get_queryset().filter(**lookup))
+        if request.query_params.get(self.stream_query_param, '').lower() in ('1', 'true', 'yes'):
+            export_format = request.query_params.get('export_format', 'ndjson')
+            if export_format not in EXPORT_FORMATS:
+                return Response({
+                    'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return streaming_export(queryset, export_format, basename=basename)
+        return view.list_response(queryset, context=view.get_serializer_context())
@@ -2,3 +2,8 @@ from .base import User
 from .category import Category
 from .account import Account
 from .transaction import Transaction
+from .daily_rollup import DailyRollup
+from .tag import Tag, TransactionTag
+from .receipt_blob import ReceiptBlob
+from .job import Job
+from .transaction_search import TransactionSearch
@@ -1,9 +1,17 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 
 
 class Account(models.Model):
+    # Running totals maintained by api.services.ledger on every transaction write
+    BALANCE_FIELDS = ('balance', 'total_income', 'total_expense')
+
     title = models.CharField(max_length=200)
     initial = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    total_income = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    total_expense = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     user = models.ForeignKey('api.User', on_delete=models.CASCADE, related_name='accounts')
     
     class Meta:
@@ -13,15 +21,28 @@ class Account(models.Model):
     def __str__(self):
         return f"{self.title} ({self.user.name})"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.balance = (
+                Decimal(str(self.initial)) + Decimal(str(self.total_income)) - Decimal(str(self.total_expense))
+            )
+            return super().save(*args, **kwargs)
+        
+        # Never write the running totals back from a possibly stale instance,
+        # they are only ever changed with F() updates
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.BALANCE_FIELDS
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Account.objects.filter(pk=self.pk).update(
+                balance=models.F('initial') + models.F('total_income') - models.F('total_expense')
+            )
+        self.refresh_from_db(fields=self.BALANCE_FIELDS)
+    
     @property
     def current_balance(self):
-        """Calculate current balance based on initial amount and transactions"""
-        from api.models.transaction import Transaction
-        
-        transactions = Transaction.objects.filter(account=self)
-        income = transactions.filter(transaction_type='income').aggregate(
-            total=models.Sum('amount'))['total'] or 0
-        expenses = transactions.filter(transaction_type='expense').aggregate(
-            total=models.Sum('amount'))['total'] or 0
-        
-        return self.initial + income - expenses 
\ No newline at end of file
+        """Current balance based on initial amount and transactions"""
+        return self.balance 
\ No newline at end of file
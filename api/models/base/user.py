@@ -1,9 +1,18 @@
+import secrets
+
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models
 from api.models.base import UserMixin
 
 
+def initial_data_version():
+    # A random start keeps versions from repeating when ids are reused, e.g.
+    # after a database restore while a shared cache still holds old entries
+    return secrets.randbits(48)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password, is_superuser=False, **extra_fields):
@@ -25,8 +34,25 @@ class User(AbstractBaseUser, UserMixin, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name', ]
 
+    # IANA name such as 'Europe/Berlin'; periods like "today" and "this month"
+    # are resolved in it, see api.services.periods. Blank means TIME_ZONE
+    timezone = models.CharField(max_length=64, blank=True, default='')
+    # Bumped on every write to the user's transactions, accounts or categories,
+    # see api.services.response_cache
+    data_version = models.PositiveBigIntegerField(default=initial_data_version, editable=False)
+
     objects = UserManager()
     
+    def save(self, *args, **kwargs):
+        # Never write the data version back from a possibly stale instance,
+        # it is only ever changed with F() updates
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'data_version'
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def is_staff(self):
         return self.is_superuser
@@ -0,0 +1,20 @@
+from django.db import models
+
+from .transaction import Transaction
+
+
+class DailyRollup(models.Model):
+    """Per-day income/expense totals, maintained by api.services.ledger on every transaction write"""
+    user = models.ForeignKey('api.User', on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    category = models.ForeignKey('api.Category', on_delete=models.CASCADE, related_name='daily_rollups')
+    account = models.ForeignKey('api.Account', on_delete=models.CASCADE, related_name='daily_rollups')
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    total_amount = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user', 'date', 'category', 'account', 'transaction_type']
+    
+    def __str__(self):
+        return f"{self.date} {self.transaction_type} {self.total_amount} ({self.transaction_count})"
@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+
+from core.storage import job_storage
+
+
+class Job(models.Model):
+    """A unit of deferred work, run by the ``run_jobs`` worker command (see api.services.jobs)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+    
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey('api.User', on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    # Higher runs first
+    priority = models.IntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    progress = models.FloatField(default=0)
+    progress_message = models.CharField(max_length=200, blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/', storage=job_storage, blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    # Refreshed while the job runs; running jobs whose heartbeat stops are requeued
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+            models.Index(fields=['user', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+    
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATUSES
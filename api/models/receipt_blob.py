@@ -0,0 +1,19 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ReceiptBlob(models.Model):
+    """A content-addressed receipt object and how many transaction image fields point at it"""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last change of refcount or reuse by an upload; unreferenced blobs are only collected after a grace period
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class Tag(models.Model):
+    # Spelling the tag was first written with, trimmed and single-spaced
+    name = models.CharField(max_length=50)
+    # Lowercased name, tags are matched on it (see api.services.tags)
+    key = models.CharField(max_length=50)
+    user = models.ForeignKey('api.User', on_delete=models.CASCADE, related_name='tags')
+    
+    class Meta:
+        unique_together = ['user', 'key']
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class TransactionTag(models.Model):
+    transaction = models.ForeignKey('api.Transaction', on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey('api.Tag', on_delete=models.CASCADE, related_name='transaction_links')
+    
+    class Meta:
+        unique_together = ['transaction', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'transaction']),
+        ]
+    
+    def __str__(self):
+        return f"{self.transaction_id} - {self.tag_id}"
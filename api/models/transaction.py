@@ -1,4 +1,17 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
+
+from core.storage import receipt_storage
+
+
+class TransactionQuerySet(models.QuerySet):
+    
+    def delete(self):
+        from api.services import ledger, receipt_blobs
+        
+        with db_transaction.atomic(using=self.db):
+            ledger.record_bulk_delete(self)
+            receipt_blobs.release_transactions(self)
+            return super().delete()
 
 
 class Transaction(models.Model):
@@ -6,6 +19,13 @@ class Transaction(models.Model):
         ('income', 'Income'),
         ('expense', 'Expense'),
     ]
+    RECEIPT_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    # Rewritten by the receipt worker, so saves that did not change the receipt leave them alone
+    RECEIPT_FIELDS = ('receipt', 'receipt_thumbnail', 'receipt_preview', 'receipt_status')
     
     title = models.CharField(max_length=200)
     amount = models.DecimalField(max_digits=15, decimal_places=2)
@@ -28,16 +48,38 @@ class Transaction(models.Model):
     notes = models.TextField(blank=True, null=True)
     receipt = models.ImageField(
         upload_to='receipts/', 
+        storage=receipt_storage, 
         blank=True, 
         null=True
     )
+    # Written by api.services.receipts once the uploaded receipt has been processed
+    receipt_thumbnail = models.ImageField(storage=receipt_storage, blank=True, null=True, editable=False)
+    receipt_preview = models.ImageField(storage=receipt_storage, blank=True, null=True, editable=False)
+    receipt_status = models.CharField(
+        max_length=10, 
+        choices=RECEIPT_STATUS_CHOICES, 
+        blank=True, 
+        default='', 
+        editable=False
+    )
     tags = models.CharField(max_length=500, blank=True, null=True)
+    # Normalized rows mirroring the names in ``tags``, kept in sync on save
+    tag_set = models.ManyToManyField(
+        'api.Tag', 
+        through='api.TransactionTag', 
+        related_name='transactions', 
+        blank=True
+    )
     user = models.ForeignKey(
         'api.User', 
         on_delete=models.CASCADE, 
         related_name='transactions'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Content hash of (account, date, amount, normalized title) for rows loaded from bank statements
+    import_hash = models.CharField(max_length=64, blank=True, null=True, editable=False)
+    
+    objects = TransactionQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
@@ -48,14 +90,83 @@ class Transaction(models.Model):
             models.Index(fields=['user', 'category']),
             models.Index(fields=['user', 'account']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'import_hash'], name='unique_account_import_hash'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.amount} ({self.transaction_type})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored tags so saves that leave them alone skip the tag sync
+        instance._loaded_tags = instance.__dict__.get('tags', models.DEFERRED)
+        instance._loaded_receipt = instance.__dict__.get('receipt', models.DEFERRED)
+        return instance
+    
+    def _tags_changed(self, update_fields):
+        if update_fields is not None and 'tags' not in update_fields:
+            return False
+        return self._state.adding or self.__dict__.get('tags', models.DEFERRED) != getattr(self, '_loaded_tags', models.DEFERRED)
+    
+    def _receipt_changed(self, update_fields):
+        if update_fields is not None and 'receipt' not in update_fields:
+            return False
+        if 'receipt' not in self.__dict__:
+            return False
+        receipt = self.receipt
+        loaded = getattr(self, '_loaded_receipt', None) or ''
+        return (receipt.name or '') != loaded or (bool(receipt) and not receipt._committed)
+    
     def save(self, *args, **kwargs):
+        from api.services import ledger, receipt_blobs, receipts, tags as tag_service
+        
         # Ensure the user matches the category and account user
-        if self.category and self.category.user != self.user:
+        if self.category and self.category.user_id != self.user_id:
             raise ValueError("Category must belong to the same user")
-        if self.account and self.account.user != self.user:
+        if self.account and self.account.user_id != self.user_id:
             raise ValueError("Account must belong to the same user")
-        super().save(*args, **kwargs) 
\ No newline at end of file
+        
+        tags_changed = self._tags_changed(kwargs.get('update_fields'))
+        if tags_changed:
+            self.tags = tag_service.clean_tags(self.tags)
+        
+        # A new receipt starts without renditions until the worker has processed it
+        receipt_changed = self._receipt_changed(kwargs.get('update_fields'))
+        if receipt_changed:
+            self.receipt_thumbnail = None
+            self.receipt_preview = None
+            self.receipt_status = 'pending' if self.receipt else ''
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.RECEIPT_FIELDS)
+        elif not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.RECEIPT_FIELDS
+            ]
+        
+        # Keep the account totals in the same database transaction as the row
+        with db_transaction.atomic():
+            before = None if self._state.adding else ledger.load_snapshot(self.pk)
+            stored_receipts = [] if self._state.adding or not receipt_changed else receipt_blobs.stored_names(self.pk)
+            super().save(*args, **kwargs)
+            ledger.record_change(before, ledger.snapshot(self))
+            if tags_changed:
+                tag_service.sync_tags([self])
+                self._loaded_tags = self.tags
+            if receipt_changed:
+                receipt_blobs.record_change(stored_receipts, [self.receipt.name])
+                self._loaded_receipt = self.receipt.name or ''
+                if self.receipt:
+                    receipts.schedule(self.pk, self.receipt.name)
+    
+    def delete(self, *args, **kwargs):
+        from api.services import ledger, receipt_blobs
+        
+        with db_transaction.atomic():
+            before = ledger.load_snapshot(self.pk)
+            receipt_blobs.record_change(receipt_blobs.stored_names(self.pk), [])
+            result = super().delete(*args, **kwargs)
+            ledger.record_change(before, None)
+        return result
\ No newline at end of file
@@ -0,0 +1,38 @@
+from django.db import models
+
+from .transaction import Transaction
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden column of an FTS5 table that is named after the table, which ``match`` queries"""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class TransactionSearch(models.Model):
+    """
+    A row of the SQLite full-text index over transactions, see api.search.
+    
+    The FTS5 table is created by migration and kept in sync by triggers, the
+    model only exists to join it into transaction queries. ``rank`` is the
+    weighted bm25() of the row and is only defined in a ``document__match``
+    query; lower is more relevant.
+    """
+    transaction = models.OneToOneField(
+        Transaction, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_entry',
+    )
+    document = SearchDocumentField(db_column='api_transaction_fts')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'api_transaction_fts'
@@ -0,0 +1,140 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique (field, id) ordering.
+
+    Each page is fetched with ``WHERE (field, id) < (last field, last id)``
+    against an index instead of an OFFSET, so deep pages cost the same as
+    the first one, rows inserted while a client scrolls never shift a page,
+    and no COUNT(*) is run. Without an ``ordering`` parameter the field is
+    the first one the queryset is already ordered by.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    max_page_size = 100
+    default_ordering = '-created_at'
+    ordering_fields = ['created_at', 'date']
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset)
+        position = self.decode_cursor(request)
+
+        reverse = position is not None and position['reverse']
+        descending = self.descending != reverse
+        if position is not None:
+            queryset = queryset.filter(self.seek_condition(position, descending))
+        prefix = '-' if descending else ''
+        rows = list(queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return settings.REST_FRAMEWORK.get('PAGE_SIZE') or 10
+
+    def get_ordering(self, request, queryset=None):
+        ordering = (
+            request.query_params.get(self.ordering_query_param)
+            or self.queryset_ordering(queryset)
+            or self.default_ordering
+        )
+        ordering = ordering.split(',')[0].strip()
+        field = ordering.lstrip('-')
+        if field not in self.ordering_fields:
+            raise ValidationError({
+                self.ordering_query_param: f"Cursor pagination supports ordering by {', '.join(self.ordering_fields)}"
+            })
+        return field, ordering.startswith('-')
+
+    def queryset_ordering(self, queryset):
+        """First field the queryset is ordered by, the view's default ordering when the client sent none"""
+        if queryset is None:
+            return None
+        query = queryset.query
+        terms = query.order_by or (query.default_ordering and queryset.model._meta.ordering) or ()
+        return next((term for term in terms if isinstance(term, str)), None)
+
+    def seek_condition(self, position, descending):
+        lookup = 'lt' if descending else 'gt'
+        return (
+            Q(**{f'{self.field}__{lookup}': position['value']})
+            | Q(**{self.field: position['value'], f'id__{lookup}': position['id']})
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if data['f'] != self.field:
+                raise ValueError('Cursor was issued for a different ordering')
+            return {'value': data['v'], 'id': int(data['id']), 'reverse': bool(data.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        value = getattr(item, self.field)
+        data = {'f': self.field, 'v': value.isoformat(), 'id': item.id, 'r': int(reverse)}
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
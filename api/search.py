@@ -0,0 +1,167 @@
+"""
+Full-text search over transaction title, notes and tags.
+
+On SQLite the text is indexed in an external-content FTS5 table kept in sync
+by triggers and joined into queries through ``TransactionSearch``, on
+PostgreSQL in a generated ``tsvector`` column with a GIN index. Both are
+created by migration and searched with prefix queries ranked by relevance.
+Other databases, or a database without the index, fall back to DRF's
+``SearchFilter``.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connections, OperationalError, ProgrammingError
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from api.models import Transaction
+
+TABLE = Transaction._meta.db_table
+FTS_TABLE = 'api_transaction_fts'
+SEARCH_COLUMN = 'search_vector'
+TERM = re.compile(r'[^\W_]+')
+MAX_TERMS = 8
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, notes, tags) VALUES (new.id, new.title, new.notes, new.tags); "
+        f"END"
+    ),
+    f'{FTS_TABLE}_ad': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, notes, tags) "
+        f"VALUES ('delete', old.id, old.title, old.notes, old.tags); "
+        f"END"
+    ),
+    f'{FTS_TABLE}_au': (
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, notes, tags ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, notes, tags) "
+        f"VALUES ('delete', old.id, old.title, old.notes, old.tags); "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, notes, tags) VALUES (new.id, new.title, new.notes, new.tags); "
+        f"END"
+    ),
+}
+
+POSTGRES_MATCHES = f"SELECT id FROM {TABLE} WHERE {SEARCH_COLUMN} @@ to_tsquery('simple', %s)"
+POSTGRES_RANK = f"ts_rank({TABLE}.{SEARCH_COLUMN}, to_tsquery('simple', %s))"
+
+
+def search_terms(value):
+    """Words of a search string, lowercased and capped at MAX_TERMS"""
+    return TERM.findall((value or '').lower())[:MAX_TERMS]
+
+
+def ensure_search_index(connection):
+    """
+    Restore the SQLite sync triggers if a migration dropped them.
+
+    SQLite migrations that alter the transactions table rebuild it under a new
+    name, which silently drops every trigger on it.
+    """
+    if connection.vendor != 'sqlite' or not has_search_index(connection, refresh=True):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [TABLE]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if set(SQLITE_TRIGGERS) - existing:
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+@contextmanager
+def search_index_paused(connection):
+    """
+    Leave the SQLite full-text index out of a bulk load and rebuild it once afterwards.
+
+    The rebuild also covers rows other connections wrote meanwhile. On other
+    databases the index is maintained as usual.
+    """
+    paused = connection.vendor == 'sqlite' and has_search_index(connection, refresh=True)
+    if paused:
+        with connection.cursor() as cursor:
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    try:
+        yield
+    finally:
+        if paused:
+            ensure_search_index(connection)
+
+
+def has_search_index(connection, refresh=False):
+    """Whether the full-text index exists, checked once per connection"""
+    if refresh or getattr(connection, 'transaction_search_index', None) is None:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                found = cursor.fetchone() is not None
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s",
+                    [TABLE, SEARCH_COLUMN]
+                )
+                found = cursor.fetchone() is not None
+            else:
+                found = False
+        connection.transaction_search_index = found
+    return connection.transaction_search_index
+
+
+def full_text_search(queryset, terms):
+    """
+    Restrict a transaction queryset to rows matching every term as a word prefix.
+
+    On SQLite the index is inner joined once and the rank read from the join,
+    on PostgreSQL the matches are a ``pk__in`` subquery on the indexed column.
+    Either way the result composes with ``values()``, ordering and further
+    filters like any queryset. Adds a ``search_rank`` annotation where higher
+    means more relevant.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        # Terms are bare words, so quoting them is enough to escape FTS5 syntax
+        query = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_entry__document__match=query).annotate(
+            search_rank=-F('search_entry__rank')
+        )
+    query = ' & '.join(f'{term}:*' for term in terms)
+    return queryset.filter(pk__in=RawSQL(POSTGRES_MATCHES, [query])).annotate(
+        search_rank=RawSQL(POSTGRES_RANK, [query], output_field=FloatField())
+    )
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ``?search=`` backed by the transaction full-text index.
+
+    Every word must match the start of a word in the title, notes or tags.
+    Results are ordered by relevance unless the request asks for an ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        connection = connections[queryset.db]
+        try:
+            indexed = has_search_index(connection)
+        except (OperationalError, ProgrammingError):
+            indexed = False
+        if not indexed:
+            return super().filter_queryset(request, queryset, view)
+
+        value = request.query_params.get(self.search_param, '')
+        if not value.strip():
+            return queryset
+        terms = search_terms(value)
+        if not terms:
+            return queryset.none()
+        queryset = full_text_search(queryset, terms)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        return queryset
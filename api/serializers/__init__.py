@@ -1,4 +1,6 @@
 from .user_serializer import UserSerializer, UserListSerializer
 from .category_serializer import CategorySerializer, CategoryListSerializer
 from .account_serializer import AccountSerializer, AccountListSerializer
-from .transaction_serializer import TransactionSerializer, TransactionListSerializer
+from .transaction_serializer import TransactionSerializer, TransactionListSerializer, TransactionListRowSerializer, TransactionBulkSerializer, StatementImportSerializer
+from .tag_serializer import TagSerializer
+from .job_serializer import JobSerializer
\ No newline at end of file
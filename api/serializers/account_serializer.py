@@ -8,8 +8,8 @@ class AccountSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Account
-        fields = ['id', 'title', 'initial', 'user', 'current_balance']
-        read_only_fields = ['id', 'current_balance']
+        fields = ['id', 'title', 'initial', 'user', 'current_balance', 'total_income', 'total_expense']
+        read_only_fields = ['id', 'current_balance', 'total_income', 'total_expense']
     
     def validate_title(self, value):
         user = self.context['request'].user
@@ -23,5 +23,5 @@ class AccountListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Account
-        fields = ['id', 'title', 'initial', 'current_balance', 'user']
-        read_only_fields = ['id', 'current_balance'] 
\ No newline at end of file
+        fields = ['id', 'title', 'initial', 'current_balance', 'total_income', 'total_expense', 'user']
+        read_only_fields = ['id', 'current_balance', 'total_income', 'total_expense'] 
\ No newline at end of file
@@ -0,0 +1,39 @@
+from rest_framework import serializers
+from api.models import Job
+from api.services.jobs import USER_KINDS
+
+
+class JobSerializer(serializers.ModelSerializer):
+    result_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'priority', 'attempts', 'max_attempts', 'progress',
+            'progress_message', 'result', 'result_url', 'error', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'attempts', 'max_attempts', 'progress', 'progress_message', 'result',
+            'error', 'created_at', 'started_at', 'finished_at'
+        ]
+    
+    def get_result_url(self, obj):
+        if not obj.result_file or obj.status != 'succeeded':
+            return None
+        request = self.context.get('request')
+        url = f'/api/jobs/{obj.pk}/result/'
+        return request.build_absolute_uri(url) if request is not None else url
+    
+    def validate_kind(self, value):
+        if value not in USER_KINDS:
+            raise serializers.ValidationError(f"kind must be one of: {', '.join(sorted(USER_KINDS))}")
+        return value
+    
+    def validate_priority(self, value):
+        # Users can only lower the priority of their own jobs
+        return min(value, 0)
+    
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("params must be an object")
+        return value
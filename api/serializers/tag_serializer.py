@@ -0,0 +1,11 @@
+from rest_framework import serializers
+from api.models import Tag
+
+
+class TagSerializer(serializers.ModelSerializer):
+    transaction_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'transaction_count']
+        read_only_fields = ['id', 'name']
@@ -1,5 +1,16 @@
+from django.db import transaction as db_transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework.utils.serializer_helpers import ReturnList
 from api.models import Transaction, Category, Account
+from api.services.tags import TagError, clean_tags
+
+
+def validate_tag_string(value):
+    try:
+        return clean_tags(value)
+    except TagError as exc:
+        raise serializers.ValidationError(str(exc))
 
 
 class CategoryNestedSerializer(serializers.ModelSerializer):
@@ -23,19 +34,23 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = [
             'id', 'title', 'amount', 'transaction_type', 'category', 'category_detail',
-            'account', 'account_detail', 'date', 'notes', 'receipt', 'tags', 'user', 'created_at'
+            'account', 'account_detail', 'date', 'notes', 'receipt', 'receipt_thumbnail',
+            'receipt_preview', 'receipt_status', 'tags', 'user', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'receipt_thumbnail', 'receipt_preview', 'receipt_status']
+    
+    def validate_tags(self, value):
+        return validate_tag_string(value)
     
     def validate(self, data):
         user = self.context['request'].user
         
         # Validate category belongs to user
-        if 'category' in data and data['category'].user != user:
+        if 'category' in data and data['category'].user_id != user.id:
             raise serializers.ValidationError("Category must belong to the current user.")
         
         # Validate account belongs to user
-        if 'account' in data and data['account'].user != user:
+        if 'account' in data and data['account'].user_id != user.id:
             raise serializers.ValidationError("Account must belong to the current user.")
         
         return data
@@ -49,6 +64,160 @@ class TransactionListSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = [
             'id', 'title', 'amount', 'transaction_type', 'category', 'account',
-            'date', 'notes', 'receipt', 'tags', 'created_at'
+            'date', 'notes', 'receipt', 'receipt_thumbnail', 'receipt_preview', 'receipt_status',
+            'tags', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at'] 
\ No newline at end of file
+        read_only_fields = ['id', 'created_at'] 
+
+
+class TransactionListRowSerializer:
+    """
+    Read-only stand-in for ``TransactionListSerializer(many=True)``.
+    
+    Produces the same output from ``values_list`` rows (see ``rows_for``), so
+    listing a page costs one query and no model instances or bound fields.
+    """
+    columns = (
+        'id', 'title', 'amount', 'transaction_type', 'category_id', 'category__title',
+        'account_id', 'account__title', 'date', 'notes', 'receipt', 'receipt_thumbnail',
+        'receipt_preview', 'receipt_status', 'tags', 'created_at'
+    )
+    # Unbound fields, used only for their value formatting
+    amount_field = serializers.DecimalField(max_digits=15, decimal_places=2)
+    date_field = serializers.DateField()
+    created_at_field = serializers.DateTimeField()
+    receipt_storage = Transaction._meta.get_field('receipt').storage
+    
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+    
+    @classmethod
+    def rows_for(cls, queryset):
+        return queryset.values_list(*cls.columns, named=True)
+    
+    def receipt_url(self, name):
+        if not name:
+            return None
+        if not api_settings.UPLOADED_FILES_USE_URL:
+            return name
+        url = self.receipt_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+    
+    @property
+    def data(self):
+        amount = self.amount_field.to_representation
+        date = self.date_field.to_representation
+        created_at = self.created_at_field.to_representation
+        return ReturnList([
+            {
+                'id': row.id,
+                'title': row.title,
+                'amount': amount(row.amount),
+                'transaction_type': row.transaction_type,
+                'category': {'id': row.category_id, 'title': row.category__title},
+                'account': {'id': row.account_id, 'title': row.account__title},
+                'date': date(row.date),
+                'notes': row.notes,
+                'receipt': self.receipt_url(row.receipt),
+                'receipt_thumbnail': self.receipt_url(row.receipt_thumbnail),
+                'receipt_preview': self.receipt_url(row.receipt_preview),
+                'receipt_status': row.receipt_status,
+                'tags': row.tags,
+                'created_at': created_at(row.created_at),
+            } for row in self.rows
+        ], serializer=self)
+
+
+class TransactionBulkListSerializer(serializers.ListSerializer):
+    """Validates a batch of transactions with one ownership lookup per model and inserts them together"""
+    
+    def _referenced_ids(self, data, field):
+        ids = set()
+        for item in data:
+            try:
+                ids.add(int(item.get(field)))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return ids
+    
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            user = self.context['request'].user
+            self.categories = Category.objects.filter(
+                user=user, pk__in=self._referenced_ids(data, 'category')).in_bulk()
+            self.accounts = Account.objects.filter(
+                user=user, pk__in=self._referenced_ids(data, 'account')).in_bulk()
+        return super().to_internal_value(data)
+    
+    def create(self, validated_data):
+        from api.services import ledger, tags as tag_service
+        
+        transactions = [Transaction(**item) for item in validated_data]
+        for txn in transactions:
+            txn.tags = tag_service.clean_tags(txn.tags)
+        with db_transaction.atomic():
+            transactions = Transaction.objects.bulk_create(transactions, batch_size=500)
+            ledger.record_bulk_create(transactions)
+            tag_service.sync_tags(transactions, created=True)
+        return transactions
+
+
+class TransactionBulkSerializer(serializers.ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    category = serializers.IntegerField()
+    account = serializers.IntegerField()
+    
+    class Meta:
+        model = Transaction
+        fields = [
+            'id', 'title', 'amount', 'transaction_type', 'category', 'account',
+            'date', 'notes', 'tags', 'user', 'created_at'
+        ]
+        read_only_fields = ['id', 'created_at']
+        list_serializer_class = TransactionBulkListSerializer
+    
+    def validate_category(self, value):
+        category = self.parent.categories.get(value)
+        if category is None:
+            raise serializers.ValidationError("Category must belong to the current user.")
+        return category
+    
+    def validate_account(self, value):
+        account = self.parent.accounts.get(value)
+        if account is None:
+            raise serializers.ValidationError("Account must belong to the current user.")
+        return account
+    
+    def validate_tags(self, value):
+        return validate_tag_string(value)
+
+
+class StatementImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    account = serializers.IntegerField()
+    category = serializers.IntegerField(required=False, help_text="Category for rows without one")
+    statement_format = serializers.ChoiceField(choices=['csv', 'ofx'], required=False)
+    date_format = serializers.CharField(required=False, allow_blank=True, help_text="strptime format, e.g. %d/%m/%Y")
+    decimal_separator = serializers.ChoiceField(
+        choices=['.', ','], required=False, help_text="Decimal separator of the amounts, guessed per row by default"
+    )
+    
+    def validate_account(self, value):
+        account = Account.objects.filter(pk=value, user=self.context['request'].user).first()
+        if account is None:
+            raise serializers.ValidationError("Account must belong to the current user.")
+        return account
+    
+    def validate_category(self, value):
+        category = Category.objects.filter(pk=value, user=self.context['request'].user).first()
+        if category is None:
+            raise serializers.ValidationError("Category must belong to the current user.")
+        return category
+    
+    def validate(self, data):
+        if 'statement_format' not in data:
+            name = data['file'].name.lower()
+            data['statement_format'] = 'ofx' if name.endswith(('.ofx', '.qfx')) else 'csv'
+        return data
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from api.models import User
+from api.services.periods import PeriodError, get_timezone
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -8,9 +9,17 @@ class UserSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = User
-        fields = ['id', 'name', 'email', 'password']
+        fields = ['id', 'name', 'email', 'password', 'timezone']
         read_only_fields = ['id']
     
+    def validate_timezone(self, value):
+        if value:
+            try:
+                get_timezone(value)
+            except PeriodError as exc:
+                raise serializers.ValidationError(str(exc))
+        return value
+    
     def create(self, validated_data):
         password = validated_data.pop('password')
         email = validated_data.pop('email')
@@ -0,0 +1,85 @@
+"""
+Single-pass aggregation of income and expense totals.
+
+Callers describe the periods (or any other slices) they need as named ``Q``
+buckets and get the income, expense and count totals for all of them from a
+single query built out of filtered aggregates, instead of one SUM or COUNT
+query per bucket and transaction type. Works on daily rollups (the default)
+or directly on transactions with ``amount_field='amount', count_field=None``.
+``annotate_bucket_totals`` does the same per row of a grouped queryset, such
+as categories joined to their rollups.
+"""
+from django.db.models import Count, Q, Sum
+
+
+def _measures(condition, amount_field, count_field, type_field='transaction_type', pk_field='pk'):
+    income = condition & Q(**{type_field: 'income'})
+    expense = condition & Q(**{type_field: 'expense'})
+    if count_field:
+        income_count = Sum(count_field, filter=income)
+        expense_count = Sum(count_field, filter=expense)
+    else:
+        income_count = Count(pk_field, filter=income)
+        expense_count = Count(pk_field, filter=expense)
+    return {
+        'income': Sum(amount_field, filter=income),
+        'expenses': Sum(amount_field, filter=expense),
+        'income_count': income_count,
+        'expense_count': expense_count,
+    }
+
+
+def _totals(row, prefix=''):
+    income = row[f'{prefix}income'] or 0
+    expenses = row[f'{prefix}expenses'] or 0
+    income_count = row[f'{prefix}income_count'] or 0
+    expense_count = row[f'{prefix}expense_count'] or 0
+    return {
+        'income': income,
+        'expenses': expenses,
+        'net': income - expenses,
+        'count': income_count + expense_count,
+        'income_count': income_count,
+        'expense_count': expense_count,
+    }
+
+
+def bucket_totals(queryset, buckets, amount_field='total_amount', count_field='transaction_count'):
+    """
+    Compute totals for every bucket in one query.
+
+    ``buckets`` maps a name to the ``Q`` condition selecting its rows; the
+    result maps the same names to dicts with ``income``, ``expenses``, ``net``,
+    ``count``, ``income_count`` and ``expense_count``. Narrow ``queryset`` to
+    the union of the buckets first so the scan stays on the date index.
+    """
+    aggregates = {}
+    for index, condition in enumerate(buckets.values()):
+        for key, expression in _measures(condition, amount_field, count_field).items():
+            aggregates[f'b{index}_{key}'] = expression
+    row = queryset.aggregate(**aggregates)
+    return {name: _totals(row, f'b{index}_') for index, name in enumerate(buckets)}
+
+
+def annotate_bucket_totals(queryset, buckets, relation, amount_field='total_amount',
+                           count_field='transaction_count'):
+    """
+    Annotate every row of ``queryset`` with the totals of its related rows per bucket.
+
+    ``relation`` is the related name (or ``FilteredRelation`` alias) of the
+    rows to aggregate and the ``Q`` conditions in ``buckets`` refer to fields
+    through it. Bucket names must be valid identifiers; read the totals of a
+    row back with ``row_totals(row, name)``.
+    """
+    annotations = {}
+    for name, condition in buckets.items():
+        for key, expression in _measures(
+                condition, f'{relation}__{amount_field}', count_field and f'{relation}__{count_field}',
+                type_field=f'{relation}__transaction_type', pk_field=f'{relation}__pk').items():
+            annotations[f'{name}_{key}'] = expression
+    return queryset.annotate(**annotations)
+
+
+def row_totals(row, name):
+    """Totals of one bucket from a row annotated by ``annotate_bucket_totals``"""
+    return _totals(row, f'{name}_')
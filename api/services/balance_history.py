@@ -0,0 +1,128 @@
+"""
+Account balance history computed from daily rollups.
+
+The balance before the requested range comes from one aggregate over the
+earlier rollup rows, and the balance at the end of every day, week or month
+bucket from a single grouped query with a running ``SUM() OVER`` window, so
+the cost depends on the number of buckets rather than on the number of
+transactions in the range.
+"""
+from dataclasses import dataclass
+
+from django.db.models import Case, DecimalField, F, Func, Q, Sum, When, Window
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from api.models import DailyRollup
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+DEFAULT_MAX_POINTS = 366
+MAX_POINTS_LIMIT = 5000
+
+AMOUNT = DecimalField(max_digits=17, decimal_places=2)
+SIGNED_AMOUNT = Case(
+    When(transaction_type='income', then=F('total_amount')),
+    default=-F('total_amount'),
+    output_field=AMOUNT,
+)
+
+
+class RunningSum(Func):
+    """``SUM(expression)`` usable over an already aggregated expression inside a window"""
+    function = 'SUM'
+    window_compatible = True
+    output_field = AMOUNT
+
+
+@dataclass
+class BalanceHistory:
+    opening_balance: object
+    granularity: str
+    points: list
+
+    @property
+    def closing_balance(self):
+        return self.points[-1]['balance'] if self.points else self.opening_balance
+
+
+def opening_balance(account, before):
+    """Balance of the account at the start of the day ``before``"""
+    row = DailyRollup.objects.filter(
+        user_id=account.user_id, account=account, date__lt=before
+    ).aggregate(net=Sum(SIGNED_AMOUNT))
+    return account.initial + (row['net'] or 0)
+
+
+def auto_granularity(period, max_points):
+    """Finest granularity whose bucket count over the period fits in ``max_points``"""
+    days = (period.end - period.start).days
+    if days <= max_points:
+        return 'day'
+    if days / 7 <= max_points:
+        return 'week'
+    return 'month'
+
+
+def balance_history(account, period, granularity=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    End-of-bucket balances of ``account`` over an ``api.services.periods.Period``.
+
+    Buckets without activity are left out, the balance is flat across them.
+    When there are more buckets than ``max_points``, runs of consecutive
+    buckets are merged into one point carrying their summed flows and the
+    balance at the end of the run, so every returned balance stays exact.
+    """
+    granularity = granularity or auto_granularity(period, max_points)
+    bucket = GRANULARITIES[granularity]('date')
+    rows = (
+        DailyRollup.objects
+        .filter(period.date_q(), user_id=account.user_id, account=account)
+        .annotate(bucket=bucket)
+        .values('bucket')
+        .annotate(
+            income=Sum('total_amount', filter=Q(transaction_type='income')),
+            expenses=Sum('total_amount', filter=Q(transaction_type='expense')),
+            count=Sum('transaction_count'),
+        )
+        # Annotated separately so the window is not added to the GROUP BY
+        .annotate(running=Window(RunningSum(Sum(SIGNED_AMOUNT)), order_by=F('bucket').asc()))
+        .order_by('bucket')
+    )
+
+    opening = opening_balance(account, period.start)
+    points = [
+        {
+            'date': row['bucket'],
+            'balance': opening + row['running'],
+            'income': row['income'] or 0,
+            'expenses': row['expenses'] or 0,
+            'net': (row['income'] or 0) - (row['expenses'] or 0),
+            'count': row['count'] or 0,
+        }
+        for row in rows
+    ]
+    return BalanceHistory(opening, granularity, downsample(points, max_points))
+
+
+def downsample(points, max_points):
+    """Merge runs of consecutive points so that at most ``max_points`` remain"""
+    if len(points) <= max_points:
+        return points
+    size = -(-len(points) // max_points)
+    # Align the runs on the last point so the closing balance is always returned
+    first = len(points) % size or size
+    runs = [points[:first]] + [points[i:i + size] for i in range(first, len(points), size)]
+    return [
+        {
+            'date': run[0]['date'],
+            'balance': run[-1]['balance'],
+            'income': sum(point['income'] for point in run),
+            'expenses': sum(point['expenses'] for point in run),
+            'net': sum(point['net'] for point in run),
+            'count': sum(point['count'] for point in run),
+        }
+        for run in runs
+    ]
@@ -0,0 +1,208 @@
+"""
+Dashboard sections.
+
+Each section of the dashboard is a function of the user and the requested
+periods that runs its own queries and returns plain data. The synchronous
+views call them one after another; the async views hand them to a bounded
+pool of ``DASHBOARD_WORKERS`` threads, each with its own database
+connection, so a response takes about as long as its slowest section and
+the event loop never waits on the database.
+
+Django's async ORM methods all run on one shared thread per request, which
+would serialize the sections again, so the pool runs the sync ORM instead.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Sum
+
+from api.models import Account, Transaction
+from api.services.aggregation import bucket_totals
+from api.services.periods import local_today, recent_months, resolve_period, user_timezone
+from api.services.rollups import rollups_for
+
+DASHBOARD_PERIODS = ('today', 'week', 'month', 'year')
+TREND_MONTHS = 6
+RECENT_TRANSACTIONS = 10
+TOP_CATEGORIES = 5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class DashboardPeriods:
+    name: str
+    current: object
+    trend_months: tuple
+
+
+def dashboard_periods(user, name):
+    """The requested period (``month`` unless one of ``DASHBOARD_PERIODS``) and the trend months"""
+    tz = user_timezone(user)
+    today = local_today(tz)
+    current = resolve_period(name if name in DASHBOARD_PERIODS else 'month', tz, today)
+    return DashboardPeriods(name, current, tuple(recent_months(TREND_MONTHS, tz, today)))
+
+
+def totals(user, periods):
+    """Period totals and the monthly trend in a single query"""
+    buckets = {'period': periods.current.date_q()}
+    for month in periods.trend_months:
+        buckets[month.start] = month.date_q()
+    return bucket_totals(rollups_for(user, periods.current.span(*periods.trend_months)), buckets)
+
+
+def category_breakdown(user, periods):
+    """Expenses of the period per category, largest first"""
+    return list(
+        rollups_for(user, periods.current).filter(transaction_type='expense')
+        .values('category__title')
+        .annotate(total=Sum('total_amount'), count=Sum('transaction_count'))
+        .order_by('-total')
+    )
+
+
+def account_summary(user, periods):
+    return [
+        {
+            'id': account.id,
+            'title': account.title,
+            'initial_balance': account.initial,
+            'current_balance': account.current_balance,
+            'change': account.current_balance - account.initial
+        } for account in Account.objects.filter(user=user)
+    ]
+
+
+def recent_transactions(user, periods):
+    rows = Transaction.objects.filter(user=user).select_related('category', 'account').order_by('-date')
+    return [
+        {
+            'id': t.id,
+            'title': t.title,
+            'amount': t.amount,
+            'transaction_type': t.transaction_type,
+            'category': t.category.title,
+            'account': t.account.title,
+            'date': t.date
+        } for t in rows[:RECENT_TRANSACTIONS]
+    ]
+
+
+DASHBOARD_SECTIONS = {
+    'totals': totals,
+    'category_breakdown': category_breakdown,
+    'account_summary': account_summary,
+    'recent_transactions': recent_transactions,
+}
+
+
+def build_dashboard(periods, sections):
+    """The dashboard response from the results of ``DASHBOARD_SECTIONS``"""
+    period_totals = sections['totals']
+    accounts = sections['account_summary']
+    breakdown = sections['category_breakdown']
+    return {
+        'period': {
+            'type': periods.name,
+            'start_date': periods.current.start,
+            'end_date': periods.current.last_day
+        },
+        'summary': {
+            'total_income': period_totals['period']['income'],
+            'total_expenses': period_totals['period']['expenses'],
+            'net_amount': period_totals['period']['net'],
+            'transaction_count': period_totals['period']['count'],
+            'total_account_balance': sum(account['current_balance'] for account in accounts)
+        },
+        'category_breakdown': breakdown,
+        'account_summary': accounts,
+        'recent_transactions': sections['recent_transactions'],
+        # Oldest month first
+        'monthly_trend': [
+            {
+                'month': month.start.strftime('%Y-%m'),
+                'income': period_totals[month.start]['income'],
+                'expenses': period_totals[month.start]['expenses'],
+                'net': period_totals[month.start]['net']
+            } for month in periods.trend_months
+        ],
+        'top_categories': [
+            {'category__title': row['category__title'], 'total': row['total']}
+            for row in breakdown[:TOP_CATEGORIES]
+        ]
+    }
+
+
+def period_stats(user):
+    """Today's, this week's and this month's totals in a single query"""
+    tz = user_timezone(user)
+    now = local_today(tz)
+    today = resolve_period('today', tz, now)
+    week = resolve_period('week', tz, now)
+    month = resolve_period('month', tz, now)
+    totals = bucket_totals(
+        rollups_for(user, week.span(month)),
+        {
+            'today': today.date_q(),
+            'week': week.date_q(),
+            'month': month.date_q(),
+        }
+    )
+    return {
+        period: {
+            'income': period_totals['income'],
+            'expenses': period_totals['expenses'],
+            'net': period_totals['net'],
+            'count': period_totals['count']
+        } for period, period_totals in totals.items()
+    }
+
+
+def run_sections(sections, *args):
+    """Run the sections one after another; returns their results by name"""
+    return {name: section(*args) for name, section in sections.items()}
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DASHBOARD_WORKERS, thread_name_prefix='dashboard'
+            )
+        return _executor
+
+
+def _run_in_worker(section, args):
+    close_old_connections()
+    try:
+        return section(*args)
+    finally:
+        # Pool threads serve many requests, never leave a connection past its CONN_MAX_AGE
+        close_old_connections()
+
+
+async def run_in_pool(func, *args):
+    """Await ``func(*args)`` run on the dashboard pool"""
+    if not settings.DASHBOARD_WORKERS:
+        # Inline on the request's own thread and connection, one call at a time
+        return await sync_to_async(func)(*args)
+    loop = asyncio.get_running_loop()
+    # In the caller's context, so the request's query metrics include the section's queries
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), context.run, _run_in_worker, func, args)
+
+
+async def gather_sections(sections, *args):
+    """Run the sections concurrently on the dashboard pool; returns their results by name"""
+    names = list(sections)
+    results = await asyncio.gather(*(run_in_pool(sections[name], *args) for name in names))
+    return dict(zip(names, results))
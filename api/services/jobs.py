@@ -0,0 +1,360 @@
+"""
+Database-backed job queue.
+
+Jobs are rows of ``api.models.Job``, created with ``enqueue`` and run by
+``python manage.py run_jobs`` workers. A worker claims the next queued job
+(highest priority, then oldest) with a compare-and-set ``UPDATE ... WHERE
+status = 'queued'``, so any number of workers can share the queue on any
+database without locking the table. Users with ``JOB_USER_CONCURRENCY``
+running jobs are skipped until one finishes. Failed jobs are retried with an
+exponential backoff up to ``max_attempts``; jobs whose worker stopped
+sending heartbeats are requeued, which counts as an attempt. While a handler
+runs, a thread of the worker sends a heartbeat every quarter of
+``JOB_TIMEOUT`` on its own connection, so long handlers that keep their
+writes in one transaction are not taken for dead.
+
+Handlers are registered by kind with ``@handler`` and called with the job and
+a ``Progress`` reporter; they return a JSON-serializable result. Jobs that
+work on an uploaded file name it in ``params['upload']``, staged with
+``stage_upload`` on ``JOB_STORAGE`` and deleted once the job has finished.
+Result files and uploads get random names.
+"""
+import logging
+import os
+import secrets
+import socket
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection
+from django.db.models import Count, F
+from django.http import QueryDict
+from django.utils import timezone
+
+from api.models import Account, Job
+from core.storage import job_storage
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+# Kinds users may enqueue through the API, the rest are for operators
+USER_KINDS = set()
+CLAIM_CANDIDATES = 10
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job was cancelled while running"""
+
+
+def handler(kind, user_facing=True):
+    """Register the decorated function as the handler of ``kind`` jobs"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        if user_facing:
+            USER_KINDS.add(kind)
+        return func
+    return decorator
+
+
+def enqueue(kind, params=None, user=None, priority=0, max_attempts=3):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return Job.objects.create(
+        kind=kind, params=params or {}, user=user, priority=priority, max_attempts=max_attempts
+    )
+
+
+def stage_upload(file):
+    """Store an uploaded file for a job under a random name; returns the name for ``params['upload']``"""
+    return job_storage().save(f'imports/{secrets.token_hex(16)}', file)
+
+
+def discard_upload(job):
+    if job.params.get('upload'):
+        job_storage().delete(job.params['upload'])
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Progress:
+    """Progress reporter handed to handlers; doubles as the job's heartbeat"""
+    interval = 1.0
+
+    def __init__(self, job):
+        self.job = job
+        self.last_write = 0
+
+    def __call__(self, done, total=None, message='', force=False):
+        now = time.monotonic()
+        if not force and now - self.last_write < self.interval:
+            return
+        self.last_write = now
+        progress = min(done / total, 1.0) if total else 0
+        updated = Job.objects.filter(pk=self.job.pk, status='running').update(
+            progress=progress, progress_message=message[:200], heartbeat_at=timezone.now()
+        )
+        if not updated:
+            raise JobCancelled()
+
+
+class Heartbeat(threading.Thread):
+    """Keeps a running job's heartbeat fresh until stopped, outside the handler's transactions"""
+
+    def __init__(self, job):
+        super().__init__(name=f'job-heartbeat-{job.pk}', daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_TIMEOUT / 4):
+                try:
+                    Job.objects.filter(pk=self.job.pk, status='running', worker=self.job.worker).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except Exception:
+                    logger.exception("Heartbeat of job %s failed", self.job.pk)
+        finally:
+            connection.close()
+
+
+@contextmanager
+def heartbeat(job):
+    """Send heartbeats for ``job`` from a thread for the duration of the block"""
+    thread = Heartbeat(job)
+    thread.start()
+    try:
+        yield
+    finally:
+        thread.stopped.set()
+
+
+def requeue_stale(now=None):
+    """
+    Put back running jobs whose worker stopped sending heartbeats.
+
+    The lost run counts as an attempt; jobs out of attempts fail instead, so
+    a job that kills its worker every time is not retried forever. Returns
+    the number of jobs requeued or failed.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.JOB_TIMEOUT)
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=cutoff)
+    error = 'Worker stopped responding'
+    failed = stale.filter(attempts__gte=F('max_attempts') - 1).update(
+        status='failed', attempts=F('attempts') + 1, worker='', error=error, finished_at=now
+    )
+    requeued = stale.update(
+        status='queued', attempts=F('attempts') + 1, worker='', run_after=now, error=error
+    )
+    return failed + requeued
+
+
+def claim(worker=None):
+    """Claim the next runnable job for this worker, or return None"""
+    worker = worker or worker_name()
+    now = timezone.now()
+    busy_users = (
+        Job.objects.filter(status='running', user__isnull=False)
+        .values('user_id').annotate(running=Count('pk'))
+        .filter(running__gte=settings.JOB_USER_CONCURRENCY).values('user_id')
+    )
+    candidates = list(
+        Job.objects.filter(status='queued', run_after__lte=now)
+        .exclude(user_id__in=busy_users)
+        .order_by('-priority', 'run_after', 'pk')
+        .values_list('pk', 'user_id')[:CLAIM_CANDIDATES]
+    )
+    for pk, user_id in candidates:
+        claimed = Job.objects.filter(pk=pk, status='queued').update(
+            status='running', worker=worker, started_at=now, heartbeat_at=now, progress=0
+        )
+        if not claimed:
+            # Another worker got there first
+            continue
+        if user_id is not None and Job.objects.filter(
+                user_id=user_id, status='running').count() > settings.JOB_USER_CONCURRENCY:
+            # Lost a race on the user's limit, hand the job back
+            Job.objects.filter(pk=pk, status='running', worker=worker).update(
+                status='queued', worker='', started_at=None, heartbeat_at=None
+            )
+            continue
+        return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Run a claimed job and record its outcome"""
+    func = HANDLERS.get(job.kind)
+    progress = Progress(job)
+    try:
+        if func is None:
+            raise ValueError(f"No handler for job kind '{job.kind}'")
+        with heartbeat(job):
+            result = func(job, progress)
+    except JobCancelled:
+        logger.info("Job %s was cancelled while running", job.pk)
+        discard_upload(job)
+        return job
+    except Exception:
+        attempts = job.attempts + 1
+        error = traceback.format_exc(limit=20)
+        logger.exception("Job %s (%s) failed, attempt %s of %s", job.pk, job.kind, attempts, job.max_attempts)
+        if attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (attempts - 1)
+            Job.objects.filter(pk=job.pk, status='running').update(
+                status='queued', attempts=attempts, error=error, worker='',
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            Job.objects.filter(pk=job.pk, status='running').update(
+                status='failed', attempts=attempts, error=error, finished_at=timezone.now()
+            )
+    else:
+        Job.objects.filter(pk=job.pk, status='running').update(
+            status='succeeded', attempts=job.attempts + 1, result=result, progress=1.0,
+            finished_at=timezone.now(), error='',
+        )
+    job.refresh_from_db()
+    if job.finished:
+        # Retries still need it
+        discard_upload(job)
+    return job
+
+
+def run_next(worker=None):
+    """Claim and run one job; returns it, or None when nothing is runnable"""
+    job = claim(worker)
+    if job is not None:
+        run(job)
+    return job
+
+
+def cancel(job):
+    """Cancel a job that has not finished; running handlers stop at their next progress report"""
+    if job.status == 'queued' and Job.objects.filter(pk=job.pk, status='queued').update(
+            status='cancelled', finished_at=timezone.now()):
+        discard_upload(job)
+        return True
+    # The worker discards the upload of a running job when its handler stops
+    return bool(Job.objects.filter(pk=job.pk, status__in=['queued', 'running']).update(
+        status='cancelled', finished_at=timezone.now()
+    ))
+
+
+def delete_finished(older_than):
+    """Delete finished jobs, their result files and uploads"""
+    cutoff = timezone.now() - older_than
+    count = 0
+    for job in Job.objects.filter(status__in=Job.FINISHED_STATUSES, finished_at__lt=cutoff).iterator():
+        if job.result_file:
+            job.result_file.delete(save=False)
+        # Left behind by jobs whose worker died
+        discard_upload(job)
+        job.delete()
+        count += 1
+    return count
+
+
+@handler('transactions.export')
+def export_transactions(job, progress):
+    """Write the user's transactions matching the list parameters in ``params['filters']`` to a file"""
+    from api.services.export import iter_csv, iter_ndjson
+    from api.views.transaction_views import TransactionViewSet
+
+    export_format = job.params.get('export_format', 'csv')
+    filters = QueryDict(mutable=True)
+    for name, values in (job.params.get('filters') or {}).items():
+        filters.setlist(name, values if isinstance(values, list) else [values])
+    # The list view's own filter backends, as if the parameters came with a request
+    view = TransactionViewSet(
+        request=SimpleNamespace(user=job.user, query_params=filters),
+        args=(), kwargs={}, format_kwarg=None, action='list',
+    )
+    queryset = view.filter_queryset(view.get_queryset())
+    total = queryset.count()
+
+    lines = iter_csv(queryset) if export_format == 'csv' else iter_ndjson(queryset)
+    written = 0
+    with tempfile.TemporaryFile(mode='w+b') as buffer:
+        for chunk in lines:
+            buffer.write(chunk.encode('utf-8'))
+            written += chunk.count('\n')
+            progress(written, total + 1, 'Writing rows')
+        buffer.seek(0)
+        filename = f"transactions-{timezone.localdate():%Y%m%d}-{job.pk}.{export_format}"
+        # Downloaded as ``filename``, stored under a name that cannot be guessed
+        job.result_file.save(f'{secrets.token_hex(16)}.{export_format}', File(buffer), save=False)
+    Job.objects.filter(pk=job.pk).update(result_file=job.result_file.name)
+    return {'rows': total, 'export_format': export_format, 'filename': filename}
+
+
+@handler('statements.import', user_facing=False)
+def import_statement(job, progress):
+    """Import the statement uploaded to ``params['upload']`` into the user's account"""
+    from api.models import Category
+    from api.services.statement_import import StatementImporter, open_text, parse_statement, uncategorized
+
+    params = job.params
+    account = Account.objects.get(pk=params['account'], user=job.user)
+    category = None
+    if params.get('category'):
+        category = Category.objects.get(pk=params['category'], user=job.user)
+    importer = StatementImporter(job.user, account, category or uncategorized(job.user))
+    storage = job_storage()
+    size = storage.size(params['upload'])
+    errors = []
+    with storage.open(params['upload'], 'rb') as handle:
+        stream = open_text(handle)
+
+        def rows():
+            for row in parse_statement(
+                stream, params['statement_format'], errors,
+                params.get('date_format') or None, params.get('decimal_separator') or None,
+            ):
+                # Position of the buffered reads, close enough for progress
+                progress(handle.tell(), size, 'Importing rows')
+                yield row
+
+        try:
+            # A StatementError fails the job, retries skip the rows imported before
+            result = importer.run(rows(), errors)
+        finally:
+            stream.detach()
+    return result.as_dict()
+
+
+@handler('balances.rebuild')
+def rebuild_balances(job, progress):
+    """Recompute the stored totals of the user's accounts from their transactions"""
+    from api.services import ledger
+
+    account_ids = list(Account.objects.filter(user=job.user).order_by('pk').values_list('pk', flat=True))
+    corrected = 0
+    for index, account_id in enumerate(account_ids):
+        stored, expected = ledger.rebuild_account(account_id)
+        if stored != expected:
+            corrected += 1
+        progress(index + 1, len(account_ids), 'Rebuilding accounts')
+    return {'accounts': len(account_ids), 'corrected': corrected}
+
+
+@handler('rollups.rebuild')
+def rebuild_rollups(job, progress):
+    """Rebuild the user's daily rollups from their transactions"""
+    from api.services import rollups
+
+    progress(0, 1, 'Rebuilding rollups', force=True)
+    written = rollups.rebuild_for_user(
+        job.user_id, on_batch=lambda rows: progress(0, None, f'{rows} rollup rows written')
+    )
+    return {'rollup_rows': written}
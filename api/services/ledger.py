@@ -0,0 +1,157 @@
+"""
+Write-side bookkeeping for transactions.
+
+Every write to ``Transaction`` goes through ``record_change`` (single rows) or
+``record_bulk_create`` / ``record_bulk_delete`` (batches) inside the same
+database transaction as the write itself, so the denormalized values derived
+from the transaction history never drift from it.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from api.models import Account, Transaction
+from api.services import rollups
+from api.services.response_cache import bump_data_version
+
+SNAPSHOT_FIELDS = ('user_id', 'date', 'category_id', 'account_id', 'transaction_type', 'amount')
+
+
+def snapshot(txn):
+    """Capture the fields of a transaction that feed the derived totals"""
+    data = {field: getattr(txn, field) for field in SNAPSHOT_FIELDS}
+    data['date'] = Transaction._meta.get_field('date').to_python(data['date'])
+    data['amount'] = Transaction._meta.get_field('amount').to_python(data['amount'])
+    return data
+
+
+def load_snapshot(pk):
+    """Read and lock the stored state of a transaction, or None if it does not exist"""
+    return (
+        Transaction.objects.select_for_update()
+        .filter(pk=pk)
+        .values(*SNAPSHOT_FIELDS)
+        .first()
+    )
+
+
+def _signed_totals(rows, sign):
+    """Fold (account_id, transaction_type, amount) rows into per-account [income, expense] deltas"""
+    deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for row in rows:
+        amount = Decimal(str(row['amount'])) * sign
+        if row['transaction_type'] == 'income':
+            deltas[row['account_id']][0] += amount
+        else:
+            deltas[row['account_id']][1] += amount
+    return deltas
+
+
+def _apply_account_deltas(deltas):
+    # Update in a stable order so concurrent writers lock accounts the same way
+    for account_id in sorted(deltas):
+        income, expense = deltas[account_id]
+        if not income and not expense:
+            continue
+        Account.objects.filter(pk=account_id).update(
+            total_income=F('total_income') + income,
+            total_expense=F('total_expense') + expense,
+            balance=F('balance') + income - expense,
+        )
+
+
+def _merge(*delta_maps):
+    merged = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for deltas in delta_maps:
+        for account_id, (income, expense) in deltas.items():
+            merged[account_id][0] += income
+            merged[account_id][1] += expense
+    return merged
+
+
+def _merge_rollups(*delta_maps):
+    merged = {}
+    for deltas in delta_maps:
+        for key, (amount, count) in deltas.items():
+            current = merged.setdefault(key, [Decimal('0'), 0])
+            current[0] += amount
+            current[1] += count
+    return merged
+
+
+def record_change(before, after):
+    """
+    Apply the effect of a single transaction write.
+
+    ``before`` is the stored snapshot prior to the write (None on create) and
+    ``after`` the snapshot once written (None on delete). Moving a transaction
+    between accounts, days or categories reverses it under the old key and
+    applies it under the new one.
+    """
+    old = [before] if before else []
+    new = [after] if after else []
+    # Accounts are always locked before rollups, see rollups.rebuild_for_user
+    _apply_account_deltas(_merge(_signed_totals(old, -1), _signed_totals(new, 1)))
+    rollups.apply_deltas(_merge_rollups(rollups.deltas_for(old, -1), rollups.deltas_for(new, 1)))
+    bump_data_version(*{row['user_id'] for row in old + new})
+
+
+def record_bulk_create(transactions):
+    """Apply the effect of transactions inserted with ``bulk_create``"""
+    rows = [snapshot(txn) for txn in transactions]
+    _apply_account_deltas(_signed_totals(rows, 1))
+    rollups.apply_deltas(rollups.deltas_for(rows, 1))
+    bump_data_version(*{row['user_id'] for row in rows})
+
+
+def record_bulk_delete(queryset, include_rollups=True):
+    """
+    Reverse the effect of every transaction in ``queryset`` before it is deleted.
+
+    Pass ``include_rollups=False`` when the matching rollup rows are removed by
+    the same cascade anyway.
+    """
+    rows = list(
+        queryset.order_by()
+        .values(*rollups.KEY_FIELDS)
+        .annotate(amount=Sum('amount'), count=Count('id'))
+    )
+    _apply_account_deltas(_signed_totals(rows, -1))
+    if include_rollups:
+        rollups.apply_deltas(rollups.deltas_for(rows, -1))
+    bump_data_version(*{row['user_id'] for row in rows})
+
+
+def expected_account_totals(account_id):
+    """Recompute (total_income, total_expense) for an account from its history"""
+    rows = (
+        Transaction.objects.filter(account_id=account_id)
+        .order_by()
+        .values('transaction_type')
+        .annotate(total=Sum('amount'))
+    )
+    totals = {row['transaction_type']: row['total'] or Decimal('0.00') for row in rows}
+    return totals.get('income', Decimal('0.00')), totals.get('expense', Decimal('0.00'))
+
+
+def rebuild_account(account_id, dry_run=False):
+    """
+    Recompute the stored totals of one account from its transaction history.
+
+    The account row is locked first, so writers that are mid-flight either
+    land before the recount or apply their delta on top of it afterwards.
+    Returns ``(stored, expected)`` as ``(balance, income, expense)`` tuples.
+    """
+    with transaction.atomic():
+        account = Account.objects.select_for_update().get(pk=account_id)
+        income, expense = expected_account_totals(account_id)
+        stored = (account.balance, account.total_income, account.total_expense)
+        expected = (account.initial + income - expense, income, expense)
+        if stored != expected and not dry_run:
+            Account.objects.filter(pk=account_id).update(
+                balance=expected[0], total_income=income, total_expense=expense
+            )
+            bump_data_version(account.user_id)
+    return stored, expected
@@ -0,0 +1,236 @@
+"""
+Per-process request metrics.
+
+``api.middleware.MetricsMiddleware`` records the latency of every request,
+the number and total time of its database queries, the size of its
+response and whether it came from the response cache, per URL pattern and
+method, with non-standard methods counted as ``OTHER``. ``render`` exposes the totals in the Prometheus text format.
+
+Recording takes no lock: each thread only writes to its own shard, which is
+registered once under a lock, and ``render`` adds the shards up. A scrape
+may see a request half recorded, never a lost one. The numbers belong to
+the process that serves the scrape, so run one metrics target per worker
+process.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+from django.conf import settings
+
+# Upper bounds of the latency histogram, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds of the queries per request histogram
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED = '<unmatched>'
+# Any other method a client sends shares one series instead of creating its own
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+OTHER_METHOD = 'OTHER'
+
+_shards = []
+_shards_lock = threading.Lock()
+_local = threading.local()
+# Query counters of the request being served, see ``track_queries``
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class QueryStats:
+    __slots__ = ('queries', 'seconds', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        # The last statements and their durations, for the slow request log
+        self.statements = deque(maxlen=settings.SLOW_REQUEST_MAX_QUERIES)
+
+
+class Series:
+    """Totals of one route and method in one shard"""
+
+    def __init__(self):
+        self.statuses = Counter()
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.queries = [0] * (len(QUERY_BUCKETS) + 1)
+        self.queries_sum = 0
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+        self.cache = Counter()
+
+
+def _series(route, method):
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = {}
+        with _shards_lock:
+            _shards.append(shard)
+    if method not in METHODS:
+        method = OTHER_METHOD
+    series = shard.get((route, method))
+    if series is None:
+        series = shard[(route, method)] = Series()
+    return series
+
+
+def track_queries(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's stats"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        stats.queries += 1
+        stats.seconds += seconds
+        stats.statements.append((sql, seconds))
+
+
+def install(connection, **kwargs):
+    """``connection_created`` receiver wrapping every new connection with ``track_queries``"""
+    if track_queries not in connection.execute_wrappers:
+        # First, so context managers that push and pop their own wrappers are unaffected
+        connection.execute_wrappers.insert(0, track_queries)
+
+
+def start_request():
+    """Count the queries of this context until ``end_request``; returns the stats and a token"""
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_stats():
+    """The query stats of the request being served, or None"""
+    return _current.get()
+
+
+def record(route, method, status, seconds, queries, db_seconds, response_bytes, cache=None):
+    series = _series(route, method)
+    series.statuses[status] += 1
+    series.latency[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    series.latency_sum += seconds
+    series.queries[bisect_left(QUERY_BUCKETS, queries)] += 1
+    series.queries_sum += queries
+    series.db_seconds += db_seconds
+    series.response_bytes += response_bytes
+    if cache:
+        series.cache[cache] += 1
+
+
+def record_bytes(route, method, response_bytes):
+    """Add the size of a streamed response once it has been sent"""
+    _series(route, method).response_bytes += response_bytes
+
+
+def totals():
+    """The series of all shards added up, by (route, method)"""
+    with _shards_lock:
+        shards = list(_shards)
+    merged = {}
+    for shard in shards:
+        # Copied in one step, a recording thread may add series meanwhile
+        for key, series in list(shard.items()):
+            total = merged.get(key)
+            if total is None:
+                total = merged[key] = Series()
+            total.statuses.update(series.statuses)
+            total.latency = [a + b for a, b in zip(total.latency, series.latency)]
+            total.latency_sum += series.latency_sum
+            total.queries = [a + b for a, b in zip(total.queries, series.queries)]
+            total.queries_sum += series.queries_sum
+            total.db_seconds += series.db_seconds
+            total.response_bytes += series.response_bytes
+            total.cache.update(series.cache)
+    return merged
+
+
+def reset():
+    with _shards_lock:
+        for shard in _shards:
+            shard.clear()
+
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram(lines, name, bounds, counts, total, labels):
+    cumulative = 0
+    for bound, count in zip(bounds, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=_number(bound))} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {_number(total)}')
+    lines.append(f'{name}_count{_labels(**labels)} {cumulative}')
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    merged = sorted(totals().items())
+    lines = [
+        '# HELP http_requests_total Requests served, by route, method and status.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (route, method), series in merged:
+        for status, count in sorted(series.statuses.items()):
+            lines.append(f'http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+    lines += [
+        '# HELP http_request_duration_seconds Time to respond, up to the start of a streamed body.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for (route, method), series in merged:
+        _histogram(
+            lines, 'http_request_duration_seconds', LATENCY_BUCKETS, series.latency, series.latency_sum,
+            {'route': route, 'method': method},
+        )
+
+    lines += [
+        '# HELP http_request_db_queries Database queries run per request.',
+        '# TYPE http_request_db_queries histogram',
+    ]
+    for (route, method), series in merged:
+        _histogram(
+            lines, 'http_request_db_queries', QUERY_BUCKETS, series.queries, series.queries_sum,
+            {'route': route, 'method': method},
+        )
+
+    lines += [
+        '# HELP http_request_db_seconds_total Time spent in database queries.',
+        '# TYPE http_request_db_seconds_total counter',
+    ]
+    for (route, method), series in merged:
+        lines.append(f'http_request_db_seconds_total{_labels(route=route, method=method)} {_number(series.db_seconds)}')
+
+    lines += [
+        '# HELP http_response_size_bytes_total Bytes of response bodies sent.',
+        '# TYPE http_response_size_bytes_total counter',
+    ]
+    for (route, method), series in merged:
+        lines.append(f'http_response_size_bytes_total{_labels(route=route, method=method)} {series.response_bytes}')
+
+    lines += [
+        '# HELP http_response_cache_total Responses of cached endpoints, by whether they came from the cache.',
+        '# TYPE http_response_cache_total counter',
+    ]
+    for (route, method), series in merged:
+        for result, count in sorted(series.cache.items()):
+            lines.append(f'http_response_cache_total{_labels(route=route, method=method, result=result)} {count}')
+    return '\n'.join(lines) + '\n'
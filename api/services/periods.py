@@ -0,0 +1,170 @@
+"""
+Period resolution shared by every date-filtered endpoint.
+
+A period is a half-open range of calendar days ``[start, end)`` in the user's
+timezone. ``date`` columns are filtered with ``date >= start AND date < end``
+and ``created_at`` with the aware datetimes of local midnight at both ends,
+so no column is wrapped in a cast and both are served by range seeks on the
+(user, date) and (user, created_at) indexes. Parts of a date that recur
+(a day of the month in any month, a weekday) cannot be a range; they are
+extracted in the user's timezone with ``local_part``.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, tzinfo
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python 3.8, where Django 4.2 installs the backport
+    from backports.zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Extract
+from django.utils import timezone
+
+PERIODS = (
+    'today', 'yesterday', 'week', 'last_week', 'month', 'last_month', 'quarter',
+    'year', 'last_year', 'last_7_days', 'last_30_days', 'last_90_days',
+)
+
+
+class PeriodError(ValueError):
+    """Raised for period names or date ranges that cannot be resolved"""
+
+
+@dataclass(frozen=True)
+class Period:
+    name: str
+    start: date
+    end: date  # Exclusive
+    tz: tzinfo
+
+    @property
+    def last_day(self):
+        return self.end - timedelta(days=1)
+
+    @property
+    def start_datetime(self):
+        return datetime.combine(self.start, time.min, tzinfo=self.tz)
+
+    @property
+    def end_datetime(self):
+        return datetime.combine(self.end, time.min, tzinfo=self.tz)
+
+    def date_q(self, field='date'):
+        return Q(**{f'{field}__gte': self.start, f'{field}__lt': self.end})
+
+    def datetime_q(self, field='created_at'):
+        return Q(**{f'{field}__gte': self.start_datetime, f'{field}__lt': self.end_datetime})
+
+    def previous(self):
+        """Period of the same length just before this one, whole months shifting by months"""
+        if self.start.day == 1 and self.end.day == 1:
+            months = relativedelta(self.end, self.start)
+            months = months.years * 12 + months.months
+            return Period(f'previous_{self.name}', self.start - relativedelta(months=months), self.start, self.tz)
+        return Period(f'previous_{self.name}', self.start - (self.end - self.start), self.start, self.tz)
+
+    def span(self, *others):
+        """Smallest period covering this one and ``others``"""
+        periods = (self,) + others
+        return Period('span', min(p.start for p in periods), max(p.end for p in periods), self.tz)
+
+
+def get_timezone(name):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise PeriodError(f"Unknown timezone '{name}'")
+
+
+def user_timezone(user):
+    """The user's timezone, or the server's if they have not set a valid one"""
+    name = getattr(user, 'timezone', '') or settings.TIME_ZONE
+    try:
+        return get_timezone(name)
+    except PeriodError:
+        return get_timezone(settings.TIME_ZONE)
+
+
+def local_today(tz):
+    return timezone.now().astimezone(tz).date()
+
+
+def days(name, start, last_day, tz):
+    """Period covering ``start`` through ``last_day`` inclusive"""
+    return Period(name, start, last_day + timedelta(days=1), tz)
+
+
+def month_of(day, tz, name='month'):
+    start = day.replace(day=1)
+    return Period(name, start, start + relativedelta(months=1), tz)
+
+
+def year_of(year, tz, name='year'):
+    return Period(name, date(year, 1, 1), date(year + 1, 1, 1), tz)
+
+
+def calendar_period(year, tz, month=None, day=None):
+    """Period of a year, a month of it, or one day of that month"""
+    if month is None:
+        return year_of(year, tz)
+    try:
+        start = date(year, month, day or 1)
+    except ValueError:
+        raise PeriodError(f"Invalid date {year}-{month}-{day}")
+    if day is None:
+        return month_of(start, tz)
+    return days('day', start, start, tz)
+
+
+def local_part(field, part, tz):
+    """Expression for a part of a datetime column (``'day'``, ``'month'``, ``'iso_week_day'``) in ``tz``"""
+    return Extract(field, part, tzinfo=tz)
+
+
+def resolve_period(name, tz, today=None):
+    """Resolve a named period relative to today in ``tz``"""
+    today = today or local_today(tz)
+    if name == 'today':
+        return days(name, today, today, tz)
+    if name == 'yesterday':
+        yesterday = today - timedelta(days=1)
+        return days(name, yesterday, yesterday, tz)
+    if name == 'week':
+        start = today - timedelta(days=today.weekday())
+        return Period(name, start, start + timedelta(days=7), tz)
+    if name == 'last_week':
+        start = today - timedelta(days=today.weekday() + 7)
+        return Period(name, start, start + timedelta(days=7), tz)
+    if name == 'month':
+        return month_of(today, tz, name)
+    if name == 'last_month':
+        return month_of(today - relativedelta(months=1), tz, name)
+    if name == 'quarter':
+        start = today.replace(month=((today.month - 1) // 3) * 3 + 1, day=1)
+        return Period(name, start, start + relativedelta(months=3), tz)
+    if name == 'year':
+        return year_of(today.year, tz, name)
+    if name == 'last_year':
+        return year_of(today.year - 1, tz, name)
+    if name in ('last_7_days', 'last_30_days', 'last_90_days'):
+        count = int(name.split('_')[1])
+        return days(name, today - timedelta(days=count), today, tz)
+    raise PeriodError(f"Unknown period '{name}'")
+
+
+def parse_date_range(start_date, end_date, tz, name='custom'):
+    """Period from inclusive YYYY-MM-DD bounds"""
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_day = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise PeriodError("Invalid date format. Use YYYY-MM-DD")
+    return days(name, start, last_day, tz)
+
+
+def recent_months(count, tz, today=None):
+    """The last ``count`` calendar months including the current one, oldest first"""
+    current = (today or local_today(tz)).replace(day=1)
+    return [month_of(current - relativedelta(months=i), tz) for i in reversed(range(count))]
@@ -0,0 +1,140 @@
+"""
+On-demand profiling of single requests.
+
+A request with an ``X-Profile`` header is run under ``cProfile`` and
+``tracemalloc`` when it comes from a superuser or carries a valid
+``X-Profile-Signature`` (see ``manage.py profile_signature``), so a slow
+request can be profiled in production as the user who reported it. With
+``X-Profile: inline`` the text report replaces the response; otherwise the
+report and the raw ``pstats`` dump (for snakeviz and the like) are saved to
+``PROFILE_STORAGE`` and named in the ``X-Profile-Report`` header.
+
+``tracemalloc`` traces the whole process, so one request is profiled at a
+time; a request arriving meanwhile is served unprofiled with
+``X-Profile: busy``. The CPU profile covers the thread that runs the
+request up to its response, not the streaming of the body.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+HEADER = 'X-Profile'
+SIGNATURE_HEADER = 'X-Profile-Signature'
+MODES = ('store', 'inline')
+SIGNATURE_VALUE = 'profile'
+
+# tracemalloc is process-wide, so is profiling
+_lock = threading.Lock()
+
+
+def signer():
+    return signing.TimestampSigner(salt='api.services.profiling')
+
+
+def make_signature():
+    """A value for ``X-Profile-Signature``, valid for ``PROFILE_SIGNATURE_MAX_AGE`` seconds"""
+    return signer().sign(SIGNATURE_VALUE)
+
+
+def valid_signature(value):
+    try:
+        return signer().unsign(value, max_age=settings.PROFILE_SIGNATURE_MAX_AGE) == SIGNATURE_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def requested_mode(request):
+    """'store' or 'inline' when the request asks to be profiled, else None"""
+    value = request.headers.get(HEADER)
+    if not value:
+        return None
+    value = value.strip().lower()
+    return value if value in MODES else 'store'
+
+
+def get_storage():
+    return import_string(settings.PROFILE_STORAGE)()
+
+
+class Profile:
+    """CPU profile and allocations of the current thread between ``start`` and ``stop``"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.started = self.seconds = None
+        self.peak = self.allocated = 0
+        self.snapshot = None
+        self.started_tracing = False
+
+    def start(self):
+        # Keep tracing on if the process was started with PYTHONTRACEMALLOC
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+        elif hasattr(tracemalloc, 'reset_peak'):
+            # Python 3.9+; before that the peak of tracing already on covers the whole process
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.seconds = time.perf_counter() - self.started
+        self.allocated, self.peak = tracemalloc.get_traced_memory()
+        self.snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        if self.started_tracing:
+            tracemalloc.stop()
+
+    def stats(self, stream=None):
+        return pstats.Stats(self.profiler, stream=stream)
+
+    def report(self, title):
+        top = settings.PROFILE_TOP_ENTRIES
+        cpu = io.StringIO()
+        self.stats(cpu).sort_stats('cumulative').print_stats(top)
+
+        lines = [
+            title,
+            f"Wall time {self.seconds * 1000:.1f} ms, peak traced memory {self.peak / 1024:.1f} KiB, "
+            f"{self.allocated / 1024:.1f} KiB still allocated at the end",
+            '',
+            f'CPU, top {top} by cumulative time (cProfile)',
+            cpu.getvalue().strip(),
+            '',
+            f'Memory still allocated at the end, top {top} by line (tracemalloc)',
+        ]
+        for stat in self.snapshot.statistics('lineno')[:top]:
+            frame = stat.traceback[0]
+            lines.append(f'{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}')
+        return '\n'.join(lines) + '\n'
+
+    def save(self, report):
+        """Store the report and the pstats dump; returns the report's name"""
+        storage = get_storage()
+        base = f"profiles/{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        name = storage.save(f'{base}.txt', ContentFile(report.encode('utf-8')))
+        # The format of pstats.Stats.dump_stats
+        storage.save(f'{base}.prof', ContentFile(marshal.dumps(self.stats().stats)))
+        return name
+
+
+def try_acquire():
+    return _lock.acquire(blocking=False)
+
+
+def release():
+    _lock.release()
@@ -0,0 +1,165 @@
+"""
+Reference counting and garbage collection of content-addressed receipt blobs.
+
+Receipt images are stored under the hash of their content (see
+``core.storage.ContentAddressedStorageMixin``), so one object can back the
+receipt, thumbnail or preview of many transactions. ``ReceiptBlob.refcount``
+is kept in the same database transaction as every write that points an image
+field at a blob or away from it. Blobs whose count dropped to zero are left
+for ``collect_garbage``, which waits out a grace period and re-checks the
+actual references before deleting anything, so a count that drifted (for
+example through a cascade that released a row twice) can never delete an
+image still in use. An upload that finds its content already stored first
+``touch``es the blob, which restarts the grace period, or waits for a
+collection deleting that blob to finish and then writes the object again.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from api.models import ReceiptBlob, Transaction
+
+FILE_FIELDS = ('receipt', 'receipt_thumbnail', 'receipt_preview')
+BATCH_SIZE = 500
+
+
+def get_storage():
+    return Transaction._meta.get_field('receipt').storage
+
+
+def stored_names(transaction_id):
+    """Blob names the stored row of a transaction points at"""
+    row = Transaction.objects.filter(pk=transaction_id).values_list(*FILE_FIELDS).first()
+    return [name for name in row or () if name]
+
+
+def register(names):
+    """Make sure every name has a blob row, so unreferenced objects are found by the collector"""
+    names = sorted({name for name in names if name})
+    for start in range(0, len(names), BATCH_SIZE):
+        batch = names[start:start + BATCH_SIZE]
+        existing = set(ReceiptBlob.objects.filter(name__in=batch).values_list('name', flat=True))
+        ReceiptBlob.objects.bulk_create(
+            [ReceiptBlob(name=name) for name in batch if name not in existing], ignore_conflicts=True
+        )
+
+
+def touch(name):
+    """Restart the grace period of a blob an upload is about to reuse"""
+    ReceiptBlob.objects.filter(name=name).update(updated_at=timezone.now())
+
+
+def apply_deltas(deltas):
+    """Add per-name deltas to the blob reference counts"""
+    deltas = {name: delta for name, delta in deltas.items() if name and delta}
+    if not deltas:
+        return
+    # Rows are created first so concurrent writers only ever increment existing rows
+    register(deltas)
+    now = timezone.now()
+    by_delta = {}
+    for name in sorted(deltas):
+        by_delta.setdefault(deltas[name], []).append(name)
+    for delta, names in by_delta.items():
+        for start in range(0, len(names), BATCH_SIZE):
+            ReceiptBlob.objects.filter(name__in=names[start:start + BATCH_SIZE]).update(
+                refcount=F('refcount') + delta, updated_at=now
+            )
+
+
+def record_change(before, after):
+    """Move references from the names in ``before`` to those in ``after``"""
+    deltas = Counter(name for name in after if name)
+    deltas.subtract(name for name in before if name)
+    apply_deltas(deltas)
+
+
+def reference_counts(queryset=None, names=None):
+    """How many image fields of the transactions in ``queryset`` point at each name"""
+    queryset = Transaction.objects.all() if queryset is None else queryset
+    counts = Counter()
+    for field in FILE_FIELDS:
+        rows = queryset.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        if names is not None:
+            rows = rows.filter(**{f'{field}__in': names})
+        for row in rows.order_by().values(field).annotate(references=Count('pk')):
+            counts[row[field]] += row['references']
+    return counts
+
+
+def release_transactions(queryset):
+    """Drop the references held by the transactions in ``queryset``, before deleting them"""
+    counts = reference_counts(queryset)
+    apply_deltas({name: -count for name, count in counts.items()})
+
+
+def collect_garbage(grace=timedelta(days=1), dry_run=False):
+    """
+    Delete blobs that have had no references for longer than ``grace``.
+
+    Returns the number of blobs deleted (or that would be, with ``dry_run``)
+    and the number whose count was wrong and has been corrected instead.
+    """
+    storage = get_storage()
+    cutoff = timezone.now() - grace
+    candidates = list(
+        ReceiptBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff)
+        .order_by('name').values_list('name', flat=True)
+    )
+    deleted = repaired = 0
+    for start in range(0, len(candidates), BATCH_SIZE):
+        batch = candidates[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            locked = list(
+                ReceiptBlob.objects.select_for_update()
+                .filter(name__in=batch, refcount__lte=0, updated_at__lt=cutoff)
+                .values_list('name', flat=True)
+            )
+            counts = reference_counts(names=locked)
+            unreferenced = [name for name in locked if not counts[name]]
+            repaired += len(locked) - len(unreferenced)
+            deleted += len(unreferenced)
+            if dry_run:
+                continue
+            for name, count in counts.items():
+                ReceiptBlob.objects.filter(name=name).update(refcount=count, updated_at=timezone.now())
+            ReceiptBlob.objects.filter(name__in=unreferenced).delete()
+            # Still holding the rows, so an upload touching one of them waits until its object is gone
+            # and then stores it again instead of reusing it
+            for name in unreferenced:
+                storage.delete(name)
+    return deleted, repaired
+
+
+def recount():
+    """Rebuild every reference count from the transactions; returns the number of rows corrected"""
+    counts = reference_counts()
+    register(counts)
+    changed = []
+    for blob in ReceiptBlob.objects.only('pk', 'name', 'refcount').iterator(chunk_size=BATCH_SIZE):
+        if blob.refcount != counts.get(blob.name, 0):
+            blob.refcount = counts.get(blob.name, 0)
+            blob.updated_at = timezone.now()
+            changed.append(blob)
+    ReceiptBlob.objects.bulk_update(changed, ['refcount', 'updated_at'], batch_size=BATCH_SIZE)
+    return len(changed)
+
+
+def scan(prefix='receipts'):
+    """Register every object stored under ``prefix``, including ones no row knows about"""
+    storage = get_storage()
+    found = []
+    pending = [prefix]
+    while pending:
+        directory = pending.pop()
+        try:
+            directories, files = storage.listdir(directory)
+        except FileNotFoundError:
+            continue
+        pending.extend(f'{directory}/{name}' for name in directories)
+        found.extend(f'{directory}/{name}' for name in files)
+    register(found)
+    return len(found)
@@ -0,0 +1,137 @@
+"""
+Background processing of uploaded receipt images.
+
+Saving a transaction with a new receipt marks it ``pending`` and, once the
+database transaction commits, hands it to a small thread pool so the upload
+request returns without waiting for the encode. The worker strips metadata,
+applies the EXIF orientation, re-encodes the original as a JPEG bounded to
+``RECEIPT_MAX_DIMENSION`` and writes the thumbnail renditions served to list
+screens. All of them are stored content-addressed, so re-uploading a receipt
+reuses the objects written for it before. Receipts left ``pending`` by a
+restart are picked up again by the ``process_receipts`` command.
+"""
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from api.models import Transaction
+from api.services import receipt_blobs
+from api.services.response_cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+# Rendition name -> (model field, longest side in pixels)
+RENDITIONS = {
+    'thumbnail': ('receipt_thumbnail', 256),
+    'preview': ('receipt_preview', 1024),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ReceiptError(ValueError):
+    """Raised for uploads that cannot be decoded as images"""
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECEIPT_WORKERS, thread_name_prefix='receipts'
+            )
+        return _executor
+
+
+def schedule(transaction_id, name):
+    """Process the receipt after the current database transaction commits"""
+    def submit():
+        if settings.RECEIPT_WORKERS:
+            get_executor().submit(run_job, transaction_id, name)
+        else:
+            process_receipt(transaction_id, name)
+
+    transaction.on_commit(submit)
+
+
+def run_job(transaction_id, name):
+    close_old_connections()
+    try:
+        process_receipt(transaction_id, name)
+    except Exception:
+        logger.exception("Processing receipt %s of transaction %s failed", name, transaction_id)
+    finally:
+        # Worker threads own their connections, never leave one open between jobs
+        close_old_connections()
+
+
+def encode_jpeg(image, max_dimension):
+    """JPEG bytes of ``image`` scaled down to fit ``max_dimension``, without metadata"""
+    image = image.copy()
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.RECEIPT_JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def load_image(stream):
+    """Decode an upload, upright and flattened to RGB"""
+    try:
+        with Image.open(stream) as image:
+            # Let the JPEG decoder downscale by a power of two instead of decoding every pixel
+            image.draft('RGB', (settings.RECEIPT_MAX_DIMENSION, settings.RECEIPT_MAX_DIMENSION))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                return background
+            return image.convert('RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise ReceiptError(str(exc))
+
+
+def process_receipt(transaction_id, name):
+    """Re-encode one receipt and write its renditions, unless it was replaced meanwhile"""
+    storage = receipt_blobs.get_storage()
+    try:
+        with storage.open(name, 'rb') as stream:
+            image = load_image(stream)
+    except (ReceiptError, FileNotFoundError) as exc:
+        logger.warning("Receipt %s of transaction %s could not be processed: %s", name, transaction_id, exc)
+        Transaction.objects.filter(pk=transaction_id, receipt=name).update(receipt_status='failed')
+        return False
+
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    directory = Transaction._meta.get_field('receipt').upload_to.rstrip('/')
+    saved = {'receipt': storage.save(
+        posixpath.join(directory, f'{stem}.jpg'),
+        ContentFile(encode_jpeg(image, settings.RECEIPT_MAX_DIMENSION)),
+    )}
+    for rendition, (field_name, size) in RENDITIONS.items():
+        saved[field_name] = storage.save(
+            posixpath.join(directory, rendition, f'{stem}.jpg'), ContentFile(encode_jpeg(image, size))
+        )
+
+    with transaction.atomic():
+        # Only the receipt this job was started for; a newer upload has its own job
+        row = (
+            Transaction.objects.select_for_update().filter(pk=transaction_id, receipt=name)
+            .values_list('user_id', *receipt_blobs.FILE_FIELDS).first()
+        )
+        if row is None:
+            # Blobs may be shared, leave them to the collector instead of deleting them
+            receipt_blobs.register(saved.values())
+            return False
+        Transaction.objects.filter(pk=transaction_id).update(receipt_status='ready', **saved)
+        receipt_blobs.record_change(row[1:], saved.values())
+        bump_data_version(row[0])
+    return True
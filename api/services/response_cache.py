@@ -0,0 +1,145 @@
+"""
+Versioned caching of per-user read endpoints.
+
+Responses are cached under (endpoint, user, data version, timezone, local
+day, query params). ``User.data_version`` is bumped in the same database
+transaction as every write to the user's transactions, accounts or
+categories, so a write makes all of the user's cached responses unreachable
+at once and stale entries are simply left to age out of the cache. The
+user's timezone and local day are part of the key because periods such as
+"this month" move with the calendar.
+"""
+import functools
+import hashlib
+import threading
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from api.models import User
+from api.services.periods import local_today, user_timezone
+from core import db_router
+
+_lock = threading.Lock()
+_hits = Counter()
+_misses = Counter()
+
+
+def bump_data_version(*user_ids):
+    """Invalidate every cached response of these users"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        User.objects.filter(pk__in=sorted(user_ids)).update(data_version=F('data_version') + 1)
+        # Read their own writes from the primary until the replicas have them
+        db_router.record_write(*sorted(user_ids))
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def cache_key(endpoint, user, params):
+    """Key for one user's response, with the query parameters in a canonical order"""
+    normalized = '&'.join(
+        f'{name}={value}'
+        for name in sorted(params)
+        for value in sorted(params.getlist(name))
+    )
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    tz = user_timezone(user)
+    version = current_data_version(user)
+    return f'response:{endpoint}:{user.pk}:{version}:{tz.key}:{local_today(tz).isoformat()}:{digest}'
+
+
+def current_data_version(user):
+    """The stored data version; ``request.user`` may be a copy from the token cache"""
+    return User.objects.filter(pk=user.pk).values_list('data_version', flat=True).first()
+
+
+def _record(counter, endpoint):
+    with _lock:
+        counter[endpoint] += 1
+
+
+def cache_stats():
+    """Hit and miss counts of this process, overall and per endpoint"""
+    with _lock:
+        hits, misses = dict(_hits), dict(_misses)
+    total_hits, total_misses = sum(hits.values()), sum(misses.values())
+    lookups = total_hits + total_misses
+    return {
+        'hits': total_hits,
+        'misses': total_misses,
+        'hit_ratio': round(total_hits / lookups, 4) if lookups else None,
+        'endpoints': {
+            endpoint: {'hits': hits.get(endpoint, 0), 'misses': misses.get(endpoint, 0)}
+            for endpoint in sorted(set(hits) | set(misses))
+        },
+    }
+
+
+def reset_cache_stats():
+    with _lock:
+        _hits.clear()
+        _misses.clear()
+
+
+def cached_response(endpoint, timeout=None):
+    """
+    Cache successful GET responses of a function view or viewset action per user.
+
+    Apply it below ``@api_view`` / ``@action``. Responses carry an ``X-Cache``
+    header saying whether they were served from the cache.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            if request.method != 'GET' or not request.user.is_authenticated:
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            key = cache_key(endpoint, request.user, request.query_params)
+            data = cache.get(key)
+            if data is not None:
+                _record(_hits, endpoint)
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+            _record(_misses, endpoint)
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, *_timeout_args(timeout))
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def _timeout_args(timeout):
+    # No argument falls back to the cache's own TIMEOUT
+    return () if timeout is None else (timeout,)
+
+
+async def acached(endpoint, user, params, compute, timeout=None):
+    """
+    Async counterpart of ``cached_response`` for views that build plain data.
+
+    Returns the cached data of the user's key, or awaits ``compute()`` and
+    stores its result, together with whether it was a hit. Entries are shared
+    with the synchronous view cached under the same endpoint name.
+    """
+    cache = get_cache()
+    key = await sync_to_async(cache_key)(endpoint, user, params)
+    data = await cache.aget(key)
+    if data is not None:
+        _record(_hits, endpoint)
+        return data, True
+    _record(_misses, endpoint)
+    data = await compute()
+    await cache.aset(key, data, *_timeout_args(timeout))
+    return data, False
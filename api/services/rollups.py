@@ -0,0 +1,152 @@
+"""
+Daily rollups of transaction totals.
+
+``DailyRollup`` holds one row per (user, date, category, account,
+transaction_type) with the summed amount and number of transactions, so the
+reporting endpoints aggregate over days and categories instead of raw rows.
+Rows are kept current by ``api.services.ledger`` and can be rebuilt from the
+transaction history with the ``rebuild_rollups`` command.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from api.models import Account, DailyRollup, Transaction
+from api.services.response_cache import bump_data_version
+
+KEY_FIELDS = ('user_id', 'date', 'category_id', 'account_id', 'transaction_type')
+
+# Above this many keys, deltas are applied with a handful of batched statements
+BATCH_THRESHOLD = 8
+
+
+def rollups_for(user, period=None):
+    """Rollup rows for a user, optionally limited to an ``api.services.periods.Period``"""
+    queryset = DailyRollup.objects.filter(user=user)
+    if period is not None:
+        queryset = queryset.filter(period.date_q())
+    return queryset
+
+
+def deltas_for(rows, sign):
+    """Fold rows carrying the rollup key, ``amount`` and optional ``count`` into per-key deltas"""
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for row in rows:
+        key = tuple(row[field] for field in KEY_FIELDS)
+        deltas[key][0] += Decimal(str(row['amount'])) * sign
+        deltas[key][1] += row.get('count', 1) * sign
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add amount/count deltas to the matching rollup rows, creating or pruning rows as needed"""
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+    if len(deltas) > BATCH_THRESHOLD:
+        try:
+            with transaction.atomic():
+                _apply_batched(deltas)
+            return
+        except IntegrityError:
+            # A concurrent writer created one of the rows, fall back to per-key upserts
+            pass
+    for key in sorted(deltas, key=str):
+        amount, count = deltas[key]
+        lookup = dict(zip(KEY_FIELDS, key))
+        rows = DailyRollup.objects.filter(**lookup)
+        updated = rows.update(
+            total_amount=F('total_amount') + amount,
+            transaction_count=F('transaction_count') + count,
+        )
+        if not updated and count > 0:
+            try:
+                with transaction.atomic():
+                    DailyRollup.objects.create(total_amount=amount, transaction_count=count, **lookup)
+            except IntegrityError:
+                # Another writer created the row first, add on top of theirs
+                rows.update(
+                    total_amount=F('total_amount') + amount,
+                    transaction_count=F('transaction_count') + count,
+                )
+        elif count < 0:
+            rows.filter(transaction_count__lte=0).delete()
+
+
+def _apply_batched(deltas):
+    """Lock the touched rollup rows in one query, then write them back with bulk statements"""
+    keys = list(deltas)
+    dates = [key[1] for key in keys]
+    candidates = DailyRollup.objects.select_for_update().filter(
+        user_id__in={key[0] for key in keys},
+        date__gte=min(dates),
+        date__lte=max(dates),
+        category_id__in={key[2] for key in keys},
+        account_id__in={key[3] for key in keys},
+    )
+    existing = {tuple(getattr(row, field) for field in KEY_FIELDS): row for row in candidates}
+
+    to_update, to_create, to_delete = [], [], []
+    for key, (amount, count) in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            if count > 0:
+                to_create.append(DailyRollup(
+                    total_amount=amount, transaction_count=count, **dict(zip(KEY_FIELDS, key))
+                ))
+            continue
+        row.total_amount += amount
+        row.transaction_count += count
+        if row.transaction_count <= 0:
+            to_delete.append(row.pk)
+        else:
+            to_update.append(row)
+
+    if to_update:
+        DailyRollup.objects.bulk_update(to_update, ['total_amount', 'transaction_count'], batch_size=500)
+    if to_create:
+        DailyRollup.objects.bulk_create(to_create, batch_size=500)
+    if to_delete:
+        DailyRollup.objects.filter(pk__in=to_delete).delete()
+
+
+def rebuild_for_user(user_id, batch_size=1000, on_batch=None):
+    """
+    Replace a user's rollups with totals recomputed from their transactions.
+
+    The user's accounts are locked first; every ledger write updates its
+    account before touching rollups, so no write can slip in between the
+    recount and the swap. ``on_batch`` is called with the number of rows
+    written so far after every batch. Returns the number of rollup rows
+    written.
+    """
+    with transaction.atomic():
+        list(Account.objects.select_for_update().filter(user_id=user_id).values_list('pk', flat=True))
+        DailyRollup.objects.filter(user_id=user_id).delete()
+        rows = (
+            Transaction.objects.filter(user_id=user_id)
+            .order_by()
+            .values(*KEY_FIELDS)
+            .annotate(amount=Sum('amount'), count=Count('id'))
+        )
+        written = 0
+        batch = []
+        for row in rows.iterator():
+            batch.append(DailyRollup(
+                total_amount=row['amount'],
+                transaction_count=row['count'],
+                **{field: row[field] for field in KEY_FIELDS}
+            ))
+            if len(batch) >= batch_size:
+                DailyRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+                if on_batch is not None:
+                    on_batch(written)
+        if batch:
+            DailyRollup.objects.bulk_create(batch)
+            written += len(batch)
+            if on_batch is not None:
+                on_batch(written)
+        bump_data_version(user_id)
+    return written
@@ -0,0 +1,355 @@
+"""
+Bank statement import.
+
+Statements are parsed as a stream of rows (CSV or OFX), mapped onto the
+user's categories through an in-memory cache and inserted in batches with
+``bulk_create``, or ``COPY`` on PostgreSQL. Every imported row carries a
+content hash of (account, date, amount, normalized title) that is unique per
+account, so re-importing an overlapping statement only inserts the rows that
+are not there yet.
+"""
+import csv
+import hashlib
+import html
+import io
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import Account, Category, Transaction
+from api.services import ledger
+
+STATEMENT_FORMATS = ('csv', 'ofx')
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d', '%Y%m%d')
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted', 'posting date', 'booking date', 'value date'),
+    'title': ('title', 'description', 'payee', 'name', 'details', 'narrative'),
+    'amount': ('amount', 'transaction amount', 'value'),
+    'debit': ('debit', 'withdrawal', 'money out', 'paid out'),
+    'credit': ('credit', 'deposit', 'money in', 'paid in'),
+    'type': ('type', 'transaction type'),
+    'category': ('category',),
+    'notes': ('notes', 'memo', 'reference'),
+}
+INCOME_TYPES = {'income', 'credit', 'cr', 'deposit'}
+EXPENSE_TYPES = {'expense', 'debit', 'dr', 'withdrawal', 'payment'}
+AMOUNT = re.compile(r'^([+-]?)([0-9.,]+)([+-]?)$')
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+TITLE_MAX_LENGTH = Transaction._meta.get_field('title').max_length
+
+
+class StatementError(ValueError):
+    """Raised for statements or rows that cannot be imported"""
+
+
+@dataclass
+class StatementRow:
+    line: int
+    date: date
+    amount: Decimal  # Signed, negative amounts are expenses
+    title: str
+    category: str = ''
+    notes: str = ''
+
+
+@dataclass
+class ImportResult:
+    parsed: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            'parsed': self.parsed,
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'errors': self.errors,
+        }
+
+
+def parse_date(value, date_format=None):
+    value = value.strip()
+    for fmt in ([date_format] if date_format else DATE_FORMATS):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f"Unrecognized date '{value}'")
+
+
+def parse_amount(value, decimal_separator=None):
+    """Parse amounts such as ``-1,234.56``, ``1.234,56 EUR``, ``(12.50)`` or ``12.50-``
+
+    Without a ``decimal_separator`` the last of ``.`` and ``,`` is taken as the decimal separator and
+    the other as the thousands separator. A single separator followed by exactly three digits could be
+    either, so those amounts are rejected instead of guessed.
+    """
+    text = value.strip()
+    negative = text.startswith('(') and text.endswith(')')
+    # Currency symbols and codes, spaces and apostrophes used as thousands separators
+    match = AMOUNT.match(re.sub(r"[^0-9.,+\-]", '', text))
+    if match is None or (match.group(1) and match.group(3)):
+        raise StatementError(f"Unrecognized amount '{value}'")
+    sign, number = match.group(1) or match.group(3), match.group(2)
+    separators = [char for char in number if char in '.,']
+
+    if decimal_separator is None and separators:
+        if len(set(separators)) > 1:
+            decimal_separator = separators[-1]
+        elif len(separators) == 1:
+            integer, fraction = number.split(separators[0])
+            if len(fraction) == 3 and integer.strip('0'):
+                raise StatementError(f"Ambiguous amount '{value}', set the decimal separator")
+            decimal_separator = separators[0]
+    if decimal_separator is None:
+        # Only repeated thousands separators, or none at all
+        decimal_separator = '.' if separators[:1] == [','] else ','
+    thousands_separator = ',' if decimal_separator == '.' else '.'
+
+    integer, _, fraction = number.partition(decimal_separator)
+    groups = integer.split(thousands_separator)
+    grouped = len(groups) == 1 or (1 <= len(groups[0]) <= 3 and all(len(group) == 3 for group in groups[1:]))
+    if not grouped or (fraction and not fraction.isdigit()) or not (integer or fraction):
+        raise StatementError(f"Unrecognized amount '{value}'")
+    try:
+        amount = Decimal(f"{''.join(groups) or 0}.{fraction or 0}").quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise StatementError(f"Unrecognized amount '{value}'")
+    return -amount if negative or sign == '-' else amount
+
+
+def normalize_title(title):
+    return ' '.join(title.lower().split())
+
+
+def content_hash(account_id, row_date, amount, title, occurrence):
+    """Hash identifying the ``occurrence``-th identical (date, amount, title) row of an account"""
+    key = f"{account_id}|{row_date.isoformat()}|{amount}|{normalize_title(title)}|{occurrence}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def parse_csv(stream, errors, date_format=None, decimal_separator=None):
+    """Yield StatementRows from a CSV statement, appending unparseable rows to ``errors``"""
+    reader = csv.reader(stream)
+    header = [name.strip().lower() for name in next(reader, [])]
+    columns = {}
+    for key, aliases in CSV_COLUMNS.items():
+        for index, name in enumerate(header):
+            if name in aliases:
+                columns[key] = index
+                break
+    if 'date' not in columns or 'title' not in columns or not (
+            'amount' in columns or 'debit' in columns or 'credit' in columns):
+        raise StatementError("CSV statements need date, description and amount (or debit/credit) columns")
+
+    def cell(record, key):
+        index = columns.get(key)
+        return record[index].strip() if index is not None and index < len(record) else ''
+
+    for line, record in enumerate(reader, start=2):
+        if not any(value.strip() for value in record):
+            continue
+        try:
+            if cell(record, 'amount'):
+                amount = parse_amount(cell(record, 'amount'), decimal_separator)
+                kind = cell(record, 'type').lower()
+                if kind in INCOME_TYPES:
+                    amount = abs(amount)
+                elif kind in EXPENSE_TYPES:
+                    amount = -abs(amount)
+            elif cell(record, 'debit') or cell(record, 'credit'):
+                # Banks often fill the unused column with 0.00
+                debit = parse_amount(cell(record, 'debit') or '0', decimal_separator)
+                credit = parse_amount(cell(record, 'credit') or '0', decimal_separator)
+                amount = -abs(debit) if debit else abs(credit)
+            else:
+                raise StatementError("Missing amount")
+            if not amount:
+                raise StatementError("Zero amount")
+            title = cell(record, 'title')
+            if not title:
+                raise StatementError("Missing description")
+            yield StatementRow(
+                line=line,
+                date=parse_date(cell(record, 'date'), date_format),
+                amount=amount,
+                title=title,
+                category=cell(record, 'category'),
+                notes=cell(record, 'notes'),
+            )
+        except StatementError as exc:
+            errors.append({'line': line, 'error': str(exc)})
+
+
+def parse_ofx(stream, errors, date_format=None, decimal_separator=None):
+    """Yield StatementRows from the STMTTRN blocks of an OFX (SGML or XML) statement"""
+    current = None
+    for line, text in enumerate(stream, start=1):
+        for closing, tag, value in OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    current = {'line': line}
+                elif current is not None:
+                    try:
+                        yield _ofx_row(current, decimal_separator)
+                    except StatementError as exc:
+                        errors.append({'line': current['line'], 'error': str(exc)})
+                    current = None
+            elif current is not None and not closing:
+                current[tag] = html.unescape(value.strip())
+
+
+def _ofx_row(fields, decimal_separator=None):
+    posted = fields.get('DTPOSTED', '')
+    if len(posted) < 8:
+        raise StatementError("Missing DTPOSTED")
+    title = fields.get('NAME') or fields.get('PAYEE') or fields.get('MEMO') or ''
+    if not title:
+        raise StatementError("Missing NAME")
+    amount = parse_amount(fields.get('TRNAMT', ''), decimal_separator)
+    if not amount:
+        raise StatementError("Zero amount")
+    return StatementRow(
+        line=fields['line'],
+        date=parse_date(posted[:8], '%Y%m%d'),
+        amount=amount,
+        title=title,
+        notes=fields.get('MEMO', '') if fields.get('NAME') else '',
+    )
+
+
+def parse_statement(stream, statement_format, errors, date_format=None, decimal_separator=None):
+    if statement_format == 'ofx':
+        return parse_ofx(stream, errors, date_format, decimal_separator)
+    return parse_csv(stream, errors, date_format, decimal_separator)
+
+
+def uncategorized(user):
+    """Fallback category for imported rows that do not name one"""
+    category, _ = Category.objects.get_or_create(user=user, title='Uncategorized')
+    return category
+
+
+def open_text(binary_file):
+    """Wrap an uploaded or opened binary file for line-by-line decoding"""
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', errors='replace', newline='')
+
+
+class StatementImporter:
+    """Import parsed statement rows into one account, skipping rows that were imported before"""
+
+    def __init__(self, user, account, default_category, create_categories=True, batch_size=500):
+        self.user = user
+        self.account = account
+        self.default_category = default_category
+        self.create_categories = create_categories
+        self.batch_size = batch_size
+        self.categories = {category.title.lower(): category for category in Category.objects.filter(user=user)}
+        self.occurrences = Counter()
+
+    def category_for(self, name):
+        name = name.strip()[:200]
+        if not name:
+            return self.default_category
+        category = self.categories.get(name.lower())
+        if category is None:
+            if not self.create_categories:
+                return self.default_category
+            category, _ = Category.objects.get_or_create(user=self.user, title=name)
+            self.categories[name.lower()] = category
+        return category
+
+    def run(self, rows, errors=None):
+        result = ImportResult(errors=errors if errors is not None else [])
+        batch = []
+        for row in rows:
+            result.parsed += 1
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, result)
+                batch = []
+        if batch:
+            self._import_batch(batch, result)
+        return result
+
+    def _import_batch(self, rows, result):
+        pending = {}
+        for row in rows:
+            base = (row.date, row.amount, normalize_title(row.title))
+            self.occurrences[base] += 1
+            digest = content_hash(self.account.pk, row.date, row.amount, row.title, self.occurrences[base])
+            pending[digest] = Transaction(
+                title=row.title[:TITLE_MAX_LENGTH],
+                amount=abs(row.amount),
+                transaction_type='expense' if row.amount < 0 else 'income',
+                category=self.category_for(row.category),
+                account=self.account,
+                date=row.date,
+                notes=row.notes or None,
+                user=self.user,
+                import_hash=digest,
+            )
+
+        with transaction.atomic():
+            # Concurrent imports into the account take turns, so the second one sees the first one's hashes
+            # instead of failing on the (account, import_hash) constraint
+            Account.objects.select_for_update().only('pk').get(pk=self.account.pk)
+            existing = set(
+                Transaction.objects.filter(account=self.account, import_hash__in=list(pending))
+                .values_list('import_hash', flat=True)
+            )
+            new = [txn for digest, txn in pending.items() if digest not in existing]
+            if new:
+                insert_transactions(new)
+                ledger.record_bulk_create(new)
+        result.inserted += len(new)
+        result.duplicates += len(existing)
+
+
+def insert_transactions(transactions):
+    """Insert unsaved transactions in bulk, through COPY when running on PostgreSQL"""
+    if connection.vendor == 'postgresql' and getattr(settings, 'STATEMENT_IMPORT_USE_COPY', True):
+        _copy_transactions(transactions)
+    else:
+        Transaction.objects.bulk_create(transactions, batch_size=500)
+
+
+def _copy_transactions(transactions):
+    now = timezone.now()
+    fields = [
+        Transaction._meta.get_field(name) for name in (
+            'title', 'amount', 'transaction_type', 'category', 'account', 'date',
+            'notes', 'tags', 'user', 'created_at', 'import_hash',
+        )
+    ]
+    quote = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote(Transaction._meta.db_table), ', '.join(quote(f.column) for f in fields)
+    )
+    for txn in transactions:
+        txn.created_at = now
+    rows = [[getattr(txn, f.attname) for f in fields] for txn in transactions]
+
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(['' if value is None else value for value in row])
+            buffer.seek(0)
+            raw.copy_expert(sql + " WITH (FORMAT csv)", buffer)
+        else:
+            # psycopg 3
+            with raw.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
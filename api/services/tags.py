@@ -0,0 +1,115 @@
+"""
+Normalized transaction tags.
+
+``Transaction.tags`` stays the comma separated string clients read and write.
+The names in it are mirrored into per-user ``Tag`` rows linked through
+``TransactionTag``, so tag filters and per-tag totals are indexed joins on
+exact keys instead of substring scans over the tag strings. Names match
+case-insensitively through their key while the tag keeps the spelling it
+was first written with; names longer than ``MAX_TAG_LENGTH`` are rejected.
+Tags are removed when a tag change leaves them without transactions; those
+orphaned by deleted transactions are left out of the tag list.
+"""
+from collections import defaultdict
+
+from django.db.models import Q
+
+from api.models import Tag, TransactionTag
+
+MAX_TAG_LENGTH = Tag._meta.get_field('name').max_length
+
+
+class TagError(ValueError):
+    """Raised for tag strings naming a tag longer than MAX_TAG_LENGTH"""
+
+
+def tag_key(name):
+    """Case-insensitive identity of a tag name"""
+    return name.lower()
+
+
+def _names(value):
+    for part in (value or '').split(','):
+        name = ' '.join(part.split())
+        if name:
+            yield name
+
+
+def parse_tags(value):
+    """Split a comma separated tag string into unique names, keeping the first spelling of each"""
+    names = {}
+    for name in _names(value):
+        if len(name) > MAX_TAG_LENGTH:
+            raise TagError(f"Tags can be at most {MAX_TAG_LENGTH} characters long: '{name}'")
+        names.setdefault(tag_key(name), name)
+    return list(names.values())
+
+
+def tag_keys(value):
+    """Keys of the tags named in a filter parameter; names too long to be a tag are left out"""
+    return list(dict.fromkeys(tag_key(name) for name in _names(value) if len(name) <= MAX_TAG_LENGTH))
+
+
+def clean_tags(value):
+    """Canonical form of a tag string, or None when it holds no tags"""
+    return ', '.join(parse_tags(value)) or None
+
+
+def tags_by_key(user_id, names):
+    """Fetch the user's Tag rows for ``names`` by key, creating the missing ones with these spellings"""
+    spellings = {}
+    for name in names:
+        spellings.setdefault(tag_key(name), name)
+    tags = {tag.key: tag for tag in Tag.objects.filter(user_id=user_id, key__in=spellings)}
+    missing = [key for key in spellings if key not in tags]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(user_id=user_id, key=key, name=spellings[key]) for key in missing], ignore_conflicts=True
+        )
+        tags.update((tag.key, tag) for tag in Tag.objects.filter(user_id=user_id, key__in=missing))
+    return tags
+
+
+def sync_tags(transactions, created=False):
+    """
+    Point the tag links of saved transactions at the names in their ``tags`` strings.
+
+    Pass ``created=True`` for freshly inserted rows, which have no links yet.
+    """
+    wanted = {}
+    names_by_user = defaultdict(list)
+    for txn in transactions:
+        names = parse_tags(txn.tags)
+        wanted[txn.pk] = (txn.user_id, names)
+        names_by_user[txn.user_id].extend(names)
+    tags = {user_id: tags_by_key(user_id, names) for user_id, names in names_by_user.items() if names}
+
+    existing = defaultdict(set)
+    if not created:
+        links = TransactionTag.objects.filter(transaction_id__in=wanted).values_list('transaction_id', 'tag_id')
+        for transaction_id, tag_id in links:
+            existing[transaction_id].add(tag_id)
+
+    new_links = []
+    stale = Q()
+    unlinked = set()
+    for transaction_id, (user_id, names) in wanted.items():
+        target = {tags[user_id][tag_key(name)].pk for name in names}
+        new_links.extend(
+            TransactionTag(transaction_id=transaction_id, tag_id=tag_id)
+            for tag_id in target - existing[transaction_id]
+        )
+        if existing[transaction_id] - target:
+            stale |= Q(transaction_id=transaction_id, tag_id__in=existing[transaction_id] - target)
+            unlinked |= existing[transaction_id] - target
+    if stale:
+        TransactionTag.objects.filter(stale).delete()
+        # Tags whose last transaction just dropped them
+        Tag.objects.filter(pk__in=unlinked, transaction_links__isnull=True).delete()
+    if new_links:
+        TransactionTag.objects.bulk_create(new_links, batch_size=1000)
+
+
+def transactions_tagged(user, keys):
+    """Subquery of ids of the user's transactions carrying any of the tags with ``keys``"""
+    return TransactionTag.objects.filter(tag__user=user, tag__key__in=keys).values('transaction_id')
@@ -0,0 +1,147 @@
+"""
+Cache of token to user resolution for ``api.authentication.CachedTokenAuthentication``.
+
+Users are kept in a bounded in-process LRU for ``TOKEN_CACHE_TTL`` seconds.
+When ``TOKEN_CACHE_ALIAS`` names one of ``CACHES`` the LRU is backed by that
+shared cache for ``TOKEN_CACHE_SHARED_TTL`` seconds. Only the user's id is
+shared, never the user with its password hash, so other processes load the
+user by primary key instead of joining the token. Deleting a token or saving a user drops their entries from
+this process's LRU and from the shared cache; other processes may keep using
+their local copy until it expires, which is why the local TTL is short.
+
+Cached users go stale between saves only in ``data_version``, which is why
+``api.services.response_cache`` reads it from the database.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_stats = Counter()
+# Bumped by every invalidation, so a lookup that raced with one does not cache what it read
+_generation = 0
+
+
+def shared_cache():
+    alias = settings.TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    # Tokens are credentials, keep them out of the shared cache's key space
+    return 'auth-token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def generation():
+    return _generation
+
+
+def get(key):
+    """A copy of the cached user of the token, or None"""
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _entries.move_to_end(key)
+                _stats['hits'] += 1
+                # Copies, so one request's changes never leak into another's user
+                return copy.copy(entry[1])
+            del _entries[key]
+            _stats['expired'] += 1
+
+    cache = shared_cache()
+    user_id = cache.get(shared_key(key)) if cache is not None else None
+    user = load_user(user_id) if user_id is not None else None
+    with _lock:
+        _stats['shared_hits' if user is not None else 'misses'] += 1
+    if user is not None:
+        _store(key, user, _generation)
+    return user
+
+
+def load_user(user_id):
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.filter(pk=user_id).first()
+
+
+def put(key, user, read_generation):
+    """Cache the user read for the token, unless an invalidation happened since ``read_generation``"""
+    if _store(key, user, read_generation):
+        cache = shared_cache()
+        if cache is not None:
+            cache.set(shared_key(key), user.pk, settings.TOKEN_CACHE_SHARED_TTL)
+
+
+def _store(key, user, read_generation):
+    with _lock:
+        if read_generation != _generation:
+            return False
+        _entries[key] = (time.monotonic() + settings.TOKEN_CACHE_TTL, copy.copy(user))
+        _entries.move_to_end(key)
+        while len(_entries) > settings.TOKEN_CACHE_SIZE:
+            _entries.popitem(last=False)
+            _stats['evictions'] += 1
+        return True
+
+
+def invalidate_tokens(*keys):
+    """Forget these tokens, e.g. when they are deleted"""
+    global _generation
+    with _lock:
+        _generation += 1
+        for key in keys:
+            _entries.pop(key, None)
+        _stats['invalidations'] += 1
+    cache = shared_cache()
+    if cache is not None and keys:
+        cache.delete_many([shared_key(key) for key in keys])
+
+
+def invalidate_user(user_id):
+    """Forget every token of the user, e.g. after a password change"""
+    from rest_framework.authtoken.models import Token
+
+    with _lock:
+        keys = {key for key, (_, user) in _entries.items() if user.pk == user_id}
+    keys.update(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+    invalidate_tokens(*keys)
+
+
+def clear():
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+
+
+def stats():
+    """Lookup counters and size of this process's token cache"""
+    with _lock:
+        counts = dict(_stats)
+        size = len(_entries)
+    hits = counts.get('hits', 0) + counts.get('shared_hits', 0)
+    lookups = hits + counts.get('misses', 0)
+    return {
+        'hits': counts.get('hits', 0),
+        'shared_hits': counts.get('shared_hits', 0),
+        'misses': counts.get('misses', 0),
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+        'expired': counts.get('expired', 0),
+        'evictions': counts.get('evictions', 0),
+        'invalidations': counts.get('invalidations', 0),
+        'size': size,
+        'max_size': settings.TOKEN_CACHE_SIZE,
+    }
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
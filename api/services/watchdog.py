@@ -0,0 +1,130 @@
+"""
+Slow request watchdog.
+
+``api.middleware.SlowRequestMiddleware`` registers every request while it
+runs. A daemon thread checks them every half ``SLOW_REQUEST_SECONDS`` and
+logs the current stack of any request running longer, once, while it is
+still slow; when such a request finishes its duration, status and slowest
+queries are logged too. Registering is a dict insert and delete, so the
+watchdog stays on for every request.
+
+Queries come from ``api.services.metrics``, which keeps the last
+``SLOW_REQUEST_MAX_QUERIES`` statements of each request; without
+``MetricsMiddleware`` in front only the stacks are logged. Async requests
+log the stack of their task rather than of the event loop's thread.
+"""
+import asyncio
+import itertools
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from django.conf import settings
+
+from api.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks at the least, however low the threshold
+MIN_INTERVAL = 0.1
+
+_requests = {}
+_ids = itertools.count()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+class RunningRequest:
+    __slots__ = ('method', 'path', 'started', 'thread_id', 'task', 'stats', 'reported')
+
+    def __init__(self, request, stats):
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.started = time.monotonic()
+        self.thread_id = threading.get_ident()
+        try:
+            self.task = asyncio.current_task()
+        except RuntimeError:
+            self.task = None
+        self.stats = stats
+        self.reported = False
+
+
+def begin(request):
+    """Watch a request; returns the id to pass to ``end``"""
+    request_id = next(_ids)
+    _requests[request_id] = RunningRequest(request, metrics.current_stats())
+    return request_id
+
+
+def end(request_id, request, status):
+    running = _requests.pop(request_id, None)
+    if running is None:
+        return
+    seconds = time.monotonic() - running.started
+    threshold = settings.SLOW_REQUEST_SECONDS
+    if threshold and seconds >= threshold:
+        log_finished(running, seconds, status, getattr(request, 'user', None))
+
+
+def current_stack(running):
+    if running.task is not None:
+        frames = running.task.get_stack()
+        return ''.join(traceback.format_list(traceback.StackSummary.extract(
+            (frame, frame.f_lineno) for frame in frames
+        )))
+    frame = sys._current_frames().get(running.thread_id)
+    return ''.join(traceback.format_stack(frame)) if frame is not None else '(thread has finished)\n'
+
+
+def check():
+    """Log the stack of every request running longer than ``SLOW_REQUEST_SECONDS`` for the first time"""
+    threshold = settings.SLOW_REQUEST_SECONDS
+    if not threshold:
+        return
+    now = time.monotonic()
+    # Copied in one step, requests start and finish meanwhile
+    for running in list(_requests.values()):
+        if not running.reported and now - running.started >= threshold:
+            running.reported = True
+            logger.warning(
+                "Slow request %s %s running for %.1fs, %s queries so far, at:\n%s",
+                running.method, running.path, now - running.started,
+                running.stats.queries if running.stats else 'unknown', current_stack(running),
+            )
+
+
+def log_finished(running, seconds, status, user):
+    lines = [
+        f"Slow request {running.method} {running.path} took {seconds:.2f}s, status {status}, "
+        f"user {user.pk if user is not None and user.is_authenticated else 'anonymous'}"
+    ]
+    if running.stats is not None:
+        stats = running.stats
+        lines.append(f"{stats.queries} queries in {stats.seconds:.2f}s, slowest of the last {len(stats.statements)}:")
+        for sql, query_seconds in sorted(stats.statements, key=lambda statement: -statement[1])[:10]:
+            lines.append(f"  {query_seconds * 1000:8.1f} ms  {sql}")
+    logger.warning('\n'.join(lines))
+
+
+def run(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            check()
+        except Exception:
+            logger.exception("Slow request check failed")
+
+
+def start():
+    """Start the watchdog thread of this process, once"""
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(
+                target=run, args=(max(settings.SLOW_REQUEST_SECONDS / 2, MIN_INTERVAL),),
+                name='slow-request-watchdog', daemon=True,
+            )
+            _thread.start()
@@ -0,0 +1,77 @@
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token, TokenProxy
+
+from api.models import Account, Category, Transaction, User
+from api.search import ensure_search_index
+from api.services import ledger, receipt_blobs, token_cache
+from api.services.response_cache import bump_data_version
+
+
+def deleted_directly(model, origin):
+    """
+    Whether a deletion of ``model`` rows was started on the model itself.
+
+    Rows removed by a cascade from elsewhere (e.g. a user's accounts and
+    categories) are left to the handler of the object actually deleted, so
+    transactions reached through several paths are released once.
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(pre_delete, sender=Category)
+def release_category_transactions(sender, instance, origin=None, **kwargs):
+    """Reverse account totals for transactions removed by a category cascade"""
+    if not deleted_directly(Category, origin):
+        return
+    # The category's rollup rows go with the same cascade
+    ledger.record_bulk_delete(Transaction.objects.filter(category=instance), include_rollups=False)
+    receipt_blobs.release_transactions(Transaction.objects.filter(category=instance))
+
+
+@receiver(pre_delete, sender=Account)
+def release_account_receipts(sender, instance, origin=None, **kwargs):
+    """Drop the receipt references of transactions removed by an account cascade"""
+    if deleted_directly(Account, origin):
+        receipt_blobs.release_transactions(Transaction.objects.filter(account=instance))
+
+
+@receiver(pre_delete, sender=User)
+def release_user_receipts(sender, instance, origin=None, **kwargs):
+    """Drop the receipt references of a deleted user's transactions, once"""
+    # Their accounts, categories and rollups go with the same cascade, only shared blobs outlive it
+    if deleted_directly(User, origin):
+        receipt_blobs.release_transactions(Transaction.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    """Make the owner's cached dashboard and summary responses unreachable"""
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+# The admin deletes tokens through the proxy model, which sends its own signal
+@receiver(post_delete, sender=TokenProxy)
+def forget_token(sender, instance, **kwargs):
+    """Stop authenticating a deleted token (logout) from the token cache"""
+    token_cache.invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached copies of a changed user, e.g. after a password change or deactivation"""
+    if not created:
+        token_cache.invalidate_user(instance.pk)
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    """Recreate the SQLite full-text triggers after migrations that rebuilt the transactions table"""
+    ensure_search_index(connections[using])
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db.models import Q
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, DailyRollup, Transaction, User
+from api.services.aggregation import bucket_totals
+from api.services.periods import local_today, user_timezone
+
+
+class BucketTotalsTests(TestCase):
+    """Income, expense and count totals of every bucket come from one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buckets@example.invalid', 'password', name='Buckets')
+        account = Account.objects.create(user=cls.user, title='Checking')
+        category = Category.objects.create(user=cls.user, title='Food')
+
+        def add(amount, transaction_type, day):
+            Transaction.objects.create(
+                user=cls.user, title='Entry', amount=amount, transaction_type=transaction_type,
+                category=category, account=account, date=day,
+            )
+
+        add('10.00', 'expense', date(2024, 1, 5))
+        add('2.50', 'expense', date(2024, 1, 5))
+        add('100.00', 'income', date(2024, 1, 20))
+        add('40.00', 'expense', date(2024, 2, 3))
+
+    def buckets(self):
+        return {
+            'january': Q(date__lt=date(2024, 2, 1)),
+            'february': Q(date__gte=date(2024, 2, 1)),
+            'march': Q(date__gte=date(2024, 3, 1)),
+        }
+
+    def test_rollups(self):
+        with self.assertNumQueries(1):
+            totals = bucket_totals(DailyRollup.objects.filter(user=self.user), self.buckets())
+
+        self.assertEqual(totals['january'], {
+            'income': Decimal('100.00'), 'expenses': Decimal('12.50'), 'net': Decimal('87.50'),
+            'count': 3, 'income_count': 1, 'expense_count': 2,
+        })
+        self.assertEqual(
+            (totals['february']['expenses'], totals['february']['net'], totals['february']['count']),
+            (Decimal('40.00'), Decimal('-40.00'), 1),
+        )
+        self.assertEqual(totals['march'], {
+            'income': 0, 'expenses': 0, 'net': 0, 'count': 0, 'income_count': 0, 'expense_count': 0,
+        })
+
+    def test_transactions(self):
+        with self.assertNumQueries(1):
+            totals = bucket_totals(
+                Transaction.objects.filter(user=self.user), self.buckets(), amount_field='amount', count_field=None
+            )
+
+        self.assertEqual(
+            (totals['january']['net'], totals['january']['income_count'], totals['january']['expense_count']),
+            (Decimal('87.50'), 1, 2),
+        )
+        self.assertEqual(totals['february']['count'], 1)
+
+
+class PeriodStatsTests(TestCase):
+    """quick_stats and summary read their totals from bucket_totals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('stats@example.invalid', 'password', name='Stats')
+        account = Account.objects.create(user=cls.user, title='Checking')
+        category = Category.objects.create(user=cls.user, title='Food')
+        today = local_today(user_timezone(cls.user))
+        for amount, transaction_type, day in [
+            ('12.50', 'expense', today),
+            ('1000.00', 'income', today),
+            ('99.00', 'expense', today - timedelta(days=40)),
+        ]:
+            Transaction.objects.create(
+                user=cls.user, title='Entry', amount=amount, transaction_type=transaction_type,
+                category=category, account=account, date=day,
+            )
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_quick_stats(self):
+        data = self.client.get(reverse('api:quick_stats')).data
+
+        for period in ('today', 'week', 'month'):
+            with self.subTest(period):
+                self.assertEqual(data[period], {
+                    'income': Decimal('1000.00'), 'expenses': Decimal('12.50'), 'net': Decimal('987.50'), 'count': 2,
+                })
+
+    def test_summary(self):
+        # All three were entered this month
+        summary = self.client.get(reverse('api:Transaction-summary'), {'period': 'month'}).data['summary']
+
+        self.assertEqual(summary, {
+            'total_income': Decimal('1000.00'), 'total_expenses': Decimal('111.50'), 'net_amount': Decimal('888.50'),
+            'transaction_count': 3, 'income_count': 1, 'expense_count': 2,
+        })
@@ -0,0 +1,110 @@
+import threading
+import time
+from datetime import date
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services.dashboard import gather_sections
+from api.services.periods import local_today, user_timezone
+
+
+@override_settings(DASHBOARD_WORKERS=0)
+class AsyncDashboardTests(TestCase):
+    """The async dashboard views answer like the sync ones and share their cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('async@example.invalid', 'password', name='Async')
+        cls.token = Token.objects.create(user=cls.user)
+        account = Account.objects.create(user=cls.user, title='Checking', initial='100.00')
+        category = Category.objects.create(user=cls.user, title='Food')
+        today = local_today(user_timezone(cls.user))
+        for amount, transaction_type, day in [
+            ('12.50', 'expense', today),
+            ('2500.00', 'income', today),
+            ('40.00', 'expense', date(2024, 1, 15)),
+        ]:
+            Transaction.objects.create(
+                user=cls.user, title='Entry', amount=amount, transaction_type=transaction_type,
+                category=category, account=account, date=day,
+            )
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_same_data_as_the_sync_views(self):
+        for sync_name, async_name, params in [
+            ('api:dashboard', 'api:dashboard_async', {}),
+            ('api:dashboard', 'api:dashboard_async', {'period': 'year'}),
+            ('api:quick_stats', 'api:quick_stats_async', {}),
+        ]:
+            with self.subTest(async_name, **params):
+                caches['responses'].clear()
+                response = self.client.get(reverse(async_name), params)
+                self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'))
+                self.assertEqual(response['Content-Type'], 'application/json')
+                caches['responses'].clear()
+                self.assertEqual(response.json(), self.client.get(reverse(sync_name), params).json())
+
+    def test_cache_is_shared(self):
+        self.client.get(reverse('api:dashboard'))
+
+        self.assertEqual(self.client.get(reverse('api:dashboard_async'))['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(reverse('api:quick_stats_async'))['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(reverse('api:quick_stats'))['X-Cache'], 'HIT')
+
+    def test_needs_authentication(self):
+        response = APIClient().get(reverse('api:dashboard_async'))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        self.assertEqual(
+            APIClient(HTTP_AUTHORIZATION='Token wrong').get(reverse('api:quick_stats_async')).status_code, 401
+        )
+
+    def test_only_get(self):
+        response = self.client.post(reverse('api:dashboard_async'))
+
+        self.assertEqual((response.status_code, response['Allow']), (405, 'GET'))
+
+
+class GatherSectionsTests(SimpleTestCase):
+    """Sections run concurrently on the bounded dashboard pool"""
+
+    def sections(self, count, delay):
+        def section(name):
+            def run(threads):
+                time.sleep(delay)
+                threads.add(threading.current_thread().name)
+                return name
+            return run
+        return {f'section_{index}': section(f'section_{index}') for index in range(count)}
+
+    @override_settings(DASHBOARD_WORKERS=4)
+    def test_concurrent(self):
+        threads = set()
+        started = time.monotonic()
+
+        results = async_to_sync(gather_sections)(self.sections(4, 0.3), threads)
+
+        # One after another would take 1.2 seconds
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(results, {name: name for name in self.sections(4, 0)})
+        self.assertTrue(all(name.startswith('dashboard') for name in threads))
+
+    @override_settings(DASHBOARD_WORKERS=0)
+    def test_inline(self):
+        threads = set()
+
+        results = async_to_sync(gather_sections)(self.sections(2, 0), threads)
+
+        self.assertEqual(list(results), ['section_0', 'section_1'])
+        self.assertEqual(len(threads), 1)
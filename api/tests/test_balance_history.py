@@ -0,0 +1,89 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+
+
+class BalanceHistoryTests(TestCase):
+    """Points are end-of-bucket balances that carry on from the balance before the range"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('history@example.invalid', 'password', name='History')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', initial='100.00')
+        category = Category.objects.create(user=cls.user, title='General')
+        other = Account.objects.create(user=cls.user, title='Savings')
+        for amount, transaction_type, day, account in [
+            ('10.00', 'expense', date(2023, 12, 20), cls.account),
+            ('50.00', 'income', date(2024, 1, 2), cls.account),
+            ('5.00', 'expense', date(2024, 1, 2), cls.account),
+            ('20.00', 'expense', date(2024, 1, 10), cls.account),
+            ('999.00', 'income', date(2024, 1, 10), other),
+            ('30.00', 'income', date(2024, 2, 3), cls.account),
+        ]:
+            Transaction.objects.create(
+                user=cls.user, title='Entry', amount=amount, transaction_type=transaction_type,
+                category=category, account=account, date=day,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def history(self, **params):
+        response = self.client.get(reverse('api:Account-balance-history', args=[self.account.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def points(self, data, *fields):
+        return [tuple(point[field] for field in fields) for point in data['balance_history']]
+
+    def test_daily_from_the_opening_balance(self):
+        data = self.history(start_date='2024-01-01', end_date='2024-01-31', granularity='day')
+
+        self.assertEqual((data['opening_balance'], data['closing_balance']), (Decimal('90.00'), Decimal('115.00')))
+        self.assertEqual(self.points(data, 'date', 'balance', 'income', 'expenses', 'net', 'count'), [
+            (date(2024, 1, 2), Decimal('135.00'), Decimal('50.00'), Decimal('5.00'), Decimal('45.00'), 2),
+            (date(2024, 1, 10), Decimal('115.00'), 0, Decimal('20.00'), Decimal('-20.00'), 1),
+        ])
+
+    def test_monthly(self):
+        data = self.history(start_date='2024-01-01', end_date='2024-02-29', granularity='month')
+
+        self.assertEqual(self.points(data, 'date', 'balance', 'count'), [
+            (date(2024, 1, 1), Decimal('115.00'), 3),
+            (date(2024, 2, 1), Decimal('145.00'), 1),
+        ])
+
+    def test_downsampled_points_keep_the_closing_balance(self):
+        data = self.history(start_date='2024-01-01', end_date='2024-02-29', granularity='day', max_points=2)
+
+        self.assertEqual(self.points(data, 'date', 'balance', 'net', 'count'), [
+            (date(2024, 1, 2), Decimal('135.00'), Decimal('45.00'), 2),
+            (date(2024, 1, 10), Decimal('145.00'), Decimal('10.00'), 2),
+        ])
+        self.assertEqual(data['closing_balance'], Decimal('145.00'))
+
+    def test_granularity_follows_the_range(self):
+        self.assertEqual(self.history(start_date='2024-01-01', end_date='2024-01-31')['granularity'], 'day')
+        self.assertEqual(self.history(start_date='2023-01-01', end_date='2024-02-29')['granularity'], 'week')
+        self.assertEqual(
+            self.history(start_date='2023-01-01', end_date='2024-02-29', max_points=12)['granularity'], 'month'
+        )
+
+    def test_all_time(self):
+        data = self.history(period='all')
+
+        self.assertEqual(data['start_date'], date(2023, 12, 20))
+        self.assertEqual((data['opening_balance'], data['closing_balance']), (Decimal('100.00'), Decimal('145.00')))
+        self.assertEqual(data['closing_balance'], data['current_balance'])
+
+    def test_invalid_parameters(self):
+        url = reverse('api:Account-balance-history', args=[self.account.pk])
+
+        self.assertEqual(self.client.get(url, {'granularity': 'hour'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'max_points': 'many'}).status_code, 400)
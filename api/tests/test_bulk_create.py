@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, DailyRollup, Tag, Transaction, User
+
+
+class BulkCreateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('bulk@example.invalid', 'password', name='Bulk')
+        cls.account = Account.objects.create(user=cls.user, title='Checking', initial='100.00')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+        other = User.objects.create_user('other@example.invalid', 'password', name='Other')
+        cls.foreign_category = Category.objects.create(user=other, title='Not yours')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def item(self, **fields):
+        return {
+            'title': 'Entry', 'amount': '10.00', 'transaction_type': 'expense', 'category': self.category.pk,
+            'account': self.account.pk, 'date': '2024-01-15', **fields,
+        }
+
+    def post(self, items):
+        return self.client.post(reverse('api:Transaction-bulk'), items, format='json')
+
+    def test_created_with_totals_and_tags(self):
+        response = self.post([
+            self.item(tags='Work'),
+            self.item(amount='2.50', tags='work, Lunch'),
+            self.item(amount='500.00', transaction_type='income', date='2024-01-20'),
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(row['id'] for row in response.data))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('587.50'))
+        self.assertEqual(
+            sorted(DailyRollup.objects.values_list('date__day', 'transaction_type', 'total_amount', 'transaction_count')),
+            [(15, 'expense', Decimal('12.50'), 2), (20, 'income', Decimal('500.00'), 1)],
+        )
+        self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['Lunch', 'Work'])
+
+    def test_errors_per_item_and_nothing_created(self):
+        response = self.post([
+            self.item(),
+            self.item(category=self.foreign_category.pk),
+            self.item(amount='not a number', account=0),
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(list(response.data[1]), ['category'])
+        self.assertEqual(sorted(response.data[2]), ['account', 'amount'])
+        self.assertFalse(Transaction.objects.exists())
+
+    @override_settings(BULK_TRANSACTION_MAX_ITEMS=2)
+    def test_batch_size_limit(self):
+        response = self.post([self.item(), self.item(), self.item()])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_needs_a_list(self):
+        self.assertEqual(self.post(self.item()).status_code, 400)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def queries(count):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.post([self.item()] * count).status_code, 201)
+            return len(captured)
+
+        # The first batch also creates the rollup row the others update
+        queries(1)
+        self.assertEqual(queries(3), queries(60))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services.periods import local_today, user_timezone
+
+
+class CategoryStatsTests(TestCase):
+    """Category statistics come from one grouped query and keep categories without activity"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('stats@example.invalid', 'password', name='Stats')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.food = Category.objects.create(user=cls.user, title='Food')
+        cls.work = Category.objects.create(user=cls.user, title='Work')
+        cls.idle = Category.objects.create(user=cls.user, title='Idle')
+        cls.today = local_today(user_timezone(cls.user))
+        cls.last_month = cls.today.replace(day=1) - timedelta(days=1)
+        cls.add(cls.food, '30.00', 'expense', cls.today)
+        cls.add(cls.food, '10.00', 'income', cls.today)
+        cls.add(cls.food, '20.00', 'expense', cls.last_month)
+        cls.add(cls.work, '60.00', 'income', cls.today)
+        other = User.objects.create_user('other@example.invalid', 'password', name='Other')
+        Transaction.objects.create(
+            user=other, title='Not yours', amount='500.00', transaction_type='expense', date=cls.today,
+            category=Category.objects.create(user=other, title='Food'),
+            account=Account.objects.create(user=other, title='Other'),
+        )
+
+    @classmethod
+    def add(cls, category, amount, transaction_type, day):
+        return Transaction.objects.create(
+            user=cls.user, title='Entry', amount=amount, transaction_type=transaction_type,
+            category=category, account=cls.account, date=day,
+        )
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stats(self, **params):
+        response = self.client.get(reverse('api:Category-with-stats'), params)
+        self.assertEqual(response.status_code, 200)
+        return {row['title']: row for row in response.data}
+
+    def test_this_month(self):
+        stats = self.stats()
+
+        self.assertEqual(set(stats), {'Food', 'Work', 'Idle'})
+        food = stats['Food']
+        self.assertEqual(
+            (food['total_amount'], food['income'], food['expenses'], food['net']),
+            (Decimal('40.00'), Decimal('10.00'), Decimal('30.00'), Decimal('-20.00')),
+        )
+        self.assertEqual((food['transaction_count'], food['income_count'], food['expense_count']), (2, 1, 1))
+        self.assertEqual((food['percentage'], food['income_percentage'], food['expense_percentage']), (40.0, 14.29, 100.0))
+        self.assertEqual((stats['Idle']['total_amount'], stats['Idle']['percentage']), (0, 0.0))
+        self.assertNotIn('change', food)
+
+    def test_all_time(self):
+        stats = self.stats(period='all')
+
+        self.assertEqual((stats['Food']['total_amount'], stats['Food']['transaction_count']), (Decimal('60.00'), 3))
+
+    def test_compared_with_the_previous_period(self):
+        stats = self.stats(compare='true')
+
+        food = stats['Food']
+        self.assertEqual((food['previous_total_amount'], food['previous_transaction_count']), (Decimal('20.00'), 1))
+        self.assertEqual((food['change'], food['change_percentage']), (Decimal('20.00'), 100.0))
+        self.assertIsNone(stats['Work']['change_percentage'])
+
+    def test_queries_do_not_grow_with_the_categories(self):
+        def queries():
+            caches['responses'].clear()
+            with CaptureQueriesContext(connection) as captured:
+                self.stats(compare='true')
+            return len(captured)
+
+        few = queries()
+        for index in range(10):
+            self.add(Category.objects.create(user=self.user, title=f'Extra {index}'), '1.00', 'expense', self.today)
+
+        self.assertEqual(queries(), few)
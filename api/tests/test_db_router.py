@@ -0,0 +1,83 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import router
+from django.test import RequestFactory, TestCase, override_settings
+
+from api.models import Transaction, User
+from api.services.response_cache import bump_data_version
+from core.db_router import replica_reads
+
+
+@replica_reads
+def reads_from(request):
+    return Transaction.objects.all().db
+
+
+@replica_reads
+async def async_reads_from(request):
+    return await sync_to_async(lambda: Transaction.objects.all().db)()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@example.invalid', 'password', name='Reader')
+        cls.other = User.objects.create_user('other@example.invalid', 'password', name='Other')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def request(self, method='get', user=None):
+        request = getattr(RequestFactory(), method)('/api/dashboard/')
+        request.user = user or self.user
+        return request
+
+    def test_reads_of_decorated_views_go_to_a_replica(self):
+        self.assertEqual(reads_from(self.request()), 'replica')
+        self.assertEqual(reads_from(self.request(user=AnonymousUser())), 'replica')
+        self.assertEqual(Transaction.objects.all().db, 'default')
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(reads_from(self.request('post')), 'default')
+        instance = Transaction(user=self.user)
+        instance._state.db = 'replica'
+        self.assertEqual(router.db_for_write(Transaction, instance=instance), 'default')
+
+    def test_async_views(self):
+        self.assertEqual(async_to_sync(async_reads_from)(self.request()), 'replica')
+
+    def test_reads_stay_on_the_primary_after_a_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version(self.user.pk)
+
+        self.assertEqual(reads_from(self.request()), 'default')
+        self.assertEqual(reads_from(self.request(user=self.other)), 'replica')
+
+    def test_rolled_back_writes_are_not_sticky(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            bump_data_version(self.user.pk)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(reads_from(self.request()), 'replica')
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version(self.user.pk)
+
+        self.assertEqual(reads_from(self.request()), 'replica')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica', 'api', model_name='transaction'))
+        self.assertTrue(router.allow_migrate('default', 'api', model_name='transaction'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            bump_data_version(self.user.pk)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(reads_from(self.request()), 'default')
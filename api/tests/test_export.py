@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services import export
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('export@example.invalid', 'password', name='Export')
+        account = Account.objects.create(user=cls.user, title='Checking')
+        category = Category.objects.create(user=cls.user, title='Food')
+
+        def add(user, title, amount, transaction_type, notes=''):
+            return Transaction.objects.create(
+                user=user, title=title, amount=amount, transaction_type=transaction_type, notes=notes,
+                category=category if user == cls.user else Category.objects.create(user=user, title='Other'),
+                account=account if user == cls.user else Account.objects.create(user=user, title='Other'),
+                date=date(2024, 1, 15),
+            )
+
+        cls.coffee = add(cls.user, 'Coffee, large', '3.50', 'expense', notes='=HYPERLINK("x")')
+        cls.salary = add(cls.user, 'Salary', '2500.00', 'income')
+        other = User.objects.create_user('other@example.invalid', 'password', name='Other')
+        add(other, 'Not yours', '1.00', 'expense')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **params):
+        response = self.client.get(reverse('api:Transaction-export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv(self):
+        response, body = self.download(ordering='title')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="transactions-\d{8}\.csv"$')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['title'] for row in rows], ['Coffee, large', 'Salary'])
+        self.assertEqual(rows[0]['amount'], '3.50')
+        self.assertEqual(rows[0]['category'], 'Food')
+        self.assertEqual(rows[0]['created_at'], self.coffee.created_at.isoformat())
+        # Formulas are defused for spreadsheet apps
+        self.assertEqual(rows[0]['notes'], '\'=HYPERLINK("x")')
+
+    def test_ndjson_with_filters(self):
+        response, body = self.download(export_format='ndjson', transaction_type='income')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(
+            (rows[0]['id'], rows[0]['amount'], rows[0]['account'], rows[0]['date']),
+            (self.salary.pk, '2500.00', 'Checking', '2024-01-15'),
+        )
+
+    def test_rows_are_streamed_in_batches(self):
+        with mock.patch.object(export, 'ROWS_PER_WRITE', 1):
+            chunks = list(self.client.get(reverse('api:Transaction-export')).streaming_content)
+
+        # The header, then one chunk per row
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith(b'id,date,title'))
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('api:Transaction-export'), {'export_format': 'xlsx'})
+
+        self.assertEqual(response.status_code, 400)
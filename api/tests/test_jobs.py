@@ -0,0 +1,163 @@
+import tempfile
+from datetime import date, timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Job, Transaction, User
+from api.services import jobs, rollups
+from core.storage import job_storage
+
+STATEMENT = b'date,description,amount\n2024-01-02,Coffee,-3.50\n2024-01-03,Salary,2500.00\nbad,Rent,-900\n'
+
+
+class JobQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jobs@example.invalid', 'password', name='Jobs')
+
+    def running(self, attempts, heartbeat_age):
+        return Job.objects.create(
+            kind='rollups.rebuild', user=self.user, status='running', worker='gone:1', attempts=attempts,
+            max_attempts=3, heartbeat_at=timezone.now() - timedelta(seconds=heartbeat_age),
+        )
+
+    @override_settings(JOB_TIMEOUT=60)
+    def test_stale_job_is_requeued_as_an_attempt(self):
+        job = self.running(attempts=0, heartbeat_age=120)
+        fresh = self.running(attempts=0, heartbeat_age=10)
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.worker), ('queued', 1, ''))
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, 'running')
+
+    @override_settings(JOB_TIMEOUT=60)
+    def test_stale_job_out_of_attempts_fails(self):
+        job = self.running(attempts=2, heartbeat_age=120)
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_rollup_rebuild_reports_every_batch(self):
+        account = Account.objects.create(user=self.user, title='Checking')
+        category = Category.objects.create(user=self.user, title='Food')
+        for day in range(1, 4):
+            Transaction.objects.create(
+                user=self.user, title='Lunch', amount='8.00', transaction_type='expense',
+                category=category, account=account, date=date(2024, 1, day),
+            )
+        batches = []
+
+        written = rollups.rebuild_for_user(self.user.pk, batch_size=2, on_batch=batches.append)
+
+        self.assertEqual(written, 3)
+        self.assertEqual(batches, [2, 3])
+
+    def test_rollup_rebuild_job(self):
+        jobs.enqueue('rollups.rebuild', user=self.user)
+
+        job = jobs.run_next()
+
+        self.assertEqual((job.status, job.result), ('succeeded', {'rollup_rows': 0}))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class StatementImportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer@example.invalid', 'password', name='Importer')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, statement=STATEMENT, **data):
+        return self.client.post(
+            reverse('api:Transaction-import-statement') + '?async=true',
+            {'file': SimpleUploadedFile('statement.csv', statement, 'text/csv'), **data},
+            format='multipart',
+        )
+
+    def test_queued_and_imported_by_a_worker(self):
+        response = self.post(account=self.account.pk)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['kind'], 'statements.import')
+        self.assertFalse(Transaction.objects.filter(account=self.account).exists())
+        upload = Job.objects.get(pk=response.data['id']).params['upload']
+        self.assertTrue(job_storage().exists(upload))
+        self.assertNotIn('statement', upload)
+
+        job = jobs.run_next()
+
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result['inserted'], 2)
+        self.assertEqual(len(job.result['errors']), 1)
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 2)
+        self.assertFalse(job_storage().exists(upload))
+
+    def test_upload_kept_for_retries_and_discarded_after_the_last_attempt(self):
+        response = self.post(statement=b'when,what\n2024-01-02,Coffee\n', account=self.account.pk)
+        job = Job.objects.get(pk=response.data['id'])
+        Job.objects.filter(pk=job.pk).update(max_attempts=2)
+
+        with self.assertLogs('api.services.jobs', 'ERROR'):
+            job = jobs.run_next()
+        self.assertEqual(job.status, 'queued')
+        self.assertTrue(job_storage().exists(job.params['upload']))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('api.services.jobs', 'ERROR'):
+            job = jobs.run_next()
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(job_storage().exists(job.params['upload']))
+
+    def test_cancel_discards_upload(self):
+        response = self.post(account=self.account.pk)
+        job = Job.objects.get(pk=response.data['id'])
+
+        self.assertTrue(jobs.cancel(job))
+
+        self.assertFalse(job_storage().exists(job.params['upload']))
+
+    def test_export_result_name_cannot_be_guessed(self):
+        Transaction.objects.create(
+            user=self.user, title='Coffee', amount='3.50', transaction_type='expense',
+            category=Category.objects.create(user=self.user, title='Food'), account=self.account,
+            date=date(2024, 1, 2),
+        )
+        jobs.enqueue('transactions.export', {'export_format': 'csv'}, user=self.user)
+
+        job = jobs.run_next()
+
+        self.assertEqual(job.status, 'succeeded')
+        self.assertNotIn('transactions', job.result_file.name)
+        response = self.client.get(reverse('api:Job-result', args=[job.pk]))
+        self.assertIn(job.result['filename'], response['Content-Disposition'])
+        self.assertIn(b'Coffee', b''.join(response.streaming_content))
+
+    def test_validated_before_queueing(self):
+        other = User.objects.create_user('other@example.invalid', 'password', name='Other')
+        account = Account.objects.create(user=other, title='Not yours')
+
+        response = self.post(account=account.pk)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_not_queued_through_the_jobs_endpoint(self):
+        response = self.client.post(reverse('api:Job-list'), {'kind': 'statements.import'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,108 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from api.models import Account, Category, Transaction, User
+from api.services import ledger
+from api.services.statement_import import StatementImporter, StatementRow
+
+
+class LedgerTests(TestCase):
+    """The stored account totals match a recount from the transactions after every kind of write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ledger@example.invalid', 'password', name='Ledger')
+        cls.checking = Account.objects.create(user=cls.user, title='Checking', initial='100.00')
+        cls.savings = Account.objects.create(user=cls.user, title='Savings', initial='50.00')
+        cls.food = Category.objects.create(user=cls.user, title='Food')
+        cls.salary = Category.objects.create(user=cls.user, title='Salary')
+
+    def add(self, amount, transaction_type='expense', account=None, category=None):
+        return Transaction.objects.create(
+            user=self.user, title='Entry', amount=amount, transaction_type=transaction_type,
+            category=category or self.food, account=account or self.checking, date=date(2024, 1, 15),
+        )
+
+    def assertTotalsRebuilt(self):
+        for account in (self.checking, self.savings):
+            stored, expected = ledger.rebuild_account(account.pk, dry_run=True)
+            self.assertEqual(stored, expected, account.title)
+
+    def balance(self, account):
+        account.refresh_from_db()
+        return account.balance
+
+    def test_create(self):
+        self.add('12.50')
+        self.add('1000.00', 'income', category=self.salary)
+
+        self.assertTotalsRebuilt()
+        self.assertEqual(self.balance(self.checking), Decimal('1087.50'))
+
+    def test_bulk_create(self):
+        rows = [
+            StatementRow(line=2, date=date(2024, 1, 2), amount=Decimal('-3.50'), title='Coffee'),
+            StatementRow(line=3, date=date(2024, 1, 3), amount=Decimal('2500.00'), title='Salary'),
+        ]
+        StatementImporter(self.user, self.savings, self.food).run(rows)
+
+        self.assertTotalsRebuilt()
+        self.assertEqual(self.balance(self.savings), Decimal('2546.50'))
+
+    def test_update_amount(self):
+        txn = self.add('12.50')
+        txn.amount = Decimal('20.00')
+        txn.save()
+
+        self.assertTotalsRebuilt()
+        self.assertEqual(self.balance(self.checking), Decimal('80.00'))
+
+    def test_update_moves_account_and_type(self):
+        txn = self.add('12.50')
+        txn.account = self.savings
+        txn.transaction_type = 'income'
+        txn.save()
+
+        self.assertTotalsRebuilt()
+        self.assertEqual(self.balance(self.checking), Decimal('100.00'))
+        self.assertEqual(self.balance(self.savings), Decimal('62.50'))
+
+    def test_instance_delete(self):
+        self.add('12.50').delete()
+        self.add('7.00')
+
+        self.assertTotalsRebuilt()
+        self.assertEqual(self.balance(self.checking), Decimal('93.00'))
+
+    def test_queryset_delete(self):
+        self.add('12.50')
+        self.add('30.00', 'income', account=self.savings)
+        self.add('7.00', account=self.savings)
+
+        Transaction.objects.filter(account=self.savings).delete()
+
+        self.assertTotalsRebuilt()
+        self.assertEqual(self.balance(self.savings), Decimal('50.00'))
+        self.assertEqual(self.balance(self.checking), Decimal('87.50'))
+
+    def test_category_cascade(self):
+        self.add('12.50')
+        self.add('7.00', account=self.savings)
+        self.add('1000.00', 'income', category=self.salary)
+
+        self.food.delete()
+
+        self.assertTotalsRebuilt()
+        self.assertEqual(self.balance(self.checking), Decimal('1100.00'))
+        self.assertEqual(self.balance(self.savings), Decimal('50.00'))
+
+    def test_rebuild_corrects_drift(self):
+        self.add('12.50')
+        Account.objects.filter(pk=self.checking.pk).update(total_expense=0, balance=100)
+
+        stored, expected = ledger.rebuild_account(self.checking.pk)
+
+        self.assertNotEqual(stored, expected)
+        self.assertTotalsRebuilt()
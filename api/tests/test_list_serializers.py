@@ -0,0 +1,72 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+
+
+class TransactionListTests(TestCase):
+    """The row serializer lists transactions exactly like the model serializer, in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lists@example.invalid', 'password', name='Lists')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+        cls.add(title='Coffee', tags='work', notes='large')
+        receipt = cls.add(title='Lunch', amount='12.50')
+        # Stored names only, as the receipt worker leaves them; no files are needed
+        Transaction.objects.filter(pk=receipt.pk).update(
+            receipt='receipts/ab/cd/abcd.jpg', receipt_thumbnail='receipts/thumbnails/ab/cd/abcd.jpg',
+            receipt_status='ready',
+        )
+        cls.add(title='Salary', amount='2500.00', transaction_type='income', day=date(2024, 1, 31))
+
+    @classmethod
+    def add(cls, title, amount='3.50', transaction_type='expense', day=date(2024, 1, 15), **fields):
+        return Transaction.objects.create(
+            user=cls.user, title=title, amount=amount, transaction_type=transaction_type,
+            category=cls.category, account=cls.account, date=day, **fields,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def listing(self, fast, url=None, **params):
+        with override_settings(FAST_TRANSACTION_SERIALIZER=fast):
+            response = self.client.get(url or reverse('api:Transaction-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_same_output(self):
+        for url, params in [
+            (reverse('api:Transaction-list'), {}),
+            (reverse('api:Transaction-list'), {'pagination': 'cursor'}),
+            (reverse('api:Transaction-expenses'), {}),
+            (reverse('api:Account-transactions', args=[self.account.pk]), {}),
+        ]:
+            with self.subTest(url, **params):
+                self.assertEqual(self.listing(True, url, **params), self.listing(False, url, **params))
+
+        rows = {row['title']: row for row in self.listing(True)['results']}
+        self.assertEqual(rows['Lunch']['amount'], '12.50')
+        self.assertEqual(rows['Lunch']['category'], {'id': self.category.pk, 'title': 'Food'})
+        self.assertTrue(rows['Lunch']['receipt'].startswith('http://testserver/'))
+        self.assertIsNone(rows['Coffee']['receipt'])
+
+    def test_queries_do_not_grow_with_the_page(self):
+        def queries(fast):
+            with CaptureQueriesContext(connection) as captured:
+                self.listing(fast)
+            return len(captured)
+
+        few = {fast: queries(fast) for fast in (True, False)}
+        for index in range(8):
+            self.add(title=f'Entry {index}')
+
+        self.assertEqual({fast: queries(fast) for fast in (True, False)}, few)
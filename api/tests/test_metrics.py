@@ -0,0 +1,119 @@
+from datetime import date
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services import metrics, token_cache
+
+
+@override_settings(DASHBOARD_WORKERS=0, METRICS_SERVER_TIMING=True, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('metrics@example.invalid', 'password', name='Metrics')
+        cls.admin = User.objects.create_user('admin@example.invalid', 'password', name='Admin', is_superuser=True)
+        category = Category.objects.create(user=cls.user, title='Food')
+        account = Account.objects.create(user=cls.user, title='Wallet')
+        for amount in ('3.50', '12.00', '7.25'):
+            Transaction.objects.create(
+                user=cls.user, title='Lunch', amount=amount, transaction_type='expense',
+                category=category, account=account, date=date.today(),
+            )
+
+    def setUp(self):
+        metrics.reset()
+        caches['responses'].clear()
+        token_cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+        return client
+
+    def scrape(self):
+        response = self.client_for(self.admin).get(reverse('api:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_server_timing_reports_queries(self):
+        response = self.client_for(self.user).get(reverse('api:Transaction-list'))
+
+        self.assertEqual(response.status_code, 200)
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertIn('dur=', timing['app'])
+        # Token, count and page
+        self.assertIn('desc="3 queries"', timing['db'])
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        response = self.client_for(self.user).get(reverse('api:Transaction-list'))
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_metrics_per_route(self):
+        client = self.client_for(self.user)
+        client.get(reverse('api:Transaction-list'))
+        client.get(reverse('api:Transaction-list'))
+        size = len(client.get(reverse('api:Transaction-list')).content)
+
+        text = self.scrape()
+        labels = 'route="api:Transaction-list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 3', text)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 3', text)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3', text)
+        # The token is only looked up by the first request
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="2"}} 2', text)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="3"}} 3', text)
+        self.assertIn(f'http_request_db_queries_sum{{{labels}}} 7', text)
+        self.assertIn(f'http_response_size_bytes_total{{{labels}}} {size * 3}', text)
+
+    def test_cache_hits(self):
+        client = self.client_for(self.user)
+        self.assertEqual(client.get(reverse('api:dashboard'))['X-Cache'], 'MISS')
+        response = client.get(reverse('api:dashboard'))
+
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertIn('cache;desc="HIT"', response['Server-Timing'])
+        text = self.scrape()
+        self.assertIn('http_response_cache_total{route="api:dashboard",method="GET",result="hit"} 1', text)
+        self.assertIn('http_response_cache_total{route="api:dashboard",method="GET",result="miss"} 1', text)
+
+    def test_async_view_counts_queries(self):
+        response = self.client_for(self.user).get(reverse('api:quick_stats_async'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+        self.assertIn('http_requests_total{route="api:quick_stats_async",method="GET",status="200"} 1', self.scrape())
+
+    def test_streamed_bytes(self):
+        response = self.client_for(self.user).get(reverse('api:Transaction-export'))
+        size = len(b''.join(response.streaming_content))
+
+        self.assertIn(
+            f'http_response_size_bytes_total{{route="api:Transaction-export",method="GET"}} {size}', self.scrape()
+        )
+
+    def test_unmatched_routes_share_a_series(self):
+        self.client.get('/api/no-such-route/')
+        self.client.get('/api/another-missing-route/')
+
+        self.assertIn('http_requests_total{route="<unmatched>",method="GET",status="404"} 2', self.scrape())
+
+    def test_unknown_methods_share_a_series(self):
+        self.client.generic('FOO', '/api/no-such-route/')
+        self.client.generic('BAR', reverse('api:Transaction-list'))
+
+        text = self.scrape()
+        self.assertIn('http_requests_total{route="<unmatched>",method="OTHER",status="404"} 1', text)
+        self.assertIn('method="OTHER",status="401"} 1', text)
+        self.assertNotIn('FOO', text)
+        self.assertNotIn('BAR', text)
+
+    def test_metrics_need_an_admin(self):
+        self.assertEqual(self.client_for(self.user).get(reverse('api:metrics')).status_code, 403)
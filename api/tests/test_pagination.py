@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages follow the listing's own order, without gaps or duplicates"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pages@example.invalid', 'password', name='Pages')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+        other = Account.objects.create(user=cls.user, title='Savings')
+        # Created in a different order than their dates, with several on the same day
+        for index in range(23):
+            Transaction.objects.create(
+                user=cls.user, title=f'Entry {index}', amount='1.00', transaction_type='expense',
+                category=cls.category, account=cls.account if index % 5 else other,
+                date=date(2024, 1, 1) + timedelta(days=(index * 7) % 6),
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, params):
+        """Ids of every page following the next links, then of every page back through the previous links"""
+        forward, backward, pages = [], [], []
+        response = self.client.get(url, {**params, 'pagination': 'cursor', 'page_size': 4})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            forward.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        while response.data['previous']:
+            response = self.client.get(response.data['previous'])
+            backward[:0] = [row['id'] for row in response.data['results']]
+        return forward, backward + [row['id'] for row in pages[-1]['results']]
+
+    def expected(self, *ordering, **lookup):
+        return list(Transaction.objects.filter(**lookup).order_by(*ordering).values_list('pk', flat=True))
+
+    def test_account_transactions(self):
+        url = reverse('api:Account-transactions', args=[self.account.pk])
+
+        forward, backward = self.walk(url, {})
+
+        expected = self.expected('-date', '-id', account=self.account)
+        self.assertEqual(len(expected), 18)
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected)
+
+    def test_category_transactions(self):
+        url = reverse('api:Category-transactions', args=[self.category.pk])
+
+        forward, backward = self.walk(url, {})
+
+        expected = self.expected('-date', '-id', category=self.category)
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected)
+        # The same order as the page-number listing
+        page = [row['id'] for row in self.client.get(url).data['results']]
+        self.assertEqual(page, expected[:len(page)])
+
+    def test_explicit_ordering(self):
+        url = reverse('api:Category-transactions', args=[self.category.pk])
+
+        forward, backward = self.walk(url, {'ordering': 'date'})
+
+        expected = self.expected('date', 'id', category=self.category)
+        self.assertEqual((forward, backward), (expected, expected))
+
+    def test_transaction_list(self):
+        forward, _ = self.walk(reverse('api:Transaction-list'), {})
+
+        self.assertEqual(forward, self.expected('-created_at', '-id', user=self.user))
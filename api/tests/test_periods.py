@@ -0,0 +1,113 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services.periods import get_timezone
+
+NEW_YORK = get_timezone('America/New_York')
+
+
+class SummaryPeriodTests(TestCase):
+    """The summary counts transactions by when they were created, in the user's timezone"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('periods@example.invalid', 'password', name='Periods', timezone='America/New_York')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+
+    def setUp(self):
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, amount, transaction_date, created_at, transaction_type='expense'):
+        txn = Transaction.objects.create(
+            user=self.user, title='Entry', amount=amount, transaction_type=transaction_type,
+            category=self.category, account=self.account, date=transaction_date,
+        )
+        Transaction.objects.filter(pk=txn.pk).update(created_at=created_at)
+        return txn
+
+    def summary(self, **params):
+        response = self.client.get(reverse('api:Transaction-summary'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_created_at_basis(self):
+        # Entered in January for a December date: a January transaction
+        self.add('10.00', date(2023, 12, 30), datetime(2024, 1, 5, 12, tzinfo=NEW_YORK))
+        # Entered in February for a January date: not
+        self.add('99.00', date(2024, 1, 20), datetime(2024, 2, 2, 12, tzinfo=NEW_YORK))
+
+        data = self.summary(period='custom', start_date='2024-01-01', end_date='2024-01-31')
+
+        self.assertEqual(data['summary']['total_expenses'], Decimal('10.00'))
+        self.assertEqual(data['summary']['transaction_count'], 1)
+        self.assertEqual(list(data['category_breakdown']), [{'category__title': 'Food', 'total': Decimal('10.00')}])
+
+    def test_local_day_bounds(self):
+        # 04:30 UTC on February 1st is still January 31st in New York
+        self.add('7.00', date(2024, 1, 31), datetime(2024, 1, 31, 23, 30, tzinfo=NEW_YORK))
+        self.add('3.00', date(2024, 2, 1), datetime(2024, 2, 1, 0, 0, tzinfo=NEW_YORK), 'income')
+
+        january = self.summary(period='custom', start_date='2024-01-01', end_date='2024-01-31')['summary']
+        february = self.summary(period='custom', start_date='2024-02-01', end_date='2024-02-29')['summary']
+
+        self.assertEqual((january['total_expenses'], january['total_income']), (Decimal('7.00'), 0))
+        self.assertEqual((february['total_expenses'], february['total_income']), (0, Decimal('3.00')))
+
+
+class CalendarFilterTests(TestCase):
+    """The year, month, day and weekday list filters work in the user's timezone"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('calendar@example.invalid', 'password', name='Calendar', timezone='America/New_York')
+        account = Account.objects.create(user=cls.user, title='Checking')
+        category = Category.objects.create(user=cls.user, title='Food')
+
+        def add(created_at):
+            txn = Transaction.objects.create(
+                user=cls.user, title='Entry', amount='1.00', transaction_type='expense',
+                category=category, account=account, date=created_at.date(),
+            )
+            Transaction.objects.filter(pk=txn.pk).update(created_at=created_at)
+            return txn
+
+        # Wednesday, January 31st late in the evening: February 1st in UTC
+        cls.late = add(datetime(2024, 1, 31, 23, 30, tzinfo=NEW_YORK))
+        # Thursday, February 1st
+        cls.february = add(datetime(2024, 2, 1, 9, 0, tzinfo=NEW_YORK))
+        # Friday, January 31st a year later
+        cls.next_year = add(datetime(2025, 1, 31, 12, 0, tzinfo=NEW_YORK))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, **params):
+        response = self.client.get(reverse('api:Transaction-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def test_year_and_month(self):
+        self.assertEqual(self.ids(year=2024, month=1), {self.late.pk})
+        self.assertEqual(self.ids(year=2024, month=2), {self.february.pk})
+        self.assertEqual(self.ids(year=2024), {self.late.pk, self.february.pk})
+
+    def test_year_month_and_day(self):
+        self.assertEqual(self.ids(year=2024, month=1, day=31), {self.late.pk})
+        self.assertEqual(self.ids(year=2024, month=2, day=30), set())
+
+    def test_recurring_parts(self):
+        self.assertEqual(self.ids(month=1), {self.late.pk, self.next_year.pk})
+        self.assertEqual(self.ids(day=31), {self.late.pk, self.next_year.pk})
+        self.assertEqual(self.ids(weekday=2), {self.late.pk})
+        self.assertEqual(self.ids(weekday=3), {self.february.pk})
+        self.assertEqual(self.ids(year=2025, day=31), {self.next_year.pk})
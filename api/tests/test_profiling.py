@@ -0,0 +1,165 @@
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services import profiling, token_cache, watchdog
+
+
+@override_settings(DASHBOARD_WORKERS=0, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('profiled@example.invalid', 'password', name='Profiled')
+        cls.admin = User.objects.create_user('admin@example.invalid', 'password', name='Admin', is_superuser=True)
+        category = Category.objects.create(user=cls.user, title='Food')
+        account = Account.objects.create(user=cls.user, title='Wallet')
+        Transaction.objects.create(
+            user=cls.user, title='Lunch', amount='9.50', transaction_type='expense',
+            category=category, account=account, date=date.today(),
+        )
+
+    def setUp(self):
+        caches['responses'].clear()
+        token_cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+        return client
+
+    def test_inline_report_for_superusers(self):
+        response = self.client_for(self.admin).get(reverse('api:dashboard'), HTTP_X_PROFILE='inline')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Profile-Status'], '200')
+        report = response.content.decode()
+        self.assertTrue(report.startswith('GET /api/dashboard/, status 200, '))
+        self.assertIn('by cumulative time (cProfile)', report)
+        self.assertIn('dashboard_views.py', report)
+        self.assertIn('by line (tracemalloc)', report)
+
+    def test_session_login(self):
+        client = APIClient()
+        client.force_login(self.admin)
+
+        response = client.get(reverse('api:Transaction-list'), HTTP_X_PROFILE='inline')
+
+        self.assertIn('by cumulative time (cProfile)', response.content.decode())
+
+    def test_stored_report(self):
+        with self.settings(MEDIA_ROOT=self.media):
+            response = self.client_for(self.admin).get(reverse('api:Transaction-list'), HTTP_X_PROFILE='1')
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['count'], 0)
+            name = response['X-Profile-Report']
+            self.assertTrue(name.startswith('profiles/') and name.endswith('.txt'))
+            storage = profiling.get_storage()
+            with storage.open(name) as report:
+                self.assertIn(b'GET /api/transactions/', report.read())
+            self.assertTrue(storage.exists(name[:-len('.txt')] + '.prof'))
+
+    def test_ignored_for_other_users(self):
+        response = self.client_for(self.user).get(reverse('api:Transaction-list'), HTTP_X_PROFILE='inline')
+
+        self.assertEqual(response.json()['count'], 1)
+        self.assertNotIn('X-Profile-Report', response)
+
+    def test_signed_header(self):
+        client = self.client_for(self.user)
+        signature = profiling.make_signature()
+
+        response = client.get(
+            reverse('api:Transaction-list'), HTTP_X_PROFILE='inline', HTTP_X_PROFILE_SIGNATURE=signature
+        )
+        self.assertIn('by cumulative time (cProfile)', response.content.decode())
+
+        response = client.get(
+            reverse('api:Transaction-list'), HTTP_X_PROFILE='inline', HTTP_X_PROFILE_SIGNATURE=signature + 'x'
+        )
+        self.assertEqual(response.json()['count'], 1)
+
+        with self.settings(PROFILE_SIGNATURE_MAX_AGE=-1):
+            response = client.get(
+                reverse('api:Transaction-list'), HTTP_X_PROFILE='inline', HTTP_X_PROFILE_SIGNATURE=signature
+            )
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_one_profile_at_a_time(self):
+        self.assertTrue(profiling.try_acquire())
+        try:
+            response = self.client_for(self.admin).get(reverse('api:Transaction-list'), HTTP_X_PROFILE='inline')
+        finally:
+            profiling.release()
+
+        self.assertEqual(response['X-Profile'], 'busy')
+        self.assertEqual(response.json()['count'], 0)
+
+
+@override_settings(SLOW_REQUEST_SECONDS=0.05)
+class SlowRequestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('slow@example.invalid', 'password', name='Slow')
+
+    def setUp(self):
+        token_cache.clear()
+
+    def test_logs_stack_of_running_request(self):
+        request = RequestFactory().get('/api/dashboard/')
+        blocked = threading.Event()
+        release = threading.Event()
+
+        def slow_view():
+            request_id = watchdog.begin(request)
+            blocked.set()
+            release.wait(5)
+            watchdog.end(request_id, request, 200)
+
+        thread = threading.Thread(target=slow_view)
+        thread.start()
+        try:
+            blocked.wait(5)
+            # The watchdog's own thread may get to it first
+            with self.assertLogs('api.services.watchdog', 'WARNING') as logs:
+                time.sleep(0.06)
+                watchdog.check()
+                # Logged once per request
+                watchdog.check()
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Slow request GET /api/dashboard/ running for', logs.output[0])
+        self.assertIn('in slow_view', logs.output[0])
+        self.assertIn('release.wait(5)', logs.output[0])
+
+    def test_logs_queries_of_finished_request(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+        with self.assertLogs('api.services.watchdog', 'WARNING') as logs, \
+                self.settings(SLOW_REQUEST_SECONDS=1e-9):
+            client.get(reverse('api:Transaction-list'))
+
+        finished = [line for line in logs.output if ' took ' in line]
+        self.assertEqual(len(finished), 1)
+        self.assertIn('Slow request GET /api/transactions/ took', finished[0])
+        self.assertIn(f'status 200, user {self.user.pk}', finished[0])
+        # Token and count, no page of an empty list
+        self.assertIn('2 queries in', finished[0])
+        self.assertIn('FROM "authtoken_token"', finished[0])
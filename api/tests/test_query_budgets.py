@@ -0,0 +1,256 @@
+"""
+SQL query budgets of every API endpoint.
+
+Every route in ``api/urls.py`` is requested as a seeded user with
+``SMALL_ROWS`` transactions and as one with ``LARGE_ROWS``. The number of
+queries must stay within the endpoint's budget and must be the same for
+both users, so an N+1 pattern or a per-row query fails the build. Wall time
+is recorded per endpoint and checked against a ceiling; set
+``QUERY_BUDGET_REPORT`` to a path to write the measurements as JSON.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Tag, Transaction, User
+from api.services import jobs, token_cache
+
+SMALL_ROWS = 10
+LARGE_ROWS = 1000
+# Generous, so only a real regression (not a slow machine) trips it
+MAX_SECONDS = float(os.environ.get('QUERY_BUDGET_MAX_SECONDS', 2.0))
+
+
+@dataclass
+class Endpoint:
+    name: str
+    budget: int
+    method: str = 'get'
+    # Fixture ids passed as URL arguments, see ``QueryBudgetTests.seed``
+    args: tuple = ()
+    params: dict = field(default_factory=dict)
+    # Request body, or a function of the fixture ids returning one
+    data: object = None
+    format: str = 'json'
+    status: int = 200
+    anonymous: bool = False
+    # Cascading deletes run in batches of the database's parameter limit, so
+    # their count may grow with the data, but must stay within the budget
+    grows: bool = False
+
+
+def transaction_body(ids):
+    return {
+        'title': 'Budget check', 'amount': '12.50', 'transaction_type': 'expense',
+        'category': ids['category'], 'account': ids['account'], 'date': '2024-01-15', 'tags': 'work, home',
+    }
+
+
+def statement_body(ids):
+    csv = b'date,description,amount\n2024-01-02,Coffee,-3.50\n2024-01-03,Salary,2500.00\n2024-01-04,Rent,-900\n'
+    return {'file': SimpleUploadedFile('statement.csv', csv, 'text/csv'), 'account': ids['account']}
+
+
+ENDPOINTS = [
+    Endpoint('api-root', 1),
+    Endpoint('Version-list', 0),
+    Endpoint('User-list', 3),
+    Endpoint('User-detail', 2, args=('user',)),
+    Endpoint('User-detail', 4, method='patch', args=('user',), data={'name': 'Renamed'}),
+    Endpoint('Category-list', 3),
+    Endpoint('Category-list', 5, method='post', data={'title': 'Budget category'}, status=201),
+    Endpoint('Category-detail', 2, args=('category',)),
+    Endpoint('Category-detail', 7, method='patch', args=('category',), data={'title': 'Renamed category'}),
+    Endpoint('Category-detail', 16, method='delete', args=('category',), status=204, grows=True),
+    Endpoint('Category-with-stats', 3),
+    Endpoint('Category-with-stats', 3, params={'period': 'month', 'compare': 'previous'}),
+    Endpoint('Category-transactions', 4, args=('category',)),
+    Endpoint('Account-list', 3),
+    Endpoint('Account-list', 5, method='post', data={'title': 'Budget account', 'initial': '10.00'}, status=201),
+    Endpoint('Account-detail', 2, args=('account',)),
+    Endpoint('Account-detail', 11, method='patch', args=('account',), data={'title': 'Renamed account'}),
+    Endpoint('Account-detail', 13, method='delete', args=('account',), status=204, grows=True),
+    Endpoint('Account-summary', 3),
+    Endpoint('Account-with-balance', 2),
+    Endpoint('Account-balance-history', 4, args=('account',)),
+    Endpoint('Account-balance-history', 4, args=('account',), params={'period': 'year', 'granularity': 'week'}),
+    Endpoint('Account-transactions', 4, args=('account',)),
+    Endpoint('Transaction-list', 3),
+    Endpoint('Transaction-list', 3, params={'search': 'coffee'}),
+    Endpoint('Transaction-list', 3, params={'tags_any': 'work,home', 'ordering': '-amount'}),
+    Endpoint('Transaction-list', 3, params={'period': 'month', 'transaction_type': 'income'}),
+    Endpoint('Transaction-list', 15, method='post', data=transaction_body, status=201),
+    Endpoint('Transaction-bulk', 14, method='post', data=lambda ids: [transaction_body(ids)] * 5, status=201),
+    Endpoint('Transaction-import-statement', 27, method='post', data=statement_body, format='multipart', status=201),
+    Endpoint('Transaction-detail', 2, args=('transaction',)),
+    Endpoint('Transaction-detail', 16, method='put', args=('transaction',), data=transaction_body),
+    Endpoint('Transaction-detail', 12, method='delete', args=('transaction',), status=204),
+    Endpoint('Transaction-summary', 6),
+    Endpoint('Transaction-summary', 6, params={'period': 'year'}),
+    Endpoint('Transaction-date-range', 3,
+             params={'start_date': date.today().replace(day=1).isoformat(), 'end_date': date.today().isoformat()}),
+    Endpoint('Transaction-expenses', 3),
+    Endpoint('Transaction-income', 3),
+    Endpoint('Transaction-by-category', 3, params={'category': None}),
+    Endpoint('Transaction-by-account', 3, params={'account': None}),
+    Endpoint('Transaction-export', 2),
+    Endpoint('Transaction-export', 2, params={'export_format': 'ndjson'}),
+    Endpoint('Transaction-export', 2, params={'async': 'true'}, status=202),
+    Endpoint('Tag-list', 3),
+    Endpoint('Tag-detail', 2, args=('tag',)),
+    Endpoint('Tag-spending', 2),
+    Endpoint('Job-list', 3),
+    Endpoint('Job-list', 2, method='post', data={'kind': 'rollups.rebuild'}, status=202),
+    Endpoint('Job-detail', 2, args=('job',)),
+    Endpoint('Job-cancel', 3, method='post', args=('job',), status=409),
+    Endpoint('Job-result', 2, args=('job',)),
+    Endpoint('dashboard', 6),
+    Endpoint('dashboard', 6, params={'period': 'year'}),
+    Endpoint('quick_stats', 3),
+    Endpoint('dashboard_async', 6),
+    Endpoint('quick_stats_async', 3),
+    Endpoint('cache_stats', 1),
+    Endpoint('metrics', 1),
+    Endpoint('signup', 5, method='post', anonymous=True, status=201,
+             data=lambda ids: {'name': 'New User', 'email': f"new{ids['user']}@example.invalid", 'password': 'new-password'}),
+    Endpoint('signin', 2, method='post', anonymous=True, data=lambda ids: {'email': ids['email'], 'password': 'perf-password'}),
+    Endpoint('login', 2, method='post', anonymous=True, data=lambda ids: {'username': ids['email'], 'password': 'perf-password'}),
+    Endpoint('logout', 2, method='post'),
+]
+
+
+@override_settings(
+    # Async sections on the test's own connection, so they see its data and are counted
+    DASHBOARD_WORKERS=0,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTests(TestCase):
+    measurements = []
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = {
+            SMALL_ROWS: cls.seed('small.invalid', SMALL_ROWS),
+            LARGE_ROWS: cls.seed('large.invalid', LARGE_ROWS),
+        }
+
+    @classmethod
+    def seed(cls, domain, rows):
+        call_command(
+            'seed_perf_data', users=1, transactions=rows - 1, receipts=0, email_domain=domain,
+            password='perf-password', stdout=StringIO(),
+        )
+        user = User.objects.get(email=f'perf0@{domain}')
+        user.is_superuser = True
+        user.save()
+        # One row every filter used below matches, so no request of the small user hits an empty page
+        known = Transaction.objects.create(
+            user=user, title='Coffee refund', amount='4.20', transaction_type='income', date=date.today(),
+            category=Category.objects.filter(user=user).order_by('pk').first(),
+            account=Account.objects.filter(user=user).order_by('pk').first(),
+            tags='work, home', notes='Budget fixture',
+        )
+        job = jobs.enqueue('rollups.rebuild', user=user)
+        job.status, job.result = 'succeeded', {'rollup_rows': 0}
+        job.save()
+        return {
+            'user': user.pk,
+            'email': user.email,
+            'token': Token.objects.create(user=user).key,
+            'account': known.account_id,
+            'category': known.category_id,
+            'transaction': known.pk,
+            'tag': Tag.objects.get(user=user, name='work').pk,
+            'job': job.pk,
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        path = os.environ.get('QUERY_BUDGET_REPORT')
+        if path:
+            with open(path, 'w') as report:
+                json.dump(sorted(cls.measurements, key=lambda row: -row['seconds']), report, indent=2)
+
+    def setUp(self):
+        # Measure cold requests: no cached responses, no cached tokens
+        caches['responses'].clear()
+        token_cache.clear()
+
+    def request(self, endpoint, ids):
+        client = APIClient()
+        if not endpoint.anonymous:
+            client.credentials(HTTP_AUTHORIZATION=f"Token {ids['token']}")
+        url = reverse(f'api:{endpoint.name}', args=[ids[name] for name in endpoint.args])
+        params = {name: ids[name] if value is None else value for name, value in endpoint.params.items()}
+        if params:
+            url = f"{url}?{'&'.join(f'{name}={value}' for name, value in params.items())}"
+        data = endpoint.data(ids) if callable(endpoint.data) else endpoint.data
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, endpoint.method)(url, data, format=endpoint.format) \
+                if data is not None else getattr(client, endpoint.method)(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            seconds = time.perf_counter() - started
+        if response.status_code != endpoint.status:
+            body = b'' if response.streaming else response.content[:500]
+            self.fail(f'{endpoint.name} {url} returned {response.status_code}: {body}')
+        return len(queries), seconds, queries
+
+    def check(self, endpoint):
+        counts = {}
+        for rows, ids in self.fixtures.items():
+            count, seconds, queries = self.request(endpoint, ids)
+            counts[rows] = (count, queries)
+            self.measurements.append({
+                'endpoint': endpoint.name, 'method': endpoint.method, 'params': endpoint.params,
+                'rows': rows, 'queries': count, 'seconds': round(seconds, 4),
+            })
+            self.assertLess(seconds, MAX_SECONDS, f'{endpoint.name} took {seconds:.2f}s with {rows} transactions')
+
+        small, large = counts[SMALL_ROWS][0], counts[LARGE_ROWS][0]
+        sql = '\n'.join(query['sql'] for query in counts[LARGE_ROWS][1].captured_queries)
+        if not endpoint.grows:
+            self.assertEqual(
+                small, large,
+                f'{endpoint.name}: {small} queries with {SMALL_ROWS} transactions, {large} with {LARGE_ROWS}\n{sql}'
+            )
+        self.assertLessEqual(large, endpoint.budget, f'{endpoint.name} is over its query budget\n{sql}')
+
+    def test_every_route_has_a_budget(self):
+        covered = {endpoint.name for endpoint in ENDPOINTS}
+        routes = set()
+        pending = list(get_resolver('api.urls').url_patterns)
+        while pending:
+            pattern = pending.pop()
+            if isinstance(pattern, URLResolver):
+                pending.extend(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                routes.add(pattern.name)
+        self.assertEqual(routes - covered, set())
+
+
+def make_test(endpoint):
+    def test(self):
+        self.check(endpoint)
+    return test
+
+
+for index, endpoint in enumerate(ENDPOINTS):
+    slug = endpoint.name.lower().replace('-', '_')
+    setattr(QueryBudgetTests, f'test_{index:02d}_{endpoint.method}_{slug}', make_test(endpoint))
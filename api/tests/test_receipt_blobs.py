@@ -0,0 +1,105 @@
+import tempfile
+from datetime import date, timedelta
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import Account, Category, ReceiptBlob, Transaction, User
+from api.services import ledger, receipt_blobs
+
+BLOB = 'receipts/ab/cd/abcd.jpg'
+THUMBNAIL = 'receipts/ef/01/ef01.jpg'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CascadeReleaseTests(TestCase):
+    """Receipt references of transactions removed by a cascade are released exactly once"""
+
+    def setUp(self):
+        self.owner = self.make_user('owner@example.invalid')
+        self.other = self.make_user('other@example.invalid')
+        receipt_blobs.recount()
+
+    def make_user(self, email):
+        user = User.objects.create_user(email, 'password', name=email)
+        for index in range(2):
+            account = Account.objects.create(user=user, title=f'Account {index}')
+            category = Category.objects.create(user=user, title=f'Category {index}')
+            transaction = Transaction.objects.create(
+                user=user, title='Receipt', amount='10.00', transaction_type='expense',
+                category=category, account=account, date=date.today(),
+            )
+            # Stored names only, as the receipt worker leaves them; no files are needed
+            Transaction.objects.filter(pk=transaction.pk).update(receipt=BLOB, receipt_thumbnail=THUMBNAIL)
+        return user
+
+    def refcounts(self):
+        return dict(ReceiptBlob.objects.values_list('name', 'refcount'))
+
+    def assertCountsMatchReferences(self):
+        references = receipt_blobs.reference_counts()
+        self.assertEqual(self.refcounts(), {name: references[name] for name in self.refcounts()})
+
+    def test_setup(self):
+        self.assertEqual(self.refcounts(), {BLOB: 4, THUMBNAIL: 4})
+
+    def test_user_delete(self):
+        self.owner.delete()
+
+        self.assertEqual(self.refcounts(), {BLOB: 2, THUMBNAIL: 2})
+        self.assertCountsMatchReferences()
+
+    def test_user_queryset_delete(self):
+        User.objects.filter(pk__in=[self.owner.pk, self.other.pk]).delete()
+
+        self.assertEqual(self.refcounts(), {BLOB: 0, THUMBNAIL: 0})
+
+    def test_account_delete(self):
+        account = Account.objects.filter(user=self.owner).first()
+        account.delete()
+
+        self.assertEqual(self.refcounts(), {BLOB: 3, THUMBNAIL: 3})
+        self.assertCountsMatchReferences()
+
+    def test_category_delete(self):
+        Category.objects.filter(user=self.owner).delete()
+
+        self.assertEqual(self.refcounts(), {BLOB: 2, THUMBNAIL: 2})
+        self.assertCountsMatchReferences()
+        for account in Account.objects.filter(user=self.owner):
+            stored, expected = ledger.rebuild_account(account.pk, dry_run=True)
+            self.assertEqual(stored, expected)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class GarbageCollectionTests(TestCase):
+    """An upload reusing an unreferenced blob never ends up pointing at a deleted object"""
+
+    def setUp(self):
+        self.storage = receipt_blobs.get_storage()
+        self.name = self.storage.save('receipts/photo.jpg', ContentFile(b'receipt'))
+        receipt_blobs.register([self.name])
+        self.expire()
+
+    def expire(self):
+        ReceiptBlob.objects.filter(name=self.name).update(updated_at=timezone.now() - timedelta(days=2))
+
+    def test_unreferenced_blob_is_collected(self):
+        self.assertEqual(receipt_blobs.collect_garbage(), (1, 0))
+
+        self.assertFalse(ReceiptBlob.objects.exists())
+        self.assertFalse(self.storage.exists(self.name))
+
+    def test_reused_blob_is_kept(self):
+        self.assertEqual(self.storage.save('receipts/again.jpg', ContentFile(b'receipt')), self.name)
+
+        self.assertEqual(receipt_blobs.collect_garbage(), (0, 0))
+        self.assertTrue(self.storage.exists(self.name))
+
+    def test_upload_after_collection_stores_the_object_again(self):
+        receipt_blobs.collect_garbage()
+
+        self.assertEqual(self.storage.save('receipts/again.jpg', ContentFile(b'receipt')), self.name)
+
+        self.assertTrue(self.storage.exists(self.name))
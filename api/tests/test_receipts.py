@@ -0,0 +1,127 @@
+import io
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services import receipt_blobs, receipts
+
+
+def photo(width=300, height=150, orientation=None):
+    """JPEG bytes of a test photo, optionally with an EXIF orientation and camera metadata"""
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), RECEIPT_WORKERS=0)
+class ReceiptProcessingTests(TestCase):
+    """Uploaded receipts are re-encoded with renditions after the upload has been saved"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('receipts@example.invalid', 'password', name='Receipts')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.storage = receipt_blobs.get_storage()
+
+    def add(self, content):
+        return Transaction.objects.create(
+            user=self.user, title='Lunch', amount='12.50', transaction_type='expense',
+            category=self.category, account=self.account, date=date(2024, 1, 15),
+            receipt=ContentFile(content, name='photo.jpg'),
+        )
+
+    def image(self, name):
+        with self.storage.open(name, 'rb') as stream:
+            image = Image.open(stream)
+            image.load()
+        return image
+
+    def test_upload_is_processed_after_the_response(self):
+        upload = SimpleUploadedFile('photo.jpg', photo(orientation=6), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('api:Transaction-list'), {
+                'title': 'Lunch', 'amount': '12.50', 'transaction_type': 'expense', 'category': self.category.pk,
+                'account': self.account.pk, 'date': '2024-01-15', 'receipt': upload,
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['receipt_status'], response.data['receipt_thumbnail']), ('pending', None))
+        for callback in callbacks:
+            callback()
+
+        txn = Transaction.objects.get(pk=response.data['id'])
+        self.assertEqual(txn.receipt_status, 'ready')
+        original = self.image(txn.receipt.name)
+        # Turned upright and without the camera metadata
+        self.assertEqual((original.format, original.size), ('JPEG', (150, 300)))
+        self.assertNotIn(0x010F, original.getexif())
+        self.assertEqual(self.image(txn.receipt_thumbnail.name).size, (128, 256))
+        self.assertEqual(self.image(txn.receipt_preview.name).size, (150, 300))
+
+    def test_renditions_are_bounded(self):
+        with override_settings(RECEIPT_MAX_DIMENSION=800), self.captureOnCommitCallbacks(execute=True):
+            txn = self.add(photo(width=1200, height=600))
+
+        txn.refresh_from_db()
+        self.assertEqual(self.image(txn.receipt.name).size, (800, 400))
+        self.assertEqual(self.image(txn.receipt_thumbnail.name).size, (256, 128))
+        self.assertEqual(self.image(txn.receipt_preview.name).size, (1024, 512))
+
+    def test_listed_with_thumbnail_urls(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            txn = self.add(photo())
+
+        row = self.client.get(reverse('api:Transaction-list')).data['results'][0]
+
+        txn.refresh_from_db()
+        self.assertEqual(row['receipt_status'], 'ready')
+        self.assertEqual(row['receipt_thumbnail'], f'http://testserver{txn.receipt_thumbnail.url}')
+
+    def test_undecodable_upload_fails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            txn = self.add(b'not an image')
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.receipt_status, 'failed')
+        self.assertFalse(txn.receipt_thumbnail)
+
+    def test_replaced_receipt_is_left_alone(self):
+        with self.captureOnCommitCallbacks():
+            txn = self.add(photo())
+        first = txn.receipt.name
+        with self.captureOnCommitCallbacks():
+            txn.receipt = ContentFile(photo(width=200), name='other.jpg')
+            txn.save()
+
+        self.assertFalse(receipts.process_receipt(txn.pk, first))
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.receipt_status, 'pending')
+        self.assertFalse(txn.receipt_thumbnail)
+
+    @override_settings(RECEIPT_WORKERS=2)
+    def test_handed_to_the_worker_pool(self):
+        with mock.patch.object(receipts, 'get_executor') as get_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                txn = self.add(photo())
+
+        get_executor.return_value.submit.assert_called_once_with(receipts.run_job, txn.pk, txn.receipt.name)
+        txn.refresh_from_db()
+        self.assertEqual(txn.receipt_status, 'pending')
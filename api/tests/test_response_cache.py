@@ -0,0 +1,91 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.services import response_cache
+
+
+class ResponseCacheTests(TestCase):
+    """Cached responses are per user and stop being served after any write to the user's data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cache@example.invalid', 'password', name='Cache')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+
+    def setUp(self):
+        caches['responses'].clear()
+        response_cache.reset_cache_stats()
+        self.client = self.client_for(self.user)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def add(self, amount):
+        return Transaction.objects.create(
+            user=self.user, title='Entry', amount=amount, transaction_type='expense',
+            category=self.category, account=self.account, date=date(2024, 1, 15),
+        )
+
+    def summary(self, client=None, query=''):
+        response = (client or self.client).get(reverse('api:Transaction-summary') + query)
+        return response['X-Cache'], response.data.get('summary')
+
+    def test_hit_until_a_transaction_changes(self):
+        self.add('10.00')
+
+        self.assertEqual(self.summary()[0], 'MISS')
+        cache_state, summary = self.summary()
+        self.assertEqual((cache_state, summary['total_expenses']), ('HIT', Decimal('10.00')))
+
+        self.add('5.00')
+        cache_state, summary = self.summary()
+        self.assertEqual((cache_state, summary['total_expenses']), ('MISS', Decimal('15.00')))
+
+    def test_account_and_category_writes_invalidate(self):
+        self.summary()
+
+        self.account.title = 'Main'
+        self.account.save()
+        self.assertEqual(self.summary()[0], 'MISS')
+
+        Category.objects.create(user=self.user, title='Travel')
+        self.assertEqual(self.summary()[0], 'MISS')
+        self.assertEqual(self.summary()[0], 'HIT')
+
+    def test_keyed_by_user_and_canonical_params(self):
+        other = User.objects.create_user('other@example.invalid', 'password', name='Other')
+
+        self.summary(query='?period=custom&start_date=2024-01-01&end_date=2024-01-31')
+
+        self.assertEqual(self.summary(query='?end_date=2024-01-31&start_date=2024-01-01&period=custom')[0], 'HIT')
+        self.assertEqual(self.summary(query='?period=week')[0], 'MISS')
+        self.assertEqual(self.summary(self.client_for(other), '?period=week')[0], 'MISS')
+
+    def test_errors_are_not_cached(self):
+        query = '?period=custom&start_date=someday&end_date=2024-01-01'
+
+        self.assertEqual(self.client.get(reverse('api:Transaction-summary') + query).status_code, 400)
+        response = self.client.get(reverse('api:Transaction-summary') + query)
+
+        self.assertEqual((response.status_code, response['X-Cache']), (400, 'MISS'))
+
+    def test_stats(self):
+        self.client.get(reverse('api:dashboard'))
+        self.client.get(reverse('api:dashboard'))
+        self.client.get(reverse('api:quick_stats'))
+        admin = User.objects.create_superuser('admin@example.invalid', 'password', name='Admin')
+
+        self.assertEqual(self.client.get(reverse('api:cache_stats')).status_code, 403)
+        stats = self.client_for(admin).get(reverse('api:cache_stats')).data
+
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertEqual(stats['endpoints']['dashboard'], {'hits': 1, 'misses': 1})
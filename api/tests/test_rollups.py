@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, DailyRollup, Transaction, User
+from api.services import rollups
+from api.services.periods import local_today, user_timezone
+from api.services.statement_import import StatementImporter, StatementRow
+
+
+class DailyRollupTests(TestCase):
+    """The rollup rows written along with every transaction change equal a rebuild from the transactions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('rollups@example.invalid', 'password', name='Rollups')
+        cls.checking = Account.objects.create(user=cls.user, title='Checking')
+        cls.savings = Account.objects.create(user=cls.user, title='Savings')
+        cls.food = Category.objects.create(user=cls.user, title='Food')
+        cls.salary = Category.objects.create(user=cls.user, title='Salary')
+
+    def add(self, amount, transaction_type='expense', day=date(2024, 1, 15), category=None, account=None):
+        return Transaction.objects.create(
+            user=self.user, title='Entry', amount=amount, transaction_type=transaction_type,
+            category=category or self.food, account=account or self.checking, date=day,
+        )
+
+    def rows(self):
+        return sorted(
+            DailyRollup.objects.filter(user=self.user).values_list(
+                'date', 'category__title', 'account__title', 'transaction_type', 'total_amount', 'transaction_count'
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        maintained = self.rows()
+        rollups.rebuild_for_user(self.user.pk)
+        self.assertEqual(maintained, self.rows())
+
+    def test_create(self):
+        self.add('12.50')
+        self.add('7.50')
+        self.add('1000.00', 'income', category=self.salary)
+
+        self.assertEqual(self.rows(), [
+            (date(2024, 1, 15), 'Food', 'Checking', 'expense', Decimal('20.00'), 2),
+            (date(2024, 1, 15), 'Salary', 'Checking', 'income', Decimal('1000.00'), 1),
+        ])
+        self.assertMatchesRebuild()
+
+    def test_update_moves_the_amount_between_rows(self):
+        txn = self.add('12.50')
+        self.add('7.50')
+
+        txn.date = date(2024, 2, 1)
+        txn.account = self.savings
+        txn.save()
+
+        self.assertEqual(self.rows(), [
+            (date(2024, 1, 15), 'Food', 'Checking', 'expense', Decimal('7.50'), 1),
+            (date(2024, 2, 1), 'Food', 'Savings', 'expense', Decimal('12.50'), 1),
+        ])
+        self.assertMatchesRebuild()
+
+    def test_emptied_rows_are_removed(self):
+        self.add('12.50').delete()
+        txn = self.add('7.50')
+        txn.transaction_type = 'income'
+        txn.save()
+
+        self.assertEqual(self.rows(), [(date(2024, 1, 15), 'Food', 'Checking', 'income', Decimal('7.50'), 1)])
+        self.assertMatchesRebuild()
+
+    def test_bulk_import(self):
+        # More keys than BATCH_THRESHOLD, so the deltas are written with bulk statements
+        statement = [
+            StatementRow(line=line, date=date(2024, 3, 1) + timedelta(days=line % 12), amount=Decimal(-line), title='Row')
+            for line in range(2, 30)
+        ]
+        self.add('5.00', day=date(2024, 3, 2))
+
+        StatementImporter(self.user, self.checking, self.food).run(statement)
+
+        self.assertEqual(len(self.rows()), 12)
+        self.assertEqual(sum(row[5] for row in self.rows()), 29)
+        self.assertMatchesRebuild()
+
+    def test_queryset_and_cascade_deletes(self):
+        self.add('12.50')
+        self.add('3.00', account=self.savings)
+        self.add('1000.00', 'income', category=self.salary, account=self.savings)
+
+        Transaction.objects.filter(account=self.checking).delete()
+        self.assertMatchesRebuild()
+
+        self.salary.delete()
+        self.assertEqual(self.rows(), [(date(2024, 1, 15), 'Food', 'Savings', 'expense', Decimal('3.00'), 1)])
+        self.assertMatchesRebuild()
+
+    def test_dashboard_totals(self):
+        today = local_today(user_timezone(self.user))
+        self.add('12.50', day=today)
+        self.add('1000.00', 'income', day=today, category=self.salary)
+        self.add('99.00', day=today - timedelta(days=400))
+        caches['responses'].clear()
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        summary = client.get(reverse('api:dashboard')).data['summary']
+        today_stats = client.get(reverse('api:quick_stats')).data['today']
+
+        self.assertEqual(
+            (summary['total_income'], summary['total_expenses'], summary['transaction_count']),
+            (Decimal('1000.00'), Decimal('12.50'), 2),
+        )
+        self.assertEqual((today_stats['net'], today_stats['count']), (Decimal('987.50'), 2))
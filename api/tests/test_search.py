@@ -0,0 +1,66 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+from api.search import full_text_search, has_search_index
+
+
+class FullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('search@example.invalid', 'password', name='Search')
+        account = Account.objects.create(user=cls.user, title='Checking')
+        category = Category.objects.create(user=cls.user, title='Food')
+
+        def add(title, notes='', tags=''):
+            return Transaction.objects.create(
+                user=cls.user, title=title, notes=notes, tags=tags, amount='5.00', transaction_type='expense',
+                category=category, account=account, date=date(2024, 1, 15),
+            )
+
+        cls.coffee = add('Coffee beans')
+        cls.noted = add('Groceries', notes='milk for the coffee')
+        cls.rent = add('Rent')
+        cls.tagged = add('Cafe', tags='coffee')
+
+    def setUp(self):
+        if not has_search_index(connection, refresh=True):
+            self.skipTest('No full-text index on this database')
+
+    def search(self, *terms):
+        return full_text_search(Transaction.objects.filter(user=self.user), list(terms))
+
+    def test_prefix_match_on_title_notes_and_tags(self):
+        self.assertEqual(set(self.search('cof')), {self.coffee, self.noted, self.tagged})
+        self.assertEqual(list(self.search('coffee', 'milk')), [self.noted])
+
+    def test_title_hits_rank_first_then_tags(self):
+        ranked = self.search('coffee').order_by('-search_rank')
+
+        self.assertEqual(list(ranked), [self.coffee, self.tagged, self.noted])
+
+    def test_index_is_joined_once(self):
+        sql = str(self.search('coffee').order_by('-search_rank').query)
+
+        self.assertEqual(sql.count('MATCH'), 1)
+        self.assertEqual(sql.count('JOIN'), 1)
+
+    def test_composes_with_values_and_ordering(self):
+        ids = self.search('coffee').exclude(pk=self.tagged.pk).order_by('title').values_list('pk', flat=True)
+        self.assertEqual(list(ids), [self.coffee.pk, self.noted.pk])
+
+        outer = Transaction.objects.filter(pk__in=self.search('coffee').values('pk')).exclude(pk=self.noted.pk)
+        self.assertEqual(list(outer.order_by('pk')), [self.coffee, self.tagged])
+
+    def test_search_filter(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get(reverse('api:Transaction-list'), {'search': 'coffee'})
+
+        self.assertEqual([row['id'] for row in response.data['results']], [self.coffee.pk, self.tagged.pk, self.noted.pk])
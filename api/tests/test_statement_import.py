@@ -0,0 +1,136 @@
+import io
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Transaction, User
+from api.services.statement_import import StatementError, parse_amount, parse_statement
+
+
+class ParseAmountTests(SimpleTestCase):
+
+    def test_separators(self):
+        for value, expected in [
+            ('-3.50', '-3.50'),
+            ('1,234.56', '1234.56'),
+            ('1.234,56', '1234.56'),
+            ('12,50', '12.50'),
+            ('1,234,567', '1234567.00'),
+            ('€ 1.234.567,89', '1234567.89'),
+            ('1 234,56 EUR', '1234.56'),
+            ('0.125', '0.12'),
+            ('(12.50)', '-12.50'),
+            ('12.50-', '-12.50'),
+        ]:
+            with self.subTest(value):
+                self.assertEqual(parse_amount(value), Decimal(expected))
+
+    def test_ambiguous_amounts_are_rejected(self):
+        for value in ('1,234', '1.234', '-5.000'):
+            with self.subTest(value), self.assertRaisesMessage(StatementError, 'Ambiguous amount'):
+                parse_amount(value)
+
+    def test_explicit_decimal_separator(self):
+        self.assertEqual(parse_amount('1,234', '.'), Decimal('1234.00'))
+        self.assertEqual(parse_amount('1.234', ','), Decimal('1234.00'))
+        self.assertEqual(parse_amount('1.234', '.'), Decimal('1.23'))
+        with self.assertRaises(StatementError):
+            # Two decimals cannot be a thousands group
+            parse_amount('12,50', '.')
+
+    def test_malformed_amounts(self):
+        for value in ('', '-', 'abc', '1.2.3,4', '1,23,456.00', '+-5'):
+            with self.subTest(value), self.assertRaisesMessage(StatementError, 'Unrecognized amount'):
+                parse_amount(value)
+
+
+class ParseStatementTests(SimpleTestCase):
+
+    def parse(self, text, statement_format='csv', **kwargs):
+        errors = []
+        rows = list(parse_statement(io.StringIO(text), statement_format, errors, **kwargs))
+        return [(row.title, row.amount) for row in rows], errors
+
+    def test_zero_amounts_are_row_errors(self):
+        rows, errors = self.parse('date,description,amount\n2024-01-02,Coffee,-3.50\n2024-01-03,Fee waived,"0,00"\n')
+
+        self.assertEqual(rows, [('Coffee', Decimal('-3.50'))])
+        self.assertEqual(errors, [{'line': 3, 'error': 'Zero amount'}])
+
+    def test_debit_and_credit_columns_filled_with_zero(self):
+        rows, errors = self.parse(
+            'date,description,debit,credit\n'
+            '2024-01-02,Coffee,3.50,0.00\n'
+            '2024-01-03,Salary,0.00,"2.500,00"\n'
+            '2024-01-04,Nothing,0.00,0.00\n'
+        )
+
+        self.assertEqual(rows, [('Coffee', Decimal('-3.50')), ('Salary', Decimal('2500.00'))])
+        self.assertEqual(errors, [{'line': 4, 'error': 'Zero amount'}])
+
+    def test_ambiguous_rows_are_reported_unless_the_separator_is_given(self):
+        text = 'date,description,amount\n2024-01-02,Rent,"-1,250"\n'
+
+        rows, errors = self.parse(text)
+        self.assertEqual(rows, [])
+        self.assertEqual(errors[0]['line'], 2)
+        self.assertIn('Ambiguous amount', errors[0]['error'])
+
+        rows, errors = self.parse(text, decimal_separator=',')
+        self.assertEqual((rows, errors), ([('Rent', Decimal('-1.25'))], []))
+
+    def test_ofx(self):
+        rows, errors = self.parse(
+            '<OFX><STMTTRN><DTPOSTED>20240102<TRNAMT>-3,50<NAME>Coffee</STMTTRN>'
+            '<STMTTRN><DTPOSTED>20240103<TRNAMT>0.00<NAME>Fee waived</STMTTRN></OFX>\n',
+            'ofx',
+        )
+
+        self.assertEqual(rows, [('Coffee', Decimal('-3.50'))])
+        self.assertEqual(errors, [{'line': 1, 'error': 'Zero amount'}])
+
+
+class StatementImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('statements@example.invalid', 'password', name='Statements')
+        cls.account = Account.objects.create(user=cls.user, title='Girokonto')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, statement, **data):
+        return self.client.post(
+            reverse('api:Transaction-import-statement'),
+            {'file': SimpleUploadedFile('statement.csv', statement, 'text/csv'), 'account': self.account.pk, **data},
+            format='multipart',
+        )
+
+    def test_european_statement(self):
+        response = self.post(
+            b'date,description,amount\n'
+            b'02.01.2024,Miete,"-1.234,56"\n'
+            b'03.01.2024,Kaffee,"-12,50"\n'
+            b'04.01.2024,Gehalt,"2.500,00"\n'
+            b'05.01.2024,Storno,"0,00"\n',
+            date_format='%d.%m.%Y',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['inserted'], response.data['errors']), (3, [{'line': 5, 'error': 'Zero amount'}]))
+        self.assertEqual(
+            sorted(Transaction.objects.filter(account=self.account).values_list('title', 'amount', 'transaction_type')),
+            [('Gehalt', Decimal('2500.00'), 'income'), ('Kaffee', Decimal('12.50'), 'expense'),
+             ('Miete', Decimal('1234.56'), 'expense')],
+        )
+
+    def test_decimal_separator(self):
+        response = self.post(b'date,description,amount\n2024-01-02,Rent,"-1,250"\n', decimal_separator='.')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Transaction.objects.get(account=self.account).amount, Decimal('1250.00'))
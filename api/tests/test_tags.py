@@ -0,0 +1,103 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Tag, Transaction, User
+from api.services.tags import MAX_TAG_LENGTH, TagError, clean_tags, sync_tags
+
+
+class TagTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tags@example.invalid', 'password', name='Tags')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, tags, amount='5.00'):
+        return Transaction.objects.create(
+            user=self.user, title='Entry', amount=amount, transaction_type='expense',
+            category=self.category, account=self.account, date=date(2024, 1, 15), tags=tags,
+        )
+
+    def list_ids(self, **params):
+        response = self.client.get(reverse('api:Transaction-list'), params)
+        return {row['id'] for row in response.data['results']}
+
+    def tag_names(self):
+        response = self.client.get(reverse('api:Tag-list'))
+        return [(row['name'], row['transaction_count']) for row in response.data['results']]
+
+    def test_spelling_is_kept(self):
+        txn = self.add('Work Trip,  NYC , work trip')
+
+        self.assertEqual(txn.tags, 'Work Trip, NYC')
+        self.assertEqual(self.tag_names(), [('NYC', 1), ('Work Trip', 1)])
+
+    def test_first_spelling_in_a_batch_is_kept(self):
+        for spellings in (['Work', 'work', 'WORK'], ['trip', 'Trip', 'TRIP']):
+            transactions = Transaction.objects.bulk_create([
+                Transaction(
+                    user=self.user, title='Entry', amount='5.00', transaction_type='expense',
+                    category=self.category, account=self.account, date=date(2024, 1, 15), tags=tags,
+                )
+                for tags in spellings
+            ])
+            sync_tags(transactions, created=True)
+
+        self.assertEqual(self.tag_names(), [('Work', 3), ('trip', 3)])
+
+    def test_matched_case_insensitively(self):
+        first = self.add('Work Trip')
+        second = self.add('work trip, home')
+
+        self.assertEqual(second.tags, 'work trip, home')
+        self.assertEqual(Tag.objects.filter(user=self.user, key='work trip').count(), 1)
+        self.assertEqual(self.list_ids(tags_any='WORK TRIP'), {first.pk, second.pk})
+        self.assertEqual(self.list_ids(tags_all='Work trip,Home'), {second.pk})
+
+    def test_long_tags_are_rejected(self):
+        long_tag = 'x' * (MAX_TAG_LENGTH + 1)
+        with self.assertRaises(TagError):
+            clean_tags(f'ok, {long_tag}')
+
+        response = self.client.post(reverse('api:Transaction-list'), {
+            'title': 'Entry', 'amount': '5.00', 'transaction_type': 'expense', 'category': self.category.pk,
+            'account': self.account.pk, 'date': '2024-01-15', 'tags': f'ok, {long_tag}',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data)
+        self.assertFalse(Tag.objects.exists())
+        # Filters just find nothing for them
+        self.assertEqual(self.list_ids(tags_any=long_tag), set())
+
+    def test_untagged_tags_are_removed(self):
+        txn = self.add('work, home')
+        txn.tags = 'work'
+        txn.save()
+
+        self.assertEqual(list(Tag.objects.values_list('name', flat=True)), ['work'])
+
+    def test_tags_of_deleted_transactions_are_not_listed(self):
+        self.add('work, home').delete()
+        self.add('work')
+
+        self.assertEqual(self.tag_names(), [('work', 1)])
+
+    def test_spending(self):
+        self.add('Work', '10.00')
+        self.add('work, Home', '2.50')
+
+        response = self.client.get(reverse('api:Tag-spending'), {'tags': 'WORK'})
+
+        self.assertEqual(
+            [(row['name'], row['total'], row['count']) for row in response.data['tags']], [('Work', Decimal('12.50'), 2)]
+        )
@@ -0,0 +1,66 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token, TokenProxy
+from rest_framework.test import APIClient
+
+from api.models import User
+from api.services import token_cache
+
+
+@override_settings(TOKEN_CACHE_ALIAS='default')
+class TokenCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tokens@example.invalid', 'password', name='Tokens')
+
+    def setUp(self):
+        caches['default'].clear()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self):
+        return self.client.get(reverse('api:Account-list'))
+
+    def test_cached_after_first_request(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.assertNumQueries(1):
+            # The list only, no token lookup
+            self.assertEqual(self.get().status_code, 200)
+
+    def test_deleted_token(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.token.delete()
+
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_token_deleted_through_the_admin_proxy(self):
+        self.assertEqual(self.get().status_code, 200)
+        TokenProxy.objects.filter(key=self.token.key).delete()
+
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNone(caches['default'].get(token_cache.shared_key(self.token.key)))
+
+    def test_shared_cache_holds_only_the_user_id(self):
+        self.assertEqual(self.get().status_code, 200)
+
+        self.assertEqual(caches['default'].get(token_cache.shared_key(self.token.key)), self.user.pk)
+
+    def test_user_loaded_on_shared_hit(self):
+        self.assertEqual(self.get().status_code, 200)
+        # Another process: nothing in its LRU
+        token_cache.clear()
+
+        user = token_cache.get(self.token.key)
+        self.assertEqual(user, self.user)
+        self.assertEqual(token_cache.stats()['shared_hits'], 1)
+
+    def test_saved_user_is_reloaded(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.user.name = 'Renamed'
+        self.user.save()
+
+        self.assertIsNone(token_cache.get(self.token.key))
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Account, Category, Transaction, User
+
+
+class TransactionSubresourceTests(TestCase):
+    """Account and category transactions take the transaction list filters, ordering and streaming"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('subresources@example.invalid', 'password', name='Subresources')
+        cls.account = Account.objects.create(user=cls.user, title='Checking')
+        cls.savings = Account.objects.create(user=cls.user, title='Savings')
+        cls.category = Category.objects.create(user=cls.user, title='Food')
+        for title, amount, transaction_type, day, account in [
+            ('Coffee', '3.50', 'expense', date(2024, 1, 10), cls.account),
+            ('Lunch', '12.50', 'expense', date(2024, 1, 20), cls.account),
+            ('Refund', '8.00', 'income', date(2024, 2, 1), cls.account),
+            ('Groceries', '40.00', 'expense', date(2024, 2, 5), cls.savings),
+        ]:
+            Transaction.objects.create(
+                user=cls.user, title=title, amount=amount, transaction_type=transaction_type,
+                category=cls.category, account=account, date=day,
+            )
+        other = User.objects.create_user('other@example.invalid', 'password', name='Other')
+        cls.foreign_account = Account.objects.create(user=other, title='Not yours')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.data['results']]
+
+    def test_paginated_newest_first(self):
+        response = self.client.get(reverse('api:Account-transactions', args=[self.account.pk]))
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([row['title'] for row in response.data['results']], ['Refund', 'Lunch', 'Coffee'])
+
+    def test_filters_and_ordering(self):
+        account_url = reverse('api:Account-transactions', args=[self.account.pk])
+        category_url = reverse('api:Category-transactions', args=[self.category.pk])
+
+        self.assertEqual(self.titles(account_url, transaction_type='expense'), ['Lunch', 'Coffee'])
+        self.assertEqual(self.titles(account_url, ordering='amount'), ['Coffee', 'Refund', 'Lunch'])
+        self.assertEqual(self.titles(category_url, date_from='2024-02-01'), ['Groceries', 'Refund'])
+        self.assertEqual(self.titles(category_url, amount_min='10', ordering='-amount'), ['Groceries', 'Lunch'])
+
+    def test_streamed(self):
+        url = reverse('api:Account-transactions', args=[self.account.pk])
+        response = self.client.get(url, {'stream': 'true', 'transaction_type': 'expense'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        filename = rf'account-{self.account.pk}-transactions-\d{{8}}\.ndjson'
+        self.assertRegex(response['Content-Disposition'], rf'^attachment; filename="{filename}"$')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(sorted(row['title'] for row in rows), ['Coffee', 'Lunch'])
+
+    def test_streamed_csv(self):
+        url = reverse('api:Category-transactions', args=[self.category.pk])
+        response = self.client.get(url, {'stream': 'true', 'export_format': 'csv'})
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(self.client.get(url, {'stream': 'true', 'export_format': 'xlsx'}).status_code, 400)
+
+    def test_other_users_resource(self):
+        response = self.client.get(reverse('api:Account-transactions', args=[self.foreign_account.pk]))
+
+        self.assertEqual(response.status_code, 404)
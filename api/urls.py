@@ -24,6 +24,12 @@ router.register(r'accounts', AccountViewSet, basename='Account')
 # Transaction endpoints
 router.register(r'transactions', TransactionViewSet, basename='Transaction')
 
+# Tag endpoints
+router.register(r'tags', TagViewSet, basename='Tag')
+
+# Background job endpoints
+router.register(r'jobs', JobViewSet, basename='Job')
+
 urlpatterns = [
     # Router URLs (ViewSets)
     path('', include(router.urls)),
@@ -36,6 +42,14 @@ urlpatterns = [
     # Dashboard endpoints
     path('dashboard/', dashboard, name='dashboard'),
     path('dashboard/quick-stats/', quick_stats, name='quick_stats'),
+    path('dashboard/async/', dashboard_async, name='dashboard_async'),
+    path('dashboard/quick-stats/async/', quick_stats_async, name='quick_stats_async'),
+    
+    # Response cache counters (admin only)
+    path('cache/stats/', cache_stats, name='cache_stats'),
+    
+    # Request metrics in the Prometheus text format (admin only)
+    path('metrics/', metrics, name='metrics'),
     
     # Token authentication (Django REST Framework default)
     path('token/', obtain_auth_token, name="login"),
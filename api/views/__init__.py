@@ -3,7 +3,11 @@ from .user_views import UserViewSet
 from .category_views import CategoryViewSet
 from .account_views import AccountViewSet
 from .transaction_views import TransactionViewSet
+from .tag_views import TagViewSet
 from .auth_views import signup, signin, logout
-from .dashboard_views import dashboard, quick_stats
+from .dashboard_views import dashboard, quick_stats, dashboard_async, quick_stats_async
+from .cache_views import cache_stats
+from .metrics_views import metrics
+from .job_views import JobViewSet
 
 
@@ -3,15 +3,26 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
-from django.db.models import Sum, Count
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from django.db.models import Sum, Count, Min
+from datetime import timedelta
 
-from api.models import Account, Transaction
+from api.mixins import TransactionSubresourceMixin
+from api.models import Account
 from api.serializers import AccountSerializer, AccountListSerializer
+from api.services.balance_history import (
+    DEFAULT_MAX_POINTS, GRANULARITIES, MAX_POINTS_LIMIT, balance_history
+)
+from api.services.periods import (
+    PERIODS, PeriodError, days, local_today, parse_date_range, resolve_period, user_timezone
+)
+from api.services.response_cache import cached_response
+from core.db_router import replica_reads
 
+# Legacy period names of balance_history, trailing windows of this many days
+TRAILING_PERIODS = {'week': 7, 'month': 30, 'year': 365}
 
-class AccountViewSet(viewsets.ModelViewSet):
+
+class AccountViewSet(TransactionSubresourceMixin, viewsets.ModelViewSet):
     serializer_class = AccountSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
@@ -41,16 +52,18 @@ class AccountViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @replica_reads
+    @cached_response('accounts.summary')
     def summary(self, request):
         """Get account summary with total balances"""
-        accounts = self.get_queryset()
+        accounts = list(self.get_queryset())
         
         total_initial = sum(account.initial for account in accounts)
         total_current = sum(account.current_balance for account in accounts)
         total_change = total_current - total_initial
         
         return Response({
-            'total_accounts': accounts.count(),
+            'total_accounts': len(accounts),
             'total_initial_balance': total_initial,
             'total_current_balance': total_current,
             'total_change': total_change,
@@ -59,71 +72,63 @@ class AccountViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def transactions(self, request, pk=None):
-        """Get all transactions for a specific account"""
+        """Get transactions for a specific account, with the transaction list filters and pagination"""
         try:
             account = self.get_queryset().get(pk=pk)
-            transactions = Transaction.objects.filter(
-                account=account,
-                user=request.user
-            ).order_by('-date')
-            
-            from api.serializers import TransactionListSerializer
-            serializer = TransactionListSerializer(transactions, many=True)
-            return Response(serializer.data)
         except Account.DoesNotExist:
             return Response({'error': 'Account not found'}, status=404)
+        return self.transactions_response(request, basename=f'account-{account.pk}-transactions', account=account)
     
     @action(detail=True, methods=['get'])
+    @replica_reads
     def balance_history(self, request, pk=None):
         """Get balance history for an account over time"""
         try:
             account = self.get_queryset().get(pk=pk)
-            
-            # Get period from query params
-            period = request.query_params.get('period', 'month')
-            today = datetime.now().date()
-            
-            if period == 'week':
-                start_date = today - timedelta(days=7)
-            elif period == 'month':
-                start_date = today - timedelta(days=30)
-            elif period == 'year':
-                start_date = today - timedelta(days=365)
-            else:
-                start_date = today - timedelta(days=30)
-            
-            transactions = Transaction.objects.filter(
-                account=account,
-                user=request.user,
-                date__gte=start_date
-            ).order_by('date')
-            
-            # Calculate running balance
-            balance_history = []
-            running_balance = account.initial
-            
-            for transaction in transactions:
-                if transaction.transaction_type == 'income':
-                    running_balance += transaction.amount
-                else:
-                    running_balance -= transaction.amount
-                
-                balance_history.append({
-                    'date': transaction.date,
-                    'balance': running_balance,
-                    'transaction': {
-                        'id': transaction.id,
-                        'title': transaction.title,
-                        'amount': transaction.amount,
-                        'type': transaction.transaction_type
-                    }
-                })
-            
-            return Response({
-                'account': AccountListSerializer(account).data,
-                'initial_balance': account.initial,
-                'current_balance': account.current_balance,
-                'balance_history': balance_history
-            })
         except Account.DoesNotExist:
-            return Response({'error': 'Account not found'}, status=404) 
\ No newline at end of file
+            return Response({'error': 'Account not found'}, status=404)
+        
+        tz = user_timezone(request.user)
+        today = local_today(tz)
+        period_name = request.query_params.get('period', 'month')
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        try:
+            if start_date and end_date:
+                period = parse_date_range(start_date, end_date, tz)
+            elif period_name == 'all':
+                first = account.daily_rollups.aggregate(first=Min('date'))['first'] or today
+                period = days(period_name, min(first, today), today, tz)
+            elif period_name in PERIODS and period_name not in TRAILING_PERIODS:
+                period = resolve_period(period_name, tz, today)
+            else:
+                # Trailing windows ending today, as this endpoint has always used
+                trailing = TRAILING_PERIODS.get(period_name, TRAILING_PERIODS['month'])
+                period = days(period_name, today - timedelta(days=trailing), today, tz)
+        except PeriodError as exc:
+            return Response({'error': str(exc)}, status=400)
+        
+        granularity = request.query_params.get('granularity') or None
+        if granularity is not None and granularity not in GRANULARITIES:
+            return Response(
+                {'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}, status=400
+            )
+        try:
+            max_points = int(request.query_params.get('max_points', DEFAULT_MAX_POINTS))
+        except ValueError:
+            return Response({'error': 'max_points must be an integer'}, status=400)
+        max_points = min(max(max_points, 1), MAX_POINTS_LIMIT)
+        
+        history = balance_history(account, period, granularity, max_points)
+        return Response({
+            'account': AccountListSerializer(account).data,
+            'initial_balance': account.initial,
+            'current_balance': account.current_balance,
+            'period': period.name,
+            'start_date': period.start,
+            'end_date': period.last_day,
+            'granularity': history.granularity,
+            'opening_balance': history.opening_balance,
+            'closing_balance': history.closing_balance,
+            'balance_history': history.points
+        })
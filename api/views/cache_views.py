@@ -0,0 +1,13 @@
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from api.services import token_cache
+from api.services.response_cache import cache_stats as response_cache_stats
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    """Get response and token cache hit/miss counters of this process"""
+    return Response({**response_cache_stats(), 'token_auth': token_cache.stats()})
@@ -3,15 +3,27 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
-from django.db.models import Sum, Count
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from django.db.models import FilteredRelation, Q
 
-from api.models import Category, Transaction
+from api.mixins import TransactionSubresourceMixin
+from api.models import Category
 from api.serializers import CategorySerializer, CategoryListSerializer
+from api.services.aggregation import annotate_bucket_totals, row_totals
+from api.services.periods import PeriodError, resolve_period, user_timezone
+from api.services.response_cache import cached_response
+from core.db_router import replica_reads
 
+COMPARE_VALUES = ('1', 'true', 'yes', 'previous')
 
-class CategoryViewSet(viewsets.ModelViewSet):
+
+def percentage(part, whole):
+    """``part`` as a percentage of ``whole`` rounded to two places, None when ``whole`` is zero"""
+    if not whole:
+        return None
+    return round(float(part) * 100 / float(whole), 2)
+
+
+class CategoryViewSet(TransactionSubresourceMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
@@ -34,50 +46,68 @@ class CategoryViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @replica_reads
+    @cached_response('categories.with_stats')
     def with_stats(self, request):
         """Get categories with transaction statistics"""
-        categories = self.get_queryset()
-        
-        # Get period from query params
-        period = request.query_params.get('period', 'month')
-        today = datetime.now().date()
+        # Get period from query params, anything else means all time
+        try:
+            period = resolve_period(request.query_params.get('period', 'month'), user_timezone(request.user))
+        except PeriodError:
+            period = None
+        compare = period is not None and request.query_params.get('compare', '').lower() in COMPARE_VALUES
         
-        if period == 'today':
-            start_date = today
-            end_date = today
-        elif period == 'week':
-            start_date = today - timedelta(days=today.weekday())
-            end_date = start_date + timedelta(days=6)
-        elif period == 'month':
-            start_date = today.replace(day=1)
-            end_date = (start_date + relativedelta(months=1)) - timedelta(days=1)
-        elif period == 'year':
-            start_date = today.replace(month=1, day=1)
-            end_date = today.replace(month=12, day=31)
-        else:
-            start_date = None
-            end_date = None
+        # Every category with its rollup totals in one grouped query. The user
+        # and date range go into the join, so the scan stays on the (user, date)
+        # index and categories without activity are kept
+        buckets = {'current': Q()}
+        relation = 'daily_rollups'
+        categories = self.get_queryset()
+        if period is not None:
+            previous = period.previous() if compare else None
+            covered = period.span(previous) if compare else period
+            relation = 'period_rollups'
+            categories = categories.annotate(period_rollups=FilteredRelation(
+                'daily_rollups',
+                condition=Q(daily_rollups__user=request.user) & covered.date_q('daily_rollups__date'),
+            ))
+            if compare:
+                buckets = {
+                    'current': period.date_q(f'{relation}__date'),
+                    'previous': previous.date_q(f'{relation}__date'),
+                }
+        rows = annotate_bucket_totals(categories.values('id', 'title'), buckets, relation).order_by('title')
         
-        # Get transaction stats for each category
         categories_with_stats = []
-        for category in categories:
-            transactions = Transaction.objects.filter(
-                category=category,
-                user=request.user
-            )
-            
-            if start_date and end_date:
-                transactions = transactions.filter(date__range=[start_date, end_date])
-            
-            total_amount = transactions.aggregate(total=Sum('amount'))['total'] or 0
-            transaction_count = transactions.count()
-            
-            categories_with_stats.append({
-                'id': category.id,
-                'title': category.title,
-                'total_amount': total_amount,
-                'transaction_count': transaction_count
-            })
+        for row in rows:
+            totals = row_totals(row, 'current')
+            stats = {
+                'id': row['id'],
+                'title': row['title'],
+                'total_amount': totals['income'] + totals['expenses'],
+                'transaction_count': totals['count'],
+                'income': totals['income'],
+                'expenses': totals['expenses'],
+                'net': totals['net'],
+                'income_count': totals['income_count'],
+                'expense_count': totals['expense_count'],
+            }
+            if compare:
+                before = row_totals(row, 'previous')
+                stats['previous_total_amount'] = before['income'] + before['expenses']
+                stats['previous_transaction_count'] = before['count']
+                stats['change'] = stats['total_amount'] - stats['previous_total_amount']
+                stats['change_percentage'] = percentage(stats['change'], stats['previous_total_amount'])
+            categories_with_stats.append(stats)
+        
+        # Share of the overall total, and of total income and expenses
+        grand_total = sum(stats['total_amount'] for stats in categories_with_stats)
+        total_income = sum(stats['income'] for stats in categories_with_stats)
+        total_expenses = sum(stats['expenses'] for stats in categories_with_stats)
+        for stats in categories_with_stats:
+            stats['percentage'] = percentage(stats['total_amount'], grand_total)
+            stats['income_percentage'] = percentage(stats['income'], total_income)
+            stats['expense_percentage'] = percentage(stats['expenses'], total_expenses)
         
         # Sort by total amount descending
         categories_with_stats.sort(key=lambda x: x['total_amount'], reverse=True)
@@ -86,16 +116,9 @@ class CategoryViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def transactions(self, request, pk=None):
-        """Get all transactions for a specific category"""
+        """Get transactions for a specific category, with the transaction list filters and pagination"""
         try:
             category = self.get_queryset().get(pk=pk)
-            transactions = Transaction.objects.filter(
-                category=category,
-                user=request.user
-            ).order_by('-date')
-            
-            from api.serializers import TransactionListSerializer
-            serializer = TransactionListSerializer(transactions, many=True)
-            return Response(serializer.data)
         except Category.DoesNotExist:
-            return Response({'error': 'Category not found'}, status=404) 
\ No newline at end of file
+            return Response({'error': 'Category not found'}, status=404)
+        return self.transactions_response(request, basename=f'category-{category.pk}-transactions', category=category)
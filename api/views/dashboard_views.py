@@ -1,204 +1,92 @@
-from rest_framework import permissions
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from django.db.models import Sum, Count
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
 
-from api.models import Transaction, Category, Account
+from api.authentication import authenticate, get_authenticators
+from api.services.dashboard import (
+    DASHBOARD_SECTIONS, build_dashboard, dashboard_periods, gather_sections, period_stats,
+    run_in_pool, run_sections,
+)
+from api.services.response_cache import acached, cached_response
+from core.db_router import replica_reads
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@replica_reads
+@cached_response('dashboard')
 def dashboard(request):
     """Get comprehensive dashboard data"""
-    user = request.user
-    today = datetime.now().date()
-    
-    # Get period from query params
-    period = request.query_params.get('period', 'month')
-    
-    if period == 'today':
-        start_date = today
-        end_date = today
-    elif period == 'week':
-        start_date = today - timedelta(days=today.weekday())
-        end_date = start_date + timedelta(days=6)
-    elif period == 'month':
-        start_date = today.replace(day=1)
-        end_date = (start_date + relativedelta(months=1)) - timedelta(days=1)
-    elif period == 'year':
-        start_date = today.replace(month=1, day=1)
-        end_date = today.replace(month=12, day=31)
-    else:
-        start_date = today.replace(day=1)
-        end_date = (start_date + relativedelta(months=1)) - timedelta(days=1)
-    
-    # Get transactions for the period
-    transactions = Transaction.objects.filter(
-        user=user,
-        date__range=[start_date, end_date]
-    )
-    
-    # Calculate totals
-    total_income = transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount'))['total'] or 0
-    total_expenses = transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount'))['total'] or 0
-    net_amount = total_income - total_expenses
-    
-    # Category breakdown for expenses
-    category_breakdown = transactions.filter(transaction_type='expense').values(
-        'category__title').annotate(
-        total=Sum('amount'),
-        count=Count('id')
-    ).order_by('-total')
-    
-    # Account summary
-    accounts = Account.objects.filter(user=user)
-    account_summary = []
-    total_account_balance = 0
-    
-    for account in accounts:
-        account_balance = account.current_balance
-        total_account_balance += account_balance
-        account_summary.append({
-            'id': account.id,
-            'title': account.title,
-            'initial_balance': account.initial,
-            'current_balance': account_balance,
-            'change': account_balance - account.initial
-        })
-    
-    # Recent transactions
-    recent_transactions = Transaction.objects.filter(
-        user=user
-    ).order_by('-date')[:10]
-    
-    # Monthly trend (last 6 months)
-    monthly_trend = []
-    for i in range(6):
-        month_start = today.replace(day=1) - relativedelta(months=i)
-        month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
-        
-        month_transactions = Transaction.objects.filter(
-            user=user,
-            date__range=[month_start, month_end]
-        )
-        
-        month_income = month_transactions.filter(transaction_type='income').aggregate(
-            total=Sum('amount'))['total'] or 0
-        month_expenses = month_transactions.filter(transaction_type='expense').aggregate(
-            total=Sum('amount'))['total'] or 0
-        
-        monthly_trend.append({
-            'month': month_start.strftime('%Y-%m'),
-            'income': month_income,
-            'expenses': month_expenses,
-            'net': month_income - month_expenses
-        })
-    
-    monthly_trend.reverse()  # Show oldest first
-    
-    # Top spending categories
-    top_categories = transactions.filter(transaction_type='expense').values(
-        'category__title').annotate(
-        total=Sum('amount')
-    ).order_by('-total')[:5]
-    
-    return Response({
-        'period': {
-            'type': period,
-            'start_date': start_date,
-            'end_date': end_date
-        },
-        'summary': {
-            'total_income': total_income,
-            'total_expenses': total_expenses,
-            'net_amount': net_amount,
-            'transaction_count': transactions.count(),
-            'total_account_balance': total_account_balance
-        },
-        'category_breakdown': category_breakdown,
-        'account_summary': account_summary,
-        'recent_transactions': [
-            {
-                'id': t.id,
-                'title': t.title,
-                'amount': t.amount,
-                'transaction_type': t.transaction_type,
-                'category': t.category.title,
-                'account': t.account.title,
-                'date': t.date
-            } for t in recent_transactions
-        ],
-        'monthly_trend': monthly_trend,
-        'top_categories': top_categories
-    })
+    periods = dashboard_periods(request.user, request.query_params.get('period', 'month'))
+    return Response(build_dashboard(periods, run_sections(DASHBOARD_SECTIONS, request.user, periods)))
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@replica_reads
+@cached_response('quick_stats')
 def quick_stats(request):
     """Get quick statistics for today, week, month"""
-    user = request.user
-    today = datetime.now().date()
-    
-    stats = {}
-    
-    # Today's stats
-    today_transactions = Transaction.objects.filter(
-        user=user,
-        date=today
-    )
-    today_income = today_transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount'))['total'] or 0
-    today_expenses = today_transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount'))['total'] or 0
-    
-    stats['today'] = {
-        'income': today_income,
-        'expenses': today_expenses,
-        'net': today_income - today_expenses,
-        'count': today_transactions.count()
-    }
-    
-    # This week's stats
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
-    week_transactions = Transaction.objects.filter(
-        user=user,
-        date__range=[week_start, week_end]
-    )
-    week_income = week_transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount'))['total'] or 0
-    week_expenses = week_transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount'))['total'] or 0
-    
-    stats['week'] = {
-        'income': week_income,
-        'expenses': week_expenses,
-        'net': week_income - week_expenses,
-        'count': week_transactions.count()
-    }
-    
-    # This month's stats
-    month_start = today.replace(day=1)
-    month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
-    month_transactions = Transaction.objects.filter(
-        user=user,
-        date__range=[month_start, month_end]
+    return Response(period_stats(request.user))
+
+
+def json_response(data, status=200, headers=None):
+    """Render like a DRF ``Response`` with the JSON renderer"""
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, headers=headers, content_type='application/json'
     )
-    month_income = month_transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount'))['total'] or 0
-    month_expenses = month_transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount'))['total'] or 0
+
+
+def async_api_view(view):
+    """
+    Serve an async view for authenticated GET requests.
+
+    DRF's views are synchronous, so the authentication classes run in a
+    thread. The view returns its data and whether it came from the response
+    cache, as ``acached`` does, and the data is rendered as JSON.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response(
+                {'detail': exceptions.MethodNotAllowed(request.method).detail}, status=405, headers={'Allow': 'GET'}
+            )
+        try:
+            request.user = await sync_to_async(authenticate)(request)
+        except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as exc:
+            # Same status and header as DRF's handler: 401 when a scheme can be advertised
+            authenticators = get_authenticators()
+            header = authenticators[0].authenticate_header(request) if authenticators else None
+            return json_response(
+                {'detail': exc.detail},
+                status=401 if header else 403,
+                headers={'WWW-Authenticate': header} if header else None,
+            )
+        data, hit = await view(request, *args, **kwargs)
+        return json_response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+    return wrapper
+
+
+@async_api_view
+@replica_reads
+async def dashboard_async(request):
+    """Dashboard data with its sections queried concurrently"""
+    user = request.user
+    periods = dashboard_periods(user, request.GET.get('period', 'month'))
     
-    stats['month'] = {
-        'income': month_income,
-        'expenses': month_expenses,
-        'net': month_income - month_expenses,
-        'count': month_transactions.count()
-    }
+    async def compute():
+        return build_dashboard(periods, await gather_sections(DASHBOARD_SECTIONS, user, periods))
     
-    return Response(stats) 
\ No newline at end of file
+    return await acached('dashboard', user, request.GET, compute)
+
+
+@async_api_view
+@replica_reads
+async def quick_stats_async(request):
+    """Quick statistics without blocking the event loop"""
+    return await acached('quick_stats', request.user, request.GET, lambda: run_in_pool(period_stats, request.user))
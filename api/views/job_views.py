@@ -0,0 +1,55 @@
+from django.http import FileResponse
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+
+from api.models import Job
+from api.serializers import JobSerializer
+from api.services import jobs
+
+
+class JobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ['status', 'kind']
+    ordering_fields = ['created_at', 'priority']
+    
+    def get_queryset(self):
+        # Users can only see their own jobs
+        return Job.objects.filter(user=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        job = jobs.enqueue(data['kind'], data.get('params'), user=request.user, priority=data.get('priority', 0))
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a queued or running job"""
+        job = self.get_object()
+        if not jobs.cancel(job):
+            return Response({'error': f"Job is already {job.status}"}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
+    
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        """Download the file produced by a finished job, or get its result"""
+        job = self.get_object()
+        if job.status != 'succeeded':
+            return Response(
+                {'error': f"Job is {job.status}", 'status': job.status, 'progress': job.progress},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not job.result_file:
+            return Response(job.result)
+        return FileResponse(
+            job.result_file.open('rb'),
+            as_attachment=True,
+            filename=job.result.get('filename') if job.result else None
+        )
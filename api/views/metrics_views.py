@@ -0,0 +1,12 @@
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+
+from api.services.metrics import render
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def metrics(request):
+    """Get the request metrics of this process in the Prometheus text format"""
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,61 @@
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.filters import OrderingFilter, SearchFilter
+from django.db.models import Sum, Count
+from datetime import datetime
+
+from api.models import Tag, TransactionTag
+from api.serializers import TagSerializer
+from api.services.tags import tag_keys
+
+
+class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = TagSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [OrderingFilter, SearchFilter]
+    ordering_fields = ['name', 'transaction_count']
+    search_fields = ['name']
+    
+    def get_queryset(self):
+        # Users can only see their own tags, and only those still on a transaction
+        return Tag.objects.filter(user=self.request.user).annotate(
+            transaction_count=Count('transaction_links')).filter(transaction_count__gt=0).order_by('name')
+    
+    @action(detail=False, methods=['get'])
+    def spending(self, request):
+        """Get total amount and transaction count per tag"""
+        links = TransactionTag.objects.filter(tag__user=request.user)
+        
+        transaction_type = request.query_params.get('transaction_type', 'expense')
+        if transaction_type not in ('income', 'expense'):
+            return Response({'error': 'transaction_type must be income or expense'}, status=status.HTTP_400_BAD_REQUEST)
+        links = links.filter(transaction__transaction_type=transaction_type)
+        
+        try:
+            if request.query_params.get('date_from'):
+                date_from = datetime.strptime(request.query_params['date_from'], '%Y-%m-%d').date()
+                links = links.filter(transaction__date__gte=date_from)
+            if request.query_params.get('date_to'):
+                date_to = datetime.strptime(request.query_params['date_to'], '%Y-%m-%d').date()
+                links = links.filter(transaction__date__lte=date_to)
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        keys = tag_keys(request.query_params.get('tags'))
+        if keys:
+            links = links.filter(tag__key__in=keys)
+        
+        # A transaction with several tags counts towards each of them
+        spending = links.values('tag_id', 'tag__name').annotate(
+            total=Sum('transaction__amount'),
+            count=Count('transaction_id')
+        ).order_by('-total', 'tag__name')
+        
+        return Response({
+            'transaction_type': transaction_type,
+            'tags': [
+                {'id': row['tag_id'], 'name': row['tag__name'], 'total': row['total'], 'count': row['count']}
+                for row in spending
+            ]
+        })
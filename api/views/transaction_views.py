@@ -1,16 +1,26 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
+from django.conf import settings
 from django_filters import rest_framework as filters
 from django.db.models import Sum, Q
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
 from calendar import monthrange
 
+from api.mixins import KeysetPaginationMixin
 from api.models import Transaction
-from api.serializers import TransactionSerializer, TransactionListSerializer
+from api.search import FullTextSearchFilter
+from api.serializers import JobSerializer, TransactionSerializer, TransactionListSerializer, TransactionListRowSerializer, TransactionBulkSerializer, StatementImportSerializer
+from api.services import jobs
+from api.services.export import EXPORT_FORMATS, streaming_export
+from api.services.aggregation import bucket_totals
+from api.services.periods import PeriodError, calendar_period, local_part, parse_date_range, resolve_period, user_timezone
+from api.services.response_cache import cached_response
+from api.services.statement_import import StatementError, StatementImporter, open_text, parse_statement, uncategorized
+from api.services.tags import tag_keys, transactions_tagged
+from core.db_router import replica_reads
 
 
 class TransactionFilter(filters.FilterSet):
@@ -44,7 +54,10 @@ class TransactionFilter(filters.FilterSet):
     transaction_type = filters.ChoiceFilter(choices=Transaction.TRANSACTION_TYPE_CHOICES, label='Transaction Type')
     category = filters.NumberFilter(field_name='category', lookup_expr='exact', label='Category ID')
     account = filters.NumberFilter(field_name='account', lookup_expr='exact', label='Account ID')
-    tags = filters.CharFilter(field_name='tags', lookup_expr='icontains', label='Tags')
+    tag = filters.CharFilter(method='filter_tags_any', label='Tag')
+    tags = filters.CharFilter(method='filter_tags_any', label='Tags (any of, comma separated)')
+    tags_any = filters.CharFilter(method='filter_tags_any', label='Tags (any of, comma separated)')
+    tags_all = filters.CharFilter(method='filter_tags_all', label='Tags (all of, comma separated)')
     has_receipt = filters.BooleanFilter(method='filter_has_receipt', label='Has Receipt')
     has_notes = filters.BooleanFilter(method='filter_has_notes', label='Has Notes')
     
@@ -63,78 +76,60 @@ class TransactionFilter(filters.FilterSet):
     
     def filter_by_period(self, queryset, name, value):
         """Filter by predefined periods using created_at: today, yesterday, week, month, quarter, year, last_week, last_month, last_year"""
-        today = datetime.now().date()
-        
-        if value == 'today':
-            return queryset.filter(created_at__date=today)
-        elif value == 'yesterday':
-            yesterday = today - timedelta(days=1)
-            return queryset.filter(created_at__date=yesterday)
-        elif value == 'week':
-            week_start = today - timedelta(days=today.weekday())
-            week_end = week_start + timedelta(days=6)
-            return queryset.filter(created_at__date__range=[week_start, week_end])
-        elif value == 'last_week':
-            last_week_start = today - timedelta(days=today.weekday() + 7)
-            last_week_end = last_week_start + timedelta(days=6)
-            return queryset.filter(created_at__date__range=[last_week_start, last_week_end])
-        elif value == 'month':
-            month_start = today.replace(day=1)
-            month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
-            return queryset.filter(created_at__date__range=[month_start, month_end])
-        elif value == 'last_month':
-            last_month = today - relativedelta(months=1)
-            last_month_start = last_month.replace(day=1)
-            last_month_end = (last_month_start + relativedelta(months=1)) - timedelta(days=1)
-            return queryset.filter(created_at__date__range=[last_month_start, last_month_end])
-        elif value == 'quarter':
-            quarter_start = today.replace(month=((today.month - 1) // 3) * 3 + 1, day=1)
-            quarter_end = (quarter_start + relativedelta(months=3)) - timedelta(days=1)
-            return queryset.filter(created_at__date__range=[quarter_start, quarter_end])
-        elif value == 'year':
-            year_start = today.replace(month=1, day=1)
-            year_end = today.replace(month=12, day=31)
-            return queryset.filter(created_at__date__range=[year_start, year_end])
-        elif value == 'last_year':
-            last_year = today.year - 1
-            last_year_start = today.replace(year=last_year, month=1, day=1)
-            last_year_end = today.replace(year=last_year, month=12, day=31)
-            return queryset.filter(created_at__date__range=[last_year_start, last_year_end])
-        elif value == 'last_7_days':
-            seven_days_ago = today - timedelta(days=7)
-            return queryset.filter(created_at__date__range=[seven_days_ago, today])
-        elif value == 'last_30_days':
-            thirty_days_ago = today - timedelta(days=30)
-            return queryset.filter(created_at__date__range=[thirty_days_ago, today])
-        elif value == 'last_90_days':
-            ninety_days_ago = today - timedelta(days=90)
-            return queryset.filter(created_at__date__range=[ninety_days_ago, today])
-        
-        return queryset
+        try:
+            period = resolve_period(value, user_timezone(self.request.user))
+        except PeriodError:
+            return queryset
+        return queryset.filter(period.datetime_q())
+    
+    def calendar_part(self, name, low, high):
+        """The valid value of a year, month or day parameter, or None"""
+        value = self.form.cleaned_data.get(name)
+        if value is None or not low <= value <= high:
+            return None
+        return int(value)
     
     def filter_by_day(self, queryset, name, value):
-        """Filter by day of month (1-31) using created_at"""
-        if 1 <= value <= 31:
-            return queryset.filter(created_at__day=value)
-        return queryset
+        """Filter by day of month (1-31) using created_at; with year and month it is part of their range"""
+        day = self.calendar_part('day', 1, 31)
+        if day is None or self.calendar_part('year', 1900, 9998) and self.calendar_part('month', 1, 12):
+            return queryset
+        # Recurs in every month, so it is extracted rather than a range
+        tz = user_timezone(self.request.user)
+        return queryset.alias(created_day=local_part('created_at', 'day', tz)).filter(created_day=day)
     
     def filter_by_month(self, queryset, name, value):
-        """Filter by month (1-12) using created_at"""
-        if 1 <= value <= 12:
-            return queryset.filter(created_at__month=value)
-        return queryset
+        """Filter by month (1-12) using created_at; with a year it is part of its range"""
+        month = self.calendar_part('month', 1, 12)
+        if month is None or self.calendar_part('year', 1900, 9998):
+            return queryset
+        tz = user_timezone(self.request.user)
+        return queryset.alias(created_month=local_part('created_at', 'month', tz)).filter(created_month=month)
     
     def filter_by_year(self, queryset, name, value):
-        """Filter by year using created_at"""
-        if value >= 1900:
-            return queryset.filter(created_at__year=value)
-        return queryset
+        """Filter by year using created_at, narrowed to the month and day when they are given too"""
+        year = self.calendar_part('year', 1900, 9998)
+        if year is None:
+            return queryset
+        month = self.calendar_part('month', 1, 12)
+        day = self.calendar_part('day', 1, 31) if month else None
+        try:
+            period = calendar_period(year, user_timezone(self.request.user), month, day)
+        except PeriodError:
+            # A day the month does not have
+            return queryset.none()
+        return queryset.filter(period.datetime_q())
     
     def filter_by_weekday(self, queryset, name, value):
         """Filter by day of week (0=Monday, 6=Sunday) using created_at"""
-        if 0 <= value <= 6:
-            return queryset.filter(created_at__week_day=value + 1)  # Django uses 1=Sunday, 2=Monday, etc.
-        return queryset
+        weekday = self.calendar_part('weekday', 0, 6)
+        if weekday is None:
+            return queryset
+        tz = user_timezone(self.request.user)
+        # ISO weekdays run from 1=Monday
+        return queryset.alias(created_weekday=local_part('created_at', 'iso_week_day', tz)).filter(
+            created_weekday=weekday + 1
+        )
     
     def filter_has_receipt(self, queryset, name, value):
         """Filter transactions that have or don't have receipts"""
@@ -149,15 +144,28 @@ class TransactionFilter(filters.FilterSet):
             return queryset.exclude(notes__isnull=True).exclude(notes='')
         else:
             return queryset.filter(Q(notes__isnull=True) | Q(notes=''))
+    
+    def filter_tags_any(self, queryset, name, value):
+        """Filter transactions carrying at least one of the given tags (exact, case-insensitive)"""
+        keys = tag_keys(value)
+        if not keys:
+            return queryset
+        return queryset.filter(pk__in=transactions_tagged(self.request.user, keys))
+    
+    def filter_tags_all(self, queryset, name, value):
+        """Filter transactions carrying every one of the given tags"""
+        for key in tag_keys(value):
+            queryset = queryset.filter(pk__in=transactions_tagged(self.request.user, [key]))
+        return queryset
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     filterset_class = TransactionFilter
     ordering_fields = ['title', 'amount', 'date', 'created_at', 'transaction_type', 'category', 'account']
-    search_fields = ['title', 'notes', 'tags']
+    search_fields = ['title', 'notes', 'tags']  # Fallback where there is no full-text index
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -165,8 +173,26 @@ class TransactionViewSet(viewsets.ModelViewSet):
         return TransactionSerializer
     
     def get_queryset(self):
-        # Users can only see their own transactions
-        return Transaction.objects.filter(user=self.request.user)
+        # Users can only see their own transactions, with the nested titles in the same query
+        return Transaction.objects.filter(user=self.request.user).select_related('category', 'account')
+    
+    def list_response(self, queryset, context=None):
+        """Paginate and serialize a transaction list, from values rows when FAST_TRANSACTION_SERIALIZER is on"""
+        if settings.FAST_TRANSACTION_SERIALIZER:
+            queryset = TransactionListRowSerializer.rows_for(queryset)
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset
+        if settings.FAST_TRANSACTION_SERIALIZER:
+            serializer = TransactionListRowSerializer(rows, context=context)
+        else:
+            serializer = TransactionListSerializer(rows, many=True, context=context or {})
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.list_response(queryset, context=self.get_serializer_context())
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -174,62 +200,117 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create a batch of transactions in one database transaction, with per-item errors"""
+        serializer = TransactionBulkSerializer(
+            data=request.data,
+            many=True,
+            max_length=settings.BULK_TRANSACTION_MAX_ITEMS,
+            context=self.get_serializer_context()
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        transactions = serializer.save()
+        return Response(
+            TransactionSerializer(transactions, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_statement(self, request):
+        """Import a CSV or OFX bank statement, skipping rows that were already imported, or queue the import with async=true"""
+        serializer = StatementImportSerializer(data=request.data, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        
+        if request.query_params.get('async', '').lower() in ('1', 'true', 'yes'):
+            job = jobs.enqueue('statements.import', {
+                'upload': jobs.stage_upload(data['file']),
+                'account': data['account'].pk,
+                'category': data['category'].pk if data.get('category') else None,
+                'statement_format': data['statement_format'],
+                'date_format': data.get('date_format') or '',
+                'decimal_separator': data.get('decimal_separator') or '',
+            }, user=request.user)
+            return Response(JobSerializer(job, context=self.get_serializer_context()).data, status=status.HTTP_202_ACCEPTED)
+        
+        importer = StatementImporter(
+            request.user,
+            data['account'],
+            data.get('category') or uncategorized(request.user),
+        )
+        errors = []
+        stream = open_text(data['file'].file)
+        try:
+            result = importer.run(
+                parse_statement(
+                    stream, data['statement_format'], errors,
+                    data.get('date_format') or None, data.get('decimal_separator') or None,
+                ),
+                errors
+            )
+        except StatementError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+        return Response(
+            result.as_dict(),
+            status=status.HTTP_201_CREATED if result.inserted else status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream every transaction matching the list filters as CSV or NDJSON, or queue the export with async=true"""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({
+                'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.query_params.get('async', '').lower() in ('1', 'true', 'yes'):
+            filters = {
+                name: request.query_params.getlist(name)
+                for name in request.query_params if name not in ('async', 'export_format')
+            }
+            job = jobs.enqueue(
+                'transactions.export', {'export_format': export_format, 'filters': filters}, user=request.user
+            )
+            return Response(JobSerializer(job, context=self.get_serializer_context()).data, status=status.HTTP_202_ACCEPTED)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_export(queryset, export_format)
+    
     @action(detail=False, methods=['get'])
+    @replica_reads
+    @cached_response('transactions.summary')
     def summary(self, request):
         """Get expense summary for different periods using created_at"""
         user = request.user
-        today = datetime.now().date()
+        tz = user_timezone(user)
         
         # Get date range from query params or default to current month
         period = request.query_params.get('period', 'month')
-        
-        if period == 'today':
-            start_date = today
-            end_date = today
-        elif period == 'yesterday':
-            start_date = today - timedelta(days=1)
-            end_date = start_date
-        elif period == 'week':
-            start_date = today - timedelta(days=today.weekday())
-            end_date = start_date + timedelta(days=6)
-        elif period == 'last_week':
-            start_date = today - timedelta(days=today.weekday() + 7)
-            end_date = start_date + timedelta(days=6)
-        elif period == 'month':
-            start_date = today.replace(day=1)
-            end_date = (start_date + relativedelta(months=1)) - timedelta(days=1)
-        elif period == 'last_month':
-            last_month = today - relativedelta(months=1)
-            start_date = last_month.replace(day=1)
-            end_date = (start_date + relativedelta(months=1)) - timedelta(days=1)
-        elif period == 'quarter':
-            start_date = today.replace(month=((today.month - 1) // 3) * 3 + 1, day=1)
-            end_date = (start_date + relativedelta(months=3)) - timedelta(days=1)
-        elif period == 'year':
-            start_date = today.replace(month=1, day=1)
-            end_date = today.replace(month=12, day=31)
-        elif period == 'last_year':
-            last_year = today.year - 1
-            start_date = today.replace(year=last_year, month=1, day=1)
-            end_date = today.replace(year=last_year, month=12, day=31)
-        else:
+        try:
+            date_range = resolve_period(period, tz)
+        except PeriodError:
             # Custom date range
             start_date = request.query_params.get('start_date')
             end_date = request.query_params.get('end_date')
-            if not start_date or not end_date:
-                start_date = today.replace(day=1)
-                end_date = (start_date + relativedelta(months=1)) - timedelta(days=1)
+            if start_date and end_date:
+                try:
+                    date_range = parse_date_range(start_date, end_date, tz)
+                except PeriodError as exc:
+                    return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                date_range = resolve_period('month', tz)
         
-        transactions = self.get_queryset().filter(
-            created_at__date__range=[start_date, end_date]
-        )
+        # Rollups are kept per transaction date, so the created_at totals are read from the rows
+        transactions = self.get_queryset().filter(date_range.datetime_q())
         
-        # Calculate totals
-        total_income = transactions.filter(transaction_type='income').aggregate(
-            total=Sum('amount'))['total'] or 0
-        total_expenses = transactions.filter(transaction_type='expense').aggregate(
-            total=Sum('amount'))['total'] or 0
-        net_amount = total_income - total_expenses
+        # Calculate totals and counts in a single query
+        totals = bucket_totals(transactions, {'period': Q()}, amount_field='amount', count_field=None)['period']
         
         # Category breakdown
         category_breakdown = transactions.filter(transaction_type='expense').values(
@@ -244,15 +325,15 @@ class TransactionViewSet(viewsets.ModelViewSet):
         
         return Response({
             'period': period,
-            'start_date': start_date,
-            'end_date': end_date,
+            'start_date': date_range.start,
+            'end_date': date_range.last_day,
             'summary': {
-                'total_income': total_income,
-                'total_expenses': total_expenses,
-                'net_amount': net_amount,
-                'transaction_count': transactions.count(),
-                'income_count': transactions.filter(transaction_type='income').count(),
-                'expense_count': transactions.filter(transaction_type='expense').count()
+                'total_income': totals['income'],
+                'total_expenses': totals['expenses'],
+                'net_amount': totals['net'],
+                'transaction_count': totals['count'],
+                'income_count': totals['income_count'],
+                'expense_count': totals['expense_count']
             },
             'category_breakdown': category_breakdown,
             'account_breakdown': account_breakdown,
@@ -263,23 +344,13 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def expenses(self, request):
         """Get only expense transactions"""
         queryset = self.get_queryset().filter(transaction_type='expense')
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = TransactionListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = TransactionListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     
     @action(detail=False, methods=['get'])
     def income(self, request):
         """Get only income transactions"""
         queryset = self.get_queryset().filter(transaction_type='income')
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = TransactionListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = TransactionListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     
     @action(detail=False, methods=['get'])
     def by_category(self, request):
@@ -290,12 +361,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         else:
             queryset = self.get_queryset()
         
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = TransactionListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = TransactionListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     
     @action(detail=False, methods=['get'])
     def by_account(self, request):
@@ -306,12 +372,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         else:
             queryset = self.get_queryset()
         
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = TransactionListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = TransactionListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset)
     
     @action(detail=False, methods=['get'])
     def date_range(self, request):
@@ -325,14 +386,11 @@ class TransactionViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        except ValueError:
-            return Response({
-                'error': 'Invalid date format. Use YYYY-MM-DD'
-            }, status=status.HTTP_400_BAD_REQUEST)
+            date_range = parse_date_range(start_date, end_date, user_timezone(request.user))
+        except PeriodError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
-        queryset = self.get_queryset().filter(created_at__date__range=[start_date, end_date])
+        queryset = self.get_queryset().filter(date_range.datetime_q())
         
         # Apply additional filters
         transaction_type = request.query_params.get('transaction_type')
@@ -352,10 +410,4 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if ordering:
             queryset = queryset.order_by(ordering)
         
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = TransactionListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = TransactionListSerializer(queryset, many=True)
-        return Response(serializer.data) 
\ No newline at end of file
+        return self.list_response(queryset) 
\ No newline at end of file
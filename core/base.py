@@ -35,11 +35,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.SlowRequestMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After the session and authentication middleware, so session logins can profile
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -126,7 +130,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -151,6 +155,99 @@ FILTER_DATE_MODELS = ['lt', 'gte']
 
 VALIDATION_EXPIRE_TIME = 1
 
+# Largest batch accepted by POST /api/transactions/bulk/
+BULK_TRANSACTION_MAX_ITEMS = 1000
+
+# Serialize transaction lists from values_list rows instead of model instances
+FAST_TRANSACTION_SERIALIZER = False
+
+# Receipt uploads are re-encoded and thumbnailed by this many background
+# threads per process (0 processes them inline when the request commits)
+RECEIPT_WORKERS = 2
+# Longest side of the stored original, in pixels
+RECEIPT_MAX_DIMENSION = 2048
+RECEIPT_JPEG_QUALITY = 85
+# Storage of receipt images, content-addressed so identical images are stored once.
+# Use 'core.storage.ReceiptPrivateStorage' for the private S3 bucket.
+RECEIPT_STORAGE = 'core.storage.ReceiptFileSystemStorage'
+
+# Async dashboard views query their sections concurrently on this many
+# threads per process, each with its own database connection (0 runs them
+# one after another on the request's thread)
+DASHBOARD_WORKERS = 4
+
+# Token to user resolution is cached in an LRU of TOKEN_CACHE_SIZE entries
+# per process for TOKEN_CACHE_TTL seconds, which bounds how long a token
+# deleted through another process keeps working. Set TOKEN_CACHE_ALIAS to a
+# shared cache (e.g. Redis) to back the LRU across processes
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 30
+TOKEN_CACHE_ALIAS = None
+TOKEN_CACHE_SHARED_TTL = 5 * 60
+
+# Reads of the reporting endpoints (core.db_router.replica_reads) go to one of
+# the DATABASES aliases in DATABASE_REPLICAS, picked per request; writes always
+# go to 'default'. After a write the user reads from 'default' for
+# REPLICA_STICKY_SECONDS, which must exceed the replicas' lag. The window is
+# kept in the REPLICA_STICKY_CACHE_ALIAS cache, which must be shared between
+# processes (e.g. Redis) when there are replicas
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_CACHE_ALIAS = 'default'
+
+# Request metrics (api.middleware.MetricsMiddleware) are served at /api/metrics/;
+# also report each response's time and queries in a Server-Timing header. Off
+# by default since every client would see it; core/local.py turns it on
+METRICS_SERVER_TIMING = False
+
+# Requests running longer than SLOW_REQUEST_SECONDS are logged by the
+# 'api.services.watchdog' logger with their stack and their slowest queries
+# among the last SLOW_REQUEST_MAX_QUERIES (None turns the watchdog off)
+SLOW_REQUEST_SECONDS = 5
+SLOW_REQUEST_MAX_QUERIES = 100
+
+# Requests with an X-Profile header from a superuser, or signed with
+# `manage.py profile_signature` (valid for PROFILE_SIGNATURE_MAX_AGE seconds),
+# are profiled and their reports saved to PROFILE_STORAGE under profiles/
+PROFILE_SIGNATURE_MAX_AGE = 60 * 60
+PROFILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+PROFILE_TOP_ENTRIES = 40
+PROFILE_TRACEMALLOC_FRAMES = 1
+
+# Storage of job result files and staged uploads, under random names.
+# Use 'core.storage.PrivateFileStorage' for the private S3 bucket.
+JOB_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# Background jobs (api.services.jobs, run by `manage.py run_jobs`): running jobs
+# per user, seconds without a heartbeat before a job is requeued, base retry
+# delay in seconds (doubled per attempt) and days finished jobs are kept
+JOB_USER_CONCURRENCY = 2
+JOB_TIMEOUT = 15 * 60
+JOB_RETRY_DELAY = 30
+JOB_RETENTION_DAYS = 7
+
+# The 'responses' cache holds dashboard and summary responses keyed on the
+# user's data version (see api.services.response_cache). Local memory evicts
+# the least recently used entries beyond MAX_ENTRIES; to share it between
+# processes use django.core.cache.backends.redis.RedisCache with the server's
+# maxmemory-policy set to allkeys-lru.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
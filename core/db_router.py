@@ -0,0 +1,121 @@
+"""
+Read replica routing.
+
+Views decorated with ``replica_reads`` run their queries against one of the
+``DATABASE_REPLICAS`` aliases, picked per request; everything else,
+including every write, uses ``default``. A user whose data changed in the
+last ``REPLICA_STICKY_SECONDS`` reads from ``default`` too, so they always
+see their own writes even while the replicas lag behind. Writes are noted
+through ``api.services.response_cache.bump_data_version``, which runs with
+every change to a user's transactions, accounts and categories, once the
+change is committed.
+
+Replicas are configured as regular ``DATABASES`` entries with
+``'TEST': {'MIRROR': 'default'}``, and are never migrated.
+"""
+import contextvars
+import functools
+import random
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpRequest
+from rest_framework.request import Request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# The replica the current request reads from, None for the primary
+_replica = contextvars.ContextVar('replica', default=None)
+
+
+def sticky_cache():
+    return caches[settings.REPLICA_STICKY_CACHE_ALIAS]
+
+
+def sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def mark_written(*user_ids):
+    """Keep these users' reads on the primary for ``REPLICA_STICKY_SECONDS``"""
+    sticky_cache().set_many({sticky_key(user_id): True for user_id in user_ids}, settings.REPLICA_STICKY_SECONDS)
+
+
+def record_write(*user_ids):
+    """Note a write of these users, effective when the current transaction commits"""
+    if settings.DATABASE_REPLICAS and user_ids:
+        transaction.on_commit(functools.partial(mark_written, *user_ids))
+
+
+def is_sticky(user_id):
+    return sticky_cache().get(sticky_key(user_id)) is not None
+
+
+def choose_replica(request):
+    """The replica to read from for this request, or None for the primary"""
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas or request.method not in SAFE_METHODS:
+        return None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and is_sticky(user.pk):
+        return None
+    return random.choice(replicas)
+
+
+def current_replica():
+    return _replica.get()
+
+
+def replica_reads(view):
+    """
+    Read from a replica for the duration of a view.
+
+    For function views, viewset actions and async views; apply it below
+    ``@api_view`` / ``@action`` so the user is authenticated first.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            token = _replica.set(choose_replica(_request(args)))
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _replica.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _replica.set(choose_replica(_request(args)))
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _replica.reset(token)
+    return wrapper
+
+
+def _request(args):
+    return next(arg for arg in args if isinstance(arg, (Request, HttpRequest)))
+
+
+class ReplicaRouter:
+    """Routes the reads of ``replica_reads`` views to their replica and all writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        # Also for instances read from a replica, which would be saved back there otherwise
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -27,6 +27,9 @@ STATIC_URL = "https://%s/" % AWS_S3_CUSTOM_DOMAIN_STATIC
 STATIC_ROOT = "/"
 
 DEFAULT_FILE_STORAGE = "django_s3_storage.storage.S3Storage"
+RECEIPT_STORAGE = "core.storage.ReceiptPrivateStorage"
+PROFILE_STORAGE = "core.storage.PrivateFileStorage"
+JOB_STORAGE = "core.storage.PrivateFileStorage"
 AWS_S3_BUCKET_NAME = ""
 AWS_S3_PUBLIC_BUCKET_NAME = ""
 
@@ -64,6 +67,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'api.services.watchdog': {
+            'handlers': ['watchtower'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
     'formatters': {
         'simple': {
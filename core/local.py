@@ -25,6 +25,8 @@ MIDDLEWARE = MIDDLEWARE + ['debug_toolbar.middleware.DebugToolbarMiddleware']
 
 INTERNAL_IPS = ('127.0.0.1', '127.0.0.1:8000', 'localhost',)
 
+METRICS_SERVER_TIMING = True
+
 DEBUG_TOOLBAR_PANELS = [
     'debug_toolbar.panels.versions.VersionsPanel',
     'debug_toolbar.panels.timer.TimerPanel',
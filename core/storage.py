@@ -1,9 +1,55 @@
+import hashlib
+import posixpath
+
 from django.conf import settings
-from storages.backends.s3boto3 import S3Boto3Storage
-from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+
+class ContentAddressedStorageMixin:
+    """
+    Store files under the SHA-256 of their content.
+
+    ``receipts/photo.jpg`` is saved as ``receipts/ab/cd/abcd….jpg``; when an
+    object with that name already exists the upload is skipped and the
+    existing name returned, so identical files share one object. Objects are
+    never deleted through model fields, see ``api.services.receipt_blobs``,
+    which is told about the reuse so the collector keeps the object.
+    """
+    hash_chunk_size = 64 * 1024
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(self.hash_chunk_size):
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest[2:4], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        from api.services import receipt_blobs
+        receipt_blobs.touch(name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+class ReceiptFileSystemStorage(ContentAddressedStorageMixin, FileSystemStorage):
+    pass
 
 
 if settings.ENV == 'DEV' or settings.ENV == 'QA':
+    from storages.backends.s3boto3 import S3Boto3Storage
+
     class StaticStorage(S3Boto3Storage):
         bucket_name = settings.AWS_S3_BUCKET_NAME_STATIC
         region_name = settings.AWS_REGION_NAME
@@ -29,7 +75,23 @@ if settings.ENV == 'DEV' or settings.ENV == 'QA':
 
         def _get_security_token(self):
             return None
+
+
+    class ReceiptPrivateStorage(ContentAddressedStorageMixin, PrivateFileStorage):
+        # Names are content hashes, writing the same key again stores the same bytes
+        file_overwrite = True
 else:
     PrivateFileStorage = None
     PublicStorage = None
     StaticStorage = None
+    ReceiptPrivateStorage = None
+
+
+def receipt_storage():
+    """The storage configured by RECEIPT_STORAGE, used by the receipt image fields"""
+    return import_string(settings.RECEIPT_STORAGE)()
+
+
+def job_storage():
+    """The storage configured by JOB_STORAGE, for job result files and staged uploads"""
+    return import_string(settings.JOB_STORAGE)()